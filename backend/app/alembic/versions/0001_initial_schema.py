@@ -0,0 +1,206 @@
+"""initial schema
+
+Tables as they were before migrations were introduced. A database created
+earlier with Base.metadata.create_all already matches this revision: mark
+it with `alembic stamp 0001` and then `alembic upgrade head`.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('empresas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=100), nullable=False),
+    sa.Column('data_expiracao_plano', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_empresas_id'), 'empresas', ['id'], unique=False)
+    op.create_index(op.f('ix_empresas_nome'), 'empresas', ['nome'], unique=False)
+
+    op.create_table('contatos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('remote_jid', sa.String(length=100), nullable=False),
+    sa.Column('nome', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('empresa_id', 'remote_jid', name='uq_contatos_empresa_remote_jid')
+    )
+    op.create_index(op.f('ix_contatos_id'), 'contatos', ['id'], unique=False)
+
+    op.create_table('crm_boards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=100), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_crm_boards_id'), 'crm_boards', ['id'], unique=False)
+
+    op.create_table('crm_tags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=50), nullable=False),
+    sa.Column('cor', sa.String(length=7), nullable=True),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_crm_tags_id'), 'crm_tags', ['id'], unique=False)
+    op.create_index(op.f('ix_crm_tags_nome'), 'crm_tags', ['nome'], unique=True)
+
+    op.create_table('instancias_evolution',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome_instancia', sa.String(length=100), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('api_key', sa.String(length=255), nullable=True),
+    sa.Column('api_endpoint', sa.String(length=255), nullable=True),
+    sa.Column('status_conexao', sa.String(length=50), nullable=True),
+    sa.Column('qr_code_base64', sa.Text(), nullable=True),
+    sa.Column('last_webhook_received', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_instancias_evolution_id'), 'instancias_evolution', ['id'], unique=False)
+    op.create_index(op.f('ix_instancias_evolution_nome_instancia'), 'instancias_evolution', ['nome_instancia'], unique=True)
+
+    op.create_table('usuarios',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=100), nullable=True),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_superuser', sa.Boolean(), nullable=True),
+    sa.Column('is_supervisor', sa.Boolean(), nullable=True),
+    sa.Column('empresa_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_usuarios_email'), 'usuarios', ['email'], unique=True)
+    op.create_index(op.f('ix_usuarios_id'), 'usuarios', ['id'], unique=False)
+    op.create_index(op.f('ix_usuarios_nome'), 'usuarios', ['nome'], unique=False)
+
+    op.create_table('conversas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('instancia_id', sa.Integer(), nullable=False),
+    sa.Column('contato_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['contato_id'], ['contatos.id'], ),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.ForeignKeyConstraint(['instancia_id'], ['instancias_evolution.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('instancia_id', 'contato_id', name='uq_conversas_instancia_contato')
+    )
+    op.create_index('ix_conversas_empresa_last_message', 'conversas', ['empresa_id', 'last_message_at', 'id'], unique=False)
+    op.create_index(op.f('ix_conversas_id'), 'conversas', ['id'], unique=False)
+
+    op.create_table('crm_colunas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=100), nullable=False),
+    sa.Column('ordem', sa.Integer(), nullable=True),
+    sa.Column('board_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['board_id'], ['crm_boards.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_crm_colunas_id'), 'crm_colunas', ['id'], unique=False)
+
+    op.create_table('crm_cards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('titulo', sa.String(length=255), nullable=False),
+    sa.Column('descricao', sa.Text(), nullable=True),
+    sa.Column('ordem', sa.Integer(), nullable=True),
+    sa.Column('coluna_id', sa.Integer(), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['coluna_id'], ['crm_colunas.id'], ),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_crm_cards_id'), 'crm_cards', ['id'], unique=False)
+
+    op.create_table('mensagens',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('conversa_id', sa.Integer(), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('message_id', sa.String(length=100), nullable=True),
+    sa.Column('from_me', sa.Boolean(), nullable=True),
+    sa.Column('tipo', sa.String(length=30), nullable=True),
+    sa.Column('conteudo', sa.Text(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['conversa_id'], ['conversas.id'], ),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_mensagens_conversa_timestamp', 'mensagens', ['conversa_id', 'timestamp', 'id'], unique=False)
+
+
+
+def downgrade():
+    op.drop_index('ix_mensagens_conversa_timestamp', table_name='mensagens')
+
+    op.drop_table('mensagens')
+    op.drop_index(op.f('ix_crm_cards_id'), table_name='crm_cards')
+
+    op.drop_table('crm_cards')
+    op.drop_index(op.f('ix_crm_colunas_id'), table_name='crm_colunas')
+
+    op.drop_table('crm_colunas')
+    op.drop_index(op.f('ix_conversas_id'), table_name='conversas')
+    op.drop_index('ix_conversas_empresa_last_message', table_name='conversas')
+
+    op.drop_table('conversas')
+    op.drop_index(op.f('ix_usuarios_nome'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_id'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_email'), table_name='usuarios')
+
+    op.drop_table('usuarios')
+    op.drop_index(op.f('ix_instancias_evolution_nome_instancia'), table_name='instancias_evolution')
+    op.drop_index(op.f('ix_instancias_evolution_id'), table_name='instancias_evolution')
+
+    op.drop_table('instancias_evolution')
+    op.drop_index(op.f('ix_crm_tags_nome'), table_name='crm_tags')
+    op.drop_index(op.f('ix_crm_tags_id'), table_name='crm_tags')
+
+    op.drop_table('crm_tags')
+    op.drop_index(op.f('ix_crm_boards_id'), table_name='crm_boards')
+
+    op.drop_table('crm_boards')
+    op.drop_index(op.f('ix_contatos_id'), table_name='contatos')
+
+    op.drop_table('contatos')
+    op.drop_index(op.f('ix_empresas_nome'), table_name='empresas')
+    op.drop_index(op.f('ix_empresas_id'), table_name='empresas')
+
+    op.drop_table('empresas')
@@ -0,0 +1,44 @@
+"""crm tenant indexes
+
+Indexes for the per-company and per-parent lookups in app/crud, and tag
+names unique per company instead of globally.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_crm_boards_empresa_id'), 'crm_boards', ['empresa_id'], unique=False)
+    op.create_index('ix_crm_colunas_board_ordem', 'crm_colunas', ['board_id', 'ordem'], unique=False)
+    op.create_index('ix_crm_cards_coluna_ordem', 'crm_cards', ['coluna_id', 'ordem'], unique=False)
+    op.create_index(op.f('ix_crm_cards_empresa_id'), 'crm_cards', ['empresa_id'], unique=False)
+    op.create_index(op.f('ix_instancias_evolution_empresa_id'), 'instancias_evolution', ['empresa_id'], unique=False)
+
+    # Batch mode: SQLite can only add the constraint by recreating the table
+    with op.batch_alter_table('crm_tags', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_crm_tags_nome'))
+        batch_op.create_unique_constraint('uq_crm_tags_empresa_nome', ['empresa_id', 'nome'])
+
+
+def downgrade():
+    # Fails if two companies have since created tags with the same name
+    with op.batch_alter_table('crm_tags', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_crm_tags_empresa_nome', type_='unique')
+        batch_op.create_index(batch_op.f('ix_crm_tags_nome'), ['nome'], unique=True)
+
+    op.drop_index(op.f('ix_instancias_evolution_empresa_id'), table_name='instancias_evolution')
+    op.drop_index(op.f('ix_crm_cards_empresa_id'), table_name='crm_cards')
+    op.drop_index('ix_crm_cards_coluna_ordem', table_name='crm_cards')
+    op.drop_index('ix_crm_colunas_board_ordem', table_name='crm_colunas')
+    op.drop_index(op.f('ix_crm_boards_empresa_id'), table_name='crm_boards')
@@ -0,0 +1,36 @@
+"""precise updated_at
+
+Microsecond updated_at on crm_cards and instancias_evolution, which back
+the ETag validators of their list endpoints. MySQL only: DATETIME keeps
+whole seconds there, other databases already store fractions.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+TABLES = ('crm_cards', 'instancias_evolution')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    for table in TABLES:
+        op.alter_column(table, 'updated_at', existing_type=mysql.DATETIME(), type_=mysql.DATETIME(fsp=6), existing_nullable=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    for table in TABLES:
+        op.alter_column(table, 'updated_at', existing_type=mysql.DATETIME(fsp=6), type_=mysql.DATETIME(), existing_nullable=True)
@@ -0,0 +1,46 @@
+"""crm change log
+
+Per-company change log of boards, colunas, cards and tags (crm_changes),
+numbered by the new empresas.crm_version counter.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('empresas', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('crm_version', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('crm_changes',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('empresa_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('deleted', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_crm_changes_empresa_version', 'crm_changes', ['empresa_id', 'version'], unique=True)
+    op.create_index('ix_crm_changes_created_at', 'crm_changes', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_crm_changes_created_at', table_name='crm_changes')
+    op.drop_index('ix_crm_changes_empresa_version', table_name='crm_changes')
+    op.drop_table('crm_changes')
+
+    with op.batch_alter_table('empresas', schema=None) as batch_op:
+        batch_op.drop_column('crm_version')
@@ -0,0 +1,29 @@
+"""drop instancias_evolution.qr_code_base64
+
+QR codes now live in the short-TTL QR store (app/services/qr_store.py)
+and are served by GET /evolution/{id}/qrcode. Codes stored in the column
+have long expired, so nothing is copied; downgrade restores an empty column.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 17:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('instancias_evolution', schema=None) as batch_op:
+        batch_op.drop_column('qr_code_base64')
+
+
+def downgrade():
+    with op.batch_alter_table('instancias_evolution', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('qr_code_base64', sa.Text(), nullable=True))
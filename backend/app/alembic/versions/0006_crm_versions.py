@@ -0,0 +1,44 @@
+"""crm versions table
+
+Moves the change log counter from empresas.crm_version to crm_versions, a
+table without foreign keys. Advancing the counter on the empresa row
+deadlocked on InnoDB against concurrent inserts of boards, colunas, cards
+and tags of the same company, which hold shared locks on that row.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('crm_versions',
+    sa.Column('empresa_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('empresa_id')
+    )
+    op.execute('INSERT INTO crm_versions (empresa_id, version) SELECT id, crm_version FROM empresas')
+
+    with op.batch_alter_table('empresas', schema=None) as batch_op:
+        batch_op.drop_column('crm_version')
+
+
+def downgrade():
+    with op.batch_alter_table('empresas', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('crm_version', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        'UPDATE empresas SET crm_version = '
+        '(SELECT version FROM crm_versions WHERE crm_versions.empresa_id = empresas.id) '
+        'WHERE id IN (SELECT empresa_id FROM crm_versions)'
+    )
+    op.drop_table('crm_versions')
@@ -0,0 +1,32 @@
+"""crm ordem not null
+
+crm_colunas.ordem and crm_cards.ordem are keyset pagination keys: a NULL
+never satisfies the seek condition, so such rows dropped out of the pages.
+Existing NULLs become 0 (where MySQL sorted them anyway: first).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('crm_colunas', 'crm_cards'):
+        op.execute(f'UPDATE {table} SET ordem = 0 WHERE ordem IS NULL')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('ordem', existing_type=sa.Integer(), nullable=False, server_default='0')
+
+
+def downgrade():
+    for table in ('crm_cards', 'crm_colunas'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('ordem', existing_type=sa.Integer(), nullable=True, server_default=None)
@@ -0,0 +1,46 @@
+"""mensagens unique message id
+
+Evolution redelivers webhooks; the dedup window only catches the recent
+ones. A unique (instancia_id, message_id) key on mensagens makes storing a
+message idempotent. instancia_id is copied from the conversa, and existing
+duplicates keep their first row.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mensagens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('instancia_id', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE mensagens SET instancia_id = '
+        '(SELECT conversas.instancia_id FROM conversas WHERE conversas.id = mensagens.conversa_id)'
+    )
+    # The derived table lets MySQL read the table it deletes from
+    op.execute(
+        'DELETE FROM mensagens WHERE message_id IS NOT NULL AND id NOT IN ('
+        'SELECT id FROM (SELECT MIN(id) AS id FROM mensagens WHERE message_id IS NOT NULL '
+        'GROUP BY instancia_id, message_id) AS keep)'
+    )
+    with op.batch_alter_table('mensagens', schema=None) as batch_op:
+        batch_op.alter_column('instancia_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_mensagens_instancia_id', 'instancias_evolution', ['instancia_id'], ['id'])
+        batch_op.create_unique_constraint('uq_mensagens_instancia_message_id', ['instancia_id', 'message_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('mensagens', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_mensagens_instancia_message_id', type_='unique')
+        batch_op.drop_constraint('fk_mensagens_instancia_id', type_='foreignkey')
+        batch_op.drop_column('instancia_id')
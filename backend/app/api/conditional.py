@@ -0,0 +1,34 @@
+from typing import Optional
+
+from fastapi import Response
+
+from app.core.etag import etag_matches
+
+# Conditional GETs. Responses carry an ETag; a request whose If-None-Match
+# matches it gets 304 Not Modified with no body, so a client polling an
+# unchanged resource downloads nothing. Tenant-cached responses use the
+# strong ETag stored with the body; the others check a weak ETag built from
+# one aggregate query before any rows are loaded or serialized.
+
+# Tenant data: clients may store it but must revalidate before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def json_response(body: str, etag: str, if_none_match: Optional[str]) -> Response:
+    """
+    Encoded JSON body with its ETag, or 304 if the client already has it.
+    """
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response = Response(content=body, media_type="application/json")
+    set_etag(response, etag)
+    return response
@@ -1,42 +1,178 @@
-from typing import Generator, Optional
+import asyncio
+import hashlib
+import time
+from typing import Any, AsyncGenerator, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app import crud, models, schemas
 from app.core import security
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.lru import LRUCache
+from app.core.metrics import Counter, registry
+from app.db.session import AsyncSessionLocal, SessionLocal
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
-def get_db() -> Generator:
+# sha256(token) -> verified TokenPayload; each entry expires at the token's exp
+_verified_tokens = LRUCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE)
+registry.register("auth_token_cache", _verified_tokens.stats)
+
+# Sync sessions open at once, capped at what the pool can serve. A request
+# holds its connection while it waits for a threadpool thread to run the next
+# dependency or the endpoint; without the cap, under load every thread ends
+# up blocked on a checkout that only those waiting requests could satisfy.
+# Requests over the cap wait here, on the event loop, without a thread.
+_db_slots = asyncio.Semaphore(settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+_db_waiting = Counter()
+
+def db_session_stats() -> dict:
+    return {
+        "limit": settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+        "waiting": _db_waiting.value,
+    }
+
+registry.register("db_sessions", db_session_stats)
+
+async def get_db() -> AsyncGenerator[Session, None]:
+    # Async so the slot is waited for on the event loop, without a thread
+    _db_waiting.inc()
+    try:
+        await _db_slots.acquire()
+    finally:
+        _db_waiting.inc(-1)
+    db = SessionLocal()
     try:
-        db = SessionLocal()
         yield db
     finally:
-        db.close()
+        try:
+            # close() rolls back and returns the connection to the pool, a
+            # round trip that must not block the loop
+            await run_in_threadpool(db.close)
+        finally:
+            _db_slots.release()
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(reusable_oauth2)
-) -> models.Usuario:
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for async endpoints: queries await on the event loop instead of
+    holding a threadpool thread each.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+class CurrentUser:
+    """
+    Authenticated principal built from the verified token claims and the
+    cached user state, without loading the usuarios row. It exposes the same
+    attributes as models.Usuario: anything beyond the claims (nome,
+    hashed_password, ...) loads the row on first access, which needs the
+    sync session (db is None for principals built by the async dependencies).
+    """
+    def __init__(
+        self,
+        db: Optional[Session],
+        *,
+        id: int,
+        email: Optional[str],
+        empresa_id: Optional[int],
+        is_active: bool,
+        is_superuser: bool,
+        is_supervisor: bool,
+    ):
+        self.id = id
+        self.email = email
+        self.empresa_id = empresa_id
+        self.is_active = is_active
+        self.is_superuser = is_superuser
+        self.is_supervisor = is_supervisor
+        self._db = db
+        self._db_obj: Optional[models.Usuario] = None
+
+    @property
+    def db_obj(self) -> models.Usuario:
+        if self._db_obj is None:
+            if self._db is None:
+                raise RuntimeError("CurrentUser without a sync session can't load the usuarios row")
+            self._db_obj = crud.usuario.get(self._db, id=self.id)
+            if self._db_obj is None:
+                raise HTTPException(status_code=404, detail="User not found")
+        return self._db_obj
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.db_obj, name)
+
+def _decode_token(token: str) -> schemas.TokenPayload:
+    # Agents present the same long-lived token on every request, so the
+    # signature check and claims parsing are done once per token
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = _verified_tokens.get(key)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = schemas.TokenData(**payload)
+        token_data = schemas.TokenPayload(**payload)
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = crud.usuario.get_by_email(db, email=token_data.email)
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    if expires_in is None or expires_in > 0:
+        _verified_tokens.set(key, token_data, ttl=expires_in)
+    return token_data
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(reusable_oauth2)
+) -> models.Usuario: # CurrentUser in AUTH_MODE=claims
+    token_data = _decode_token(token)
+    if settings.AUTH_MODE == "claims" and token_data.user_id is not None:
+        # Active flag and roles come from the state cache rather than the
+        # token, so deactivating or demoting a user takes effect without
+        # waiting for the token to expire
+        state = crud.usuario.get_state(db, id=token_data.user_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return CurrentUser(db, id=token_data.user_id, email=token_data.sub, **state)
+
+    if token_data.user_id is not None:
+        user = crud.usuario.get(db, id=token_data.user_id)
+    else:
+        user = crud.usuario.get_by_email(db, email=token_data.sub)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(reusable_oauth2)
+) -> models.Usuario: # CurrentUser in AUTH_MODE=claims
+    """
+    get_current_user for async endpoints.
+    """
+    token_data = _decode_token(token)
+    if settings.AUTH_MODE == "claims" and token_data.user_id is not None:
+        state = await crud.usuario.get_state_async(db, id=token_data.user_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return CurrentUser(None, id=token_data.user_id, email=token_data.sub, **state)
+
+    if token_data.user_id is not None:
+        user = await crud.usuario.get_async(db, id=token_data.user_id)
+    else:
+        user = await crud.usuario.get_by_email_async(db, email=token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -48,6 +184,13 @@ def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_current_active_user_async(
+    current_user: models.Usuario = Depends(get_current_user_async),
+) -> models.Usuario:
+    if not crud.usuario.is_active(current_user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
 def get_current_active_superuser(
     current_user: models.Usuario = Depends(get_current_active_user),
 ) -> models.Usuario:
@@ -57,6 +200,22 @@ def get_current_active_superuser(
         )
     return current_user
 
+def check_empresa_access(
+    current_user: models.Usuario, empresa_id: Optional[int], detail: str = "Not enough permissions"
+) -> None:
+    """
+    Raise 403 unless the user is a superuser or belongs to empresa_id.
+    """
+    if not current_user.is_superuser and empresa_id != current_user.empresa_id:
+        raise HTTPException(status_code=403, detail=detail)
+
+def check_bulk_size(count: int) -> None:
+    """
+    Raise 413 when a bulk request has more than BULK_MAX_ROWS items.
+    """
+    if count > settings.BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ROWS} items per request")
+
 # Dependency to check if the user belongs to the same company or is a superuser
 def check_user_company_or_superuser(
     current_user: models.Usuario = Depends(get_current_active_user),
@@ -9,7 +9,10 @@ from app.api.v1.endpoints import (
     crm_colunas,
     crm_cards,
     crm_tags,
-    evolution # Add evolution
+    crm_changes,
+    conversas,
+    evolution, # Add evolution
+    metrics,
 )
 
 api_router = APIRouter()
@@ -27,7 +30,13 @@ api_router.include_router(crm_boards.router, prefix="/crm/boards", tags=["crm-bo
 api_router.include_router(crm_colunas.router, prefix="/crm/colunas", tags=["crm-colunas"])
 api_router.include_router(crm_cards.router, prefix="/crm/cards", tags=["crm-cards"])
 api_router.include_router(crm_tags.router, prefix="/crm/tags", tags=["crm-tags"])
+api_router.include_router(crm_changes.router, prefix="/crm/changes", tags=["crm-changes"])
+
+# Messaging
+api_router.include_router(conversas.router, prefix="/conversas", tags=["conversas"])
 
 # Integrations
 api_router.include_router(evolution.router, prefix="/evolution", tags=["evolution-api"]) # Include Evolution API router
 
+# Observability
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
@@ -0,0 +1,71 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.api import deps
+
+router = APIRouter()
+
+# Dependency to check if the user belongs to the company of the conversa
+def get_conversa_empresa_user(
+    conversa_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> models.Conversa:
+    conversa = crud.conversa.get(db, id=conversa_id)
+    if not conversa:
+        raise HTTPException(status_code=404, detail="Conversa not found")
+    if not current_user.is_superuser and conversa.empresa_id != current_user.empresa_id:
+        raise HTTPException(status_code=403, detail="Not enough permissions for this conversa")
+    return conversa
+
+@router.get("/", response_model=schemas.ConversaPage)
+def read_conversas(
+    db: Session = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve conversas for the user's company, most recent first.
+    Use next_cursor from the response to get the next page.
+    """
+    if not current_user.empresa_id:
+        return {"items": [], "next_cursor": None} # Superuser / user without company
+    try:
+        items, next_cursor = crud.conversa.get_page_by_empresa(
+            db, empresa_id=current_user.empresa_id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/{conversa_id}", response_model=schemas.Conversa)
+def read_conversa(
+    conversa: models.Conversa = Depends(get_conversa_empresa_user), # Checks access
+) -> Any:
+    """
+    Get conversa by ID. Access controlled by dependency.
+    """
+    return conversa
+
+@router.get("/{conversa_id}/mensagens", response_model=schemas.MensagemPage)
+def read_mensagens(
+    conversa: models.Conversa = Depends(get_conversa_empresa_user), # Checks access
+    db: Session = Depends(deps.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+) -> Any:
+    """
+    Retrieve the message history of a conversa, newest first.
+    Use next_cursor from the response to get older messages.
+    """
+    try:
+        items, next_cursor = crud.mensagem.get_page_by_conversa(
+            db, conversa_id=conversa.id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "next_cursor": next_cursor}
@@ -1,10 +1,15 @@
-from typing import Any, List
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
-from app.api import deps
+from app.api import conditional, deps
+from app.core import serialization
+from app.crud.crud_board import SNAPSHOT_FIELDS
+from app.services.tenant_cache import encode, tenant_cache
 
 router = APIRouter()
 
@@ -14,36 +19,59 @@ def get_board_empresa_user(
     db: Session = Depends(deps.get_db),
     current_user: models.Usuario = Depends(deps.get_current_active_user),
 ) -> models.Board:
-    board = crud.board.get(db, id=board_id)
-    if not board:
+    found = crud.ownership.get_with_empresa(db, models.Board, board_id)
+    if not found:
         raise HTTPException(status_code=404, detail="Board not found")
-    if not current_user.is_superuser and board.empresa_id != current_user.empresa_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions for this board")
+    board, empresa_id = found
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this board")
     return board
 
-@router.get("/", response_model=List[schemas.Board])
+# Same check when only the id is needed: served from the ownership cache
+def authorize_board(
+    board_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> int:
+    empresa_id = crud.ownership.empresa_of(db, models.Board, board_id)
+    if empresa_id is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this board")
+    return board_id
+
+@router.get("/", response_model=schemas.BoardPage)
 def read_boards(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
     current_user: models.Usuario = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve boards for the user's company.
     Superusers can see all boards (consider adding a filter for this).
+    Use next_cursor from the response to get the next page.
+    Company pages carry an ETag; send it back as If-None-Match to get 304 if unchanged.
     """
-    if current_user.is_superuser:
-        # Decide if superuser should see all boards or needs a filter
-        # For now, let's restrict to their non-existent company or require filter
-        # Or maybe return all boards? Let's return all for now.
-        boards = crud.board.get_multi(db, skip=skip, limit=limit)
-    elif current_user.empresa_id:
-        boards = crud.board.get_multi_by_empresa(
-            db, empresa_id=current_user.empresa_id, skip=skip, limit=limit
-        )
-    else:
-        boards = [] # User without company (shouldn't happen unless superuser)
-    return boards
+    try:
+        if current_user.is_superuser:
+            # Decide if superuser should see all boards or needs a filter
+            # For now, let's restrict to their non-existent company or require filter
+            # Or maybe return all boards? Let's return all for now.
+            boards, next_cursor = crud.board.get_page(db, cursor=cursor, limit=limit)
+        elif current_user.empresa_id:
+            # Served from the tenant cache until a board, coluna or card of the company changes
+            def load() -> str:
+                boards, next_cursor = crud.board.get_page_by_empresa(
+                    db, empresa_id=current_user.empresa_id, cursor=cursor, limit=limit
+                )
+                return encode(schemas.BoardPage, {"items": boards, "next_cursor": next_cursor})
+            cached = tenant_cache.get_or_load("boards", current_user.empresa_id, ("page", cursor, limit), load)
+            return conditional.json_response(cached.body, cached.etag, if_none_match)
+        else:
+            boards, next_cursor = [], None # User without company (shouldn't happen unless superuser)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": boards, "next_cursor": next_cursor}
 
 @router.post("/", response_model=schemas.Board)
 def create_board(
@@ -75,12 +103,78 @@ def create_board(
 
 @router.get("/{board_id}", response_model=schemas.Board)
 def read_board(
-    board: models.Board = Depends(get_board_empresa_user),
+    board_id: int = Depends(authorize_board),
+    db: Session = Depends(deps.get_db),
+    if_none_match: Optional[str] = Header(None),
 ) -> Any:
     """
     Get board by ID. Access controlled by dependency.
+    Send the ETag back as If-None-Match to get 304 if the board, its colunas
+    and cards are unchanged.
     """
-    return board
+    def load() -> str:
+        board = crud.board.get_with_colunas(db, id=board_id)
+        if board is None:
+            raise HTTPException(status_code=404, detail="Board not found")
+        return encode(schemas.Board, board)
+    empresa_id = crud.ownership.empresa_of(db, models.Board, board_id) # Cached by the dependency
+    cached = tenant_cache.get_or_load("boards", empresa_id, ("board", board_id), load)
+    return conditional.json_response(cached.body, cached.etag, if_none_match)
+
+def _parse_snapshot_fields(fields: Optional[str]) -> Tuple[Sequence[str], Sequence[str], Sequence[str]]:
+    """
+    fields=nome,colunas.nome,cards.titulo -> (board, coluna, card) field lists.
+    A level with no fields listed keeps all of its fields.
+    """
+    selected: Dict[str, List[str]] = {"board": [], "colunas": [], "cards": []}
+    for field in filter(None, (f.strip() for f in (fields or "").split(","))):
+        level, _, name = field.rpartition(".")
+        level = level or "board"
+        if level not in SNAPSHOT_FIELDS or name not in SNAPSHOT_FIELDS[level]:
+            raise HTTPException(status_code=400, detail=f"Unknown snapshot field: {field}")
+        selected[level].append(name)
+    return tuple(selected[level] or SNAPSHOT_FIELDS[level] for level in ("board", "colunas", "cards"))
+
+def _open_object(obj: Dict[str, Any], key: str) -> str:
+    """
+    Encode obj without its closing brace, ready for a streamed key: '{..."key":'
+    """
+    encoded = serialization.dumps(obj)
+    return ("{" if encoded == "{}" else encoded[:-1] + ",") + serialization.dumps(key) + ":"
+
+def _stream_snapshot(board_data: Dict[str, Any], colunas, cards_by_coluna, coluna_fields) -> Iterator[str]:
+    yield _open_object(board_data, "colunas") + "["
+    for index, coluna in enumerate(colunas):
+        coluna_data = {f: coluna[f] for f in coluna_fields}
+        chunk = _open_object(coluna_data, "cards") + serialization.dumps(cards_by_coluna.get(coluna["id"], [])) + "}"
+        yield chunk if index == 0 else "," + chunk
+    yield "]}"
+
+@router.get("/{board_id}/snapshot", response_model=schemas.Board)
+def read_board_snapshot(
+    board: models.Board = Depends(get_board_empresa_user),
+    db: Session = Depends(deps.get_db),
+    fields: Optional[str] = None,
+) -> Any:
+    """
+    Board with all its colunas and their cards, in display order, in a fixed
+    number of queries. Optional `fields` projection, e.g.
+    `fields=id,nome,colunas.id,colunas.nome,cards.id,cards.titulo`.
+    The JSON is streamed one coluna at a time.
+    """
+    board_fields, coluna_fields, card_fields = _parse_snapshot_fields(fields)
+    colunas, cards = crud.board.get_snapshot_rows(
+        db, board_id=board.id, coluna_fields=coluna_fields, card_fields=card_fields
+    )
+    cards_by_coluna: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for card in cards:
+        cards_by_coluna[card["coluna_id"]].append({f: card[f] for f in card_fields})
+    board_data = {f: getattr(board, f) for f in board_fields}
+    # Rows are fully loaded above, so the stream doesn't touch the session
+    return StreamingResponse(
+        _stream_snapshot(board_data, colunas, cards_by_coluna, coluna_fields),
+        media_type="application/json",
+    )
 
 @router.put("/{board_id}", response_model=schemas.Board)
 def update_board(
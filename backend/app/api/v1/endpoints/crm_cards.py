@@ -1,83 +1,226 @@
-from typing import Any, List
+import logging
+from typing import Any, Dict, Iterable, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
-from app.api import deps
-from app.api.v1.endpoints.crm_colunas import get_coluna_empresa_user # Reuse dependency
+from app.api import conditional, deps
+from app.core.etag import etag_matches, weak_etag
+from app.db.session import SessionLocal
+from app.api.v1.endpoints.crm_colunas import authorize_coluna_async # Reuse dependency
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Card CRUD is async (AsyncSession): these are the busiest CRM endpoints and
+# don't tie up a threadpool thread while waiting on the database. reorder
+# stays sync, its positioning logic runs on a regular Session.
+
 # Dependency to check if the user belongs to the company of the card's column/board
-def get_card_empresa_user(
+async def get_card_empresa_user(
     card_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: models.Usuario = Depends(deps.get_current_active_user),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.Usuario = Depends(deps.get_current_active_user_async),
 ) -> models.Card:
-    card = crud.card.get(db, id=card_id)
-    if not card:
+    # Card.empresa_id is denormalized, so the card row alone decides access
+    found = await crud.ownership.get_with_empresa_async(db, models.Card, card_id)
+    if not found:
         raise HTTPException(status_code=404, detail="Card not found")
-    # Check access via the coluna -> board
-    coluna = crud.coluna.get(db, id=card.coluna_id)
-    if not coluna:
-         raise HTTPException(status_code=404, detail="Coluna associated with card not found") # Should not happen
-    board = crud.board.get(db, id=coluna.board_id)
-    if not board:
-         raise HTTPException(status_code=404, detail="Board associated with card's coluna not found") # Should not happen
-
-    if not current_user.is_superuser and board.empresa_id != current_user.empresa_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions for this card's board")
+    card, empresa_id = found
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this card's board")
     return card
 
-@router.get("/by_coluna/{coluna_id}", response_model=List[schemas.Card])
-def read_cards_by_coluna(
-    coluna: models.Coluna = Depends(get_coluna_empresa_user), # Use coluna dependency to check access
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+@router.get("/by_coluna/{coluna_id}", response_model=schemas.CardPage)
+async def read_cards_by_coluna(
+    response: Response,
+    coluna_id: int = Depends(authorize_coluna_async), # Use coluna dependency to check access
+    db: AsyncSession = Depends(deps.get_async_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
 ) -> Any:
     """
-    Retrieve cards for a specific coluna. Access controlled by coluna access.
+    Retrieve cards for a specific coluna, in order. Access controlled by coluna access.
+    Use next_cursor from the response to get the next page.
+    Send the ETag back as If-None-Match to get 304 if no card of the coluna changed.
     """
-    cards = crud.card.get_multi_by_coluna(db, coluna_id=coluna.id, skip=skip, limit=limit)
-    return cards
+    fingerprint = await crud.card.get_fingerprint_by_coluna_async(db, coluna_id=coluna_id)
+    etag = weak_etag("cards", coluna_id, fingerprint, cursor, limit)
+    if etag_matches(if_none_match, etag):
+        return conditional.not_modified(etag)
+    conditional.set_etag(response, etag)
+    try:
+        cards, next_cursor = await crud.card.get_page_by_coluna_async(
+            db, coluna_id=coluna_id, cursor=cursor, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": cards, "next_cursor": next_cursor}
 
 @router.post("/", response_model=schemas.Card)
-def create_card(
+async def create_card(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     card_in: schemas.CardCreate,
-    current_user: models.Usuario = Depends(deps.get_current_active_user),
+    current_user: models.Usuario = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Create new card for a specific coluna. User must belong to the company.
     """
-    # Obter a coluna primeiro para verificar permissões
-    coluna = crud.coluna.get(db, id=card_in.coluna_id)
-    if not coluna:
+    # Empresa do board da coluna (cache ou uma consulta com join)
+    empresa_id = await crud.ownership.empresa_of_async(db, models.Coluna, card_in.coluna_id)
+    if empresa_id is None:
         raise HTTPException(status_code=404, detail="Coluna not found")
-        
-    # Obter o board para verificar a empresa
-    board = crud.board.get(db, id=coluna.board_id)
-    if not board:
-        raise HTTPException(status_code=404, detail="Board associated with coluna not found")
-        
+
     # Verificar se o usuário tem acesso ao board/coluna
-    if not current_user.is_superuser and board.empresa_id != current_user.empresa_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions for this column's board")
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this column's board")
 
     # Ensure the empresa_id in the input matches the board's company
-    if card_in.empresa_id != board.empresa_id:
+    if card_in.empresa_id != empresa_id:
         raise HTTPException(status_code=400, detail="Card empresa_id must match the board's empresa_id")
 
-    card = crud.card.create_with_coluna_empresa(
-        db=db, obj_in=card_in, coluna_id=coluna.id, empresa_id=board.empresa_id
+    card = await crud.card.create_with_coluna_empresa_async(
+        db=db, obj_in=card_in, coluna_id=card_in.coluna_id, empresa_id=empresa_id
     )
     return card
 
+def _rebalance_colunas(coluna_ids: Iterable[int]) -> None:
+    """
+    Background task: renumber colunas whose cards ran out of space between them.
+    """
+    db = SessionLocal()
+    try:
+        for coluna_id in coluna_ids:
+            crud.card.rebalance(db, coluna_id=coluna_id)
+            db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Error rebalancing card order")
+    finally:
+        db.close()
+
+@router.post("/reorder", response_model=List[schemas.Card])
+def reorder_cards(
+    *,
+    db: Session = Depends(deps.get_db),
+    reorder_in: schemas.CardReorder,
+    background_tasks: BackgroundTasks,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Move several cards in one transaction: each move places a card right after
+    another one (or at the top) of a column. Either all moves apply or none.
+    """
+    cards = crud.card.get_many(db, ids=[move.card_id for move in reorder_in.moves])
+    to_rebalance = set()
+    try:
+        for move in reorder_in.moves:
+            card = cards.get(move.card_id)
+            if card is None:
+                raise HTTPException(status_code=404, detail=f"Card {move.card_id} not found")
+            deps.check_empresa_access(current_user, card.empresa_id, "Not enough permissions for this card's board")
+            if move.coluna_id != card.coluna_id:
+                target_empresa_id = crud.ownership.empresa_of(db, models.Coluna, move.coluna_id)
+                if target_empresa_id is None:
+                    raise HTTPException(status_code=404, detail="Target coluna not found")
+                if target_empresa_id != card.empresa_id:
+                    raise HTTPException(status_code=400, detail="Cannot move card to a column in a different company's board")
+            try:
+                if crud.card.move(db, card=card, coluna_id=move.coluna_id, after_card_id=move.after_card_id):
+                    to_rebalance.add(move.coluna_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if to_rebalance:
+        background_tasks.add_task(_rebalance_colunas, sorted(to_rebalance))
+    return list({move.card_id: cards[move.card_id] for move in reorder_in.moves}.values())
+
+# Bulk endpoints: one request and one transaction for many cards (imports,
+# mass edits), either all rows apply or none. Sync, like reorder.
+
+def _coluna_empresas(db: Session, coluna_ids: Iterable[int], current_user: models.Usuario) -> Dict[int, int]:
+    """
+    coluna_id -> empresa_id for the given colunas, checking the user can access each.
+    """
+    empresas = {}
+    for coluna_id in set(coluna_ids):
+        empresa_id = crud.ownership.empresa_of(db, models.Coluna, coluna_id)
+        if empresa_id is None:
+            raise HTTPException(status_code=404, detail=f"Coluna {coluna_id} not found")
+        deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this column's board")
+        empresas[coluna_id] = empresa_id
+    return empresas
+
+def _get_cards(db: Session, ids: Iterable[int], current_user: models.Usuario) -> Dict[int, models.Card]:
+    ids = list(ids)
+    cards = crud.card.get_many(db, ids=ids)
+    for id in ids:
+        card = cards.get(id)
+        if card is None:
+            raise HTTPException(status_code=404, detail=f"Card {id} not found")
+        deps.check_empresa_access(current_user, card.empresa_id, "Not enough permissions for this card's board")
+    return cards
+
+@router.post("/bulk", response_model=List[schemas.Card])
+def create_cards_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: schemas.CardBulkCreate,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Create many cards, appended to their columns in the given order.
+    Same rules as creating one card.
+    """
+    deps.check_bulk_size(len(bulk_in.items))
+    empresas = _coluna_empresas(db, (item.coluna_id for item in bulk_in.items), current_user)
+    for item in bulk_in.items:
+        if item.empresa_id != empresas[item.coluna_id]:
+            raise HTTPException(status_code=400, detail="Card empresa_id must match the board's empresa_id")
+    return crud.card.create_many(db, objs_in=bulk_in.items)
+
+@router.put("/bulk", response_model=List[schemas.Card])
+def update_cards_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: schemas.CardBulkUpdate,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Update many cards; each item has the card id and the fields to change.
+    Same rules as updating one card.
+    """
+    deps.check_bulk_size(len(bulk_in.items))
+    cards = _get_cards(db, (item.id for item in bulk_in.items), current_user)
+    moves = [item for item in bulk_in.items if item.coluna_id and item.coluna_id != cards[item.id].coluna_id]
+    empresas = _coluna_empresas(db, (item.coluna_id for item in moves), current_user)
+    for item in moves:
+        if empresas[item.coluna_id] != cards[item.id].empresa_id:
+            raise HTTPException(status_code=400, detail="Cannot move card to a column in a different company's board")
+    return crud.card.update_many(db, objs_in=[item.dict(exclude_unset=True) for item in bulk_in.items])
+
+@router.post("/bulk/delete", response_model=schemas.BulkDeleteResult)
+def delete_cards_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: schemas.BulkDelete,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Delete many cards by id. Same rules as deleting one card.
+    """
+    deps.check_bulk_size(len(bulk_in.ids))
+    _get_cards(db, bulk_in.ids, current_user)
+    return {"deleted": crud.card.remove_many(db, ids=bulk_in.ids)}
+
 @router.get("/{card_id}", response_model=schemas.Card)
-def read_card(
+async def read_card(
     card: models.Card = Depends(get_card_empresa_user), # Checks access
 ) -> Any:
     """
@@ -86,13 +229,13 @@ def read_card(
     return card
 
 @router.put("/{card_id}", response_model=schemas.Card)
-def update_card(
+async def update_card(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     card: models.Card = Depends(get_card_empresa_user), # Checks access
     card_in: schemas.CardUpdate,
     # Any active user in the company can update a card they can access
-    current_user: models.Usuario = Depends(deps.get_current_active_user),
+    current_user: models.Usuario = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Update a card. User must belong to the company.
@@ -102,32 +245,28 @@ def update_card(
 
     # If moving the card, check access to the target column
     if card_in.coluna_id and card_in.coluna_id != card.coluna_id:
-        target_coluna = crud.coluna.get(db, id=card_in.coluna_id)
-        if not target_coluna:
+        target_empresa_id = await crud.ownership.empresa_of_async(db, models.Coluna, card_in.coluna_id)
+        if target_empresa_id is None:
             raise HTTPException(status_code=404, detail="Target coluna not found")
-        target_board = crud.board.get(db, id=target_coluna.board_id)
-        if not target_board:
-             raise HTTPException(status_code=404, detail="Board for target coluna not found")
-        if not current_user.is_superuser and target_board.empresa_id != current_user.empresa_id:
-            raise HTTPException(status_code=403, detail="Not enough permissions for the target column's board")
+        deps.check_empresa_access(current_user, target_empresa_id, "Not enough permissions for the target column's board")
         # Ensure card stays within the same company
-        if target_board.empresa_id != card.empresa_id:
+        if target_empresa_id != card.empresa_id:
              raise HTTPException(status_code=400, detail="Cannot move card to a column in a different company's board")
 
-    card = crud.card.update(db, db_obj=card, obj_in=card_in)
+    card = await crud.card.update_async(db, db_obj=card, obj_in=card_in)
     return card
 
 @router.delete("/{card_id}", response_model=schemas.Card)
-def delete_card(
+async def delete_card(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     card: models.Card = Depends(get_card_empresa_user), # Checks access
     # Any active user in the company can delete a card they can access
-    current_user: models.Usuario = Depends(deps.get_current_active_user),
+    current_user: models.Usuario = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Delete a card. User must belong to the company.
     """
     # Dependency get_card_empresa_user already checks company access
-    card = crud.card.remove(db, id=card.id)
+    card = await crud.card.remove_async(db, id=card.id)
     return card
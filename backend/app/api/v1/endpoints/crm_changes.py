@@ -0,0 +1,39 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.api import deps
+from app.crud.crud_crm_change import ChangesGone
+
+router = APIRouter()
+
+@router.get("/", response_model=schemas.CrmChanges)
+def read_changes(
+    db: Session = Depends(deps.get_db),
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(1000, ge=1, le=5000),
+    empresa_id: Optional[int] = None,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Boards, colunas, cards and tags of the company changed after version `since`,
+    one entry per row with its current data (or deleted), and the version to
+    pass as `since` next time. Without `since`, just the current version: read
+    it before loading the boards, then sync from it.
+    The same changes are pushed over the WebSocket as "crm_changes" events.
+    410 means the log no longer reaches back to `since`: reload the boards.
+    Superusers pass empresa_id.
+    """
+    if empresa_id is None:
+        empresa_id = current_user.empresa_id
+    if empresa_id is None:
+        raise HTTPException(status_code=400, detail="empresa_id is required")
+    deps.check_empresa_access(current_user, empresa_id)
+    if since is None:
+        return {"version": crud.crm_change.get_version(db, empresa_id=empresa_id)}
+    try:
+        return crud.crm_change.get_since(db, empresa_id=empresa_id, since=since, limit=limit)
+    except ChangesGone:
+        raise HTTPException(status_code=410, detail="Changes since this version are no longer available")
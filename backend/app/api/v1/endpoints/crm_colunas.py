@@ -1,11 +1,13 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
-from app.api import deps
-from app.api.v1.endpoints.crm_boards import get_board_empresa_user # Reuse dependency
+from app.api import conditional, deps
+from app.api.v1.endpoints.crm_boards import authorize_board # Reuse dependency
+from app.services.tenant_cache import encode, tenant_cache
 
 router = APIRouter()
 
@@ -15,29 +17,59 @@ def get_coluna_empresa_user(
     db: Session = Depends(deps.get_db),
     current_user: models.Usuario = Depends(deps.get_current_active_user),
 ) -> models.Coluna:
-    coluna = crud.coluna.get(db, id=coluna_id)
-    if not coluna:
+    # Coluna and its board's empresa_id in one joined query
+    found = crud.ownership.get_with_empresa(db, models.Coluna, coluna_id)
+    if not found:
         raise HTTPException(status_code=404, detail="Coluna not found")
-    # Check access via the board
-    board = crud.board.get(db, id=coluna.board_id)
-    if not board:
-         raise HTTPException(status_code=404, detail="Board associated with coluna not found") # Should not happen
-    if not current_user.is_superuser and board.empresa_id != current_user.empresa_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions for this column's board")
+    coluna, empresa_id = found
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this column's board")
     return coluna
 
-@router.get("/by_board/{board_id}", response_model=List[schemas.Coluna])
+# Same check when only the id is needed: served from the ownership cache
+def authorize_coluna(
+    coluna_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> int:
+    empresa_id = crud.ownership.empresa_of(db, models.Coluna, coluna_id)
+    if empresa_id is None:
+        raise HTTPException(status_code=404, detail="Coluna not found")
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this column's board")
+    return coluna_id
+
+async def authorize_coluna_async(
+    coluna_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: models.Usuario = Depends(deps.get_current_active_user_async),
+) -> int:
+    empresa_id = await crud.ownership.empresa_of_async(db, models.Coluna, coluna_id)
+    if empresa_id is None:
+        raise HTTPException(status_code=404, detail="Coluna not found")
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this column's board")
+    return coluna_id
+
+@router.get("/by_board/{board_id}", response_model=schemas.ColunaPage)
 def read_colunas_by_board(
-    board: models.Board = Depends(get_board_empresa_user), # Use board dependency to check access
+    board_id: int = Depends(authorize_board), # Use board dependency to check access
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
 ) -> Any:
     """
-    Retrieve colunas for a specific board. Access controlled by board access.
+    Retrieve colunas for a specific board, in order. Access controlled by board access.
+    Use next_cursor from the response to get the next page.
+    Send the ETag back as If-None-Match to get 304 if unchanged.
     """
-    colunas = crud.coluna.get_multi_by_board(db, board_id=board.id, skip=skip, limit=limit)
-    return colunas
+    def load() -> str:
+        try:
+            colunas, next_cursor = crud.coluna.get_page_by_board(db, board_id=board_id, cursor=cursor, limit=limit)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return encode(schemas.ColunaPage, {"items": colunas, "next_cursor": next_cursor})
+    empresa_id = crud.ownership.empresa_of(db, models.Board, board_id) # Cached by the dependency
+    cached = tenant_cache.get_or_load("colunas", empresa_id, ("by_board", board_id, cursor, limit), load)
+    return conditional.json_response(cached.body, cached.etag, if_none_match)
 
 @router.post("/", response_model=schemas.Coluna)
 def create_coluna(
@@ -49,26 +81,32 @@ def create_coluna(
     """
     Create new coluna for a specific board. Requires supervisor/superuser privileges for the board.
     """
-    # Obter o board primeiro para verificar permissões
-    board = crud.board.get(db, id=coluna_in.board_id)
-    if not board:
+    # Verificar se o board existe e se o usuário tem acesso a ele
+    empresa_id = crud.ownership.empresa_of(db, models.Board, coluna_in.board_id)
+    if empresa_id is None:
         raise HTTPException(status_code=404, detail="Board not found")
-        
-    # Verificar se o usuário tem acesso ao board
-    if not current_user.is_superuser and board.empresa_id != current_user.empresa_id:
-        raise HTTPException(status_code=403, detail="Not enough permissions for this board")
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this board")
 
-    coluna = crud.coluna.create_with_board(db=db, obj_in=coluna_in, board_id=board.id)
+    coluna = crud.coluna.create_with_board(db=db, obj_in=coluna_in, board_id=coluna_in.board_id)
     return coluna
 
 @router.get("/{coluna_id}", response_model=schemas.Coluna)
 def read_coluna(
-    coluna: models.Coluna = Depends(get_coluna_empresa_user), # Checks access
+    coluna_id: int = Depends(authorize_coluna), # Checks access
+    db: Session = Depends(deps.get_db),
+    if_none_match: Optional[str] = Header(None),
 ) -> Any:
     """
     Get coluna by ID. Access controlled by dependency.
     """
-    return coluna
+    def load() -> str:
+        coluna = crud.coluna.get(db, id=coluna_id)
+        if coluna is None:
+            raise HTTPException(status_code=404, detail="Coluna not found")
+        return encode(schemas.Coluna, coluna)
+    empresa_id = crud.ownership.empresa_of(db, models.Coluna, coluna_id) # Cached by the dependency
+    cached = tenant_cache.get_or_load("colunas", empresa_id, ("coluna", coluna_id), load)
+    return conditional.json_response(cached.body, cached.etag, if_none_match)
 
 @router.put("/{coluna_id}", response_model=schemas.Coluna)
 def update_coluna(
@@ -83,9 +121,8 @@ def update_coluna(
     Update a coluna. Requires supervisor/superuser privileges for the board.
     """
     # Extra check: ensure the supervisor/superuser belongs to the board's company if not superuser
-    board = crud.board.get(db, id=coluna.board_id) # Get board for company check
-    if not current_user.is_superuser and board.empresa_id != current_user.empresa_id:
-         raise HTTPException(status_code=403, detail="Not enough permissions for this board")
+    empresa_id = crud.ownership.empresa_of(db, models.Coluna, coluna.id) # Cached by the dependency
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this board")
 
     coluna = crud.coluna.update(db, db_obj=coluna, obj_in=coluna_in)
     return coluna
@@ -102,9 +139,8 @@ def delete_coluna(
     Delete a coluna. Requires supervisor/superuser privileges for the board.
     """
      # Extra check: ensure the supervisor/superuser belongs to the board's company if not superuser
-    board = crud.board.get(db, id=coluna.board_id) # Get board for company check
-    if not current_user.is_superuser and board.empresa_id != current_user.empresa_id:
-         raise HTTPException(status_code=403, detail="Not enough permissions for this board")
+    empresa_id = crud.ownership.empresa_of(db, models.Coluna, coluna.id) # Cached by the dependency
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this board")
 
     coluna = crud.coluna.remove(db, id=coluna.id)
     return coluna
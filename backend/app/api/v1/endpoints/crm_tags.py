@@ -1,10 +1,11 @@
-from typing import Any, List
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
-from app.api import deps
+from app.api import conditional, deps
+from app.services.tenant_cache import encode, tenant_cache
 
 router = APIRouter()
 
@@ -21,28 +22,50 @@ def get_tag_empresa_user(
         raise HTTPException(status_code=403, detail="Not enough permissions for this tag")
     return tag
 
-@router.get("/", response_model=List[schemas.Tag])
+# Same check when only the id is needed: served from the ownership cache
+def authorize_tag(
+    tag_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> int:
+    empresa_id = crud.ownership.empresa_of(db, models.Tag, tag_id)
+    if empresa_id is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    deps.check_empresa_access(current_user, empresa_id, "Not enough permissions for this tag")
+    return tag_id
+
+@router.get("/", response_model=schemas.TagPage)
 def read_tags(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
     current_user: models.Usuario = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve tags for the user's company.
+    Use next_cursor from the response to get the next page.
     """
     if current_user.is_superuser:
         # Superusers likely shouldn't manage tags directly, or need a filter
         # Returning empty list for now, adjust if needed.
-        tags = []
-        # Or get all tags: tags = crud.tag.get_multi(db, skip=skip, limit=limit)
+        tags, next_cursor = [], None
+        # Or get all tags: tags, next_cursor = crud.tag.get_page(db, cursor=cursor, limit=limit)
     elif current_user.empresa_id:
-        tags = crud.tag.get_multi_by_empresa(
-            db, empresa_id=current_user.empresa_id, skip=skip, limit=limit
-        )
+        # Served from the tenant cache until a tag of the company changes
+        def load() -> str:
+            try:
+                tags, next_cursor = crud.tag.get_page_by_empresa(
+                    db, empresa_id=current_user.empresa_id, cursor=cursor, limit=limit
+                )
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            return encode(schemas.TagPage, {"items": tags, "next_cursor": next_cursor})
+        cached = tenant_cache.get_or_load("tags", current_user.empresa_id, ("page", cursor, limit), load)
+        return conditional.json_response(cached.body, cached.etag, if_none_match)
     else:
-        tags = [] # User without company
-    return tags
+        tags, next_cursor = [], None # User without company
+    return {"items": tags, "next_cursor": next_cursor}
 
 @router.post("/", response_model=schemas.Tag)
 def create_tag(
@@ -76,14 +99,101 @@ def create_tag(
     tag = crud.tag.create(db=db, obj_in=tag_in)
     return tag
 
+# Bulk endpoints: many tags in one request and one transaction, all or none
+
+def _check_nomes_free(db: Session, keys: List[Tuple[int, str]]) -> None:
+    """
+    400 unless every (empresa_id, nome) pair is unique in the batch and not taken.
+    """
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail="Duplicate tag names in request")
+    taken = crud.tag.get_existing_nomes(db, keys=keys)
+    if taken:
+        nomes = ", ".join(sorted(nome for _, nome in taken))
+        raise HTTPException(status_code=400, detail=f"Tags with these names already exist for this company: {nomes}")
+
+def _get_tags(db: Session, ids: List[int], current_user: models.Usuario) -> Dict[int, models.Tag]:
+    tags = crud.tag.get_many(db, ids=ids)
+    for id in ids:
+        tag = tags.get(id)
+        if tag is None:
+            raise HTTPException(status_code=404, detail=f"Tag {id} not found")
+        deps.check_empresa_access(current_user, tag.empresa_id, "Not enough permissions for this tag")
+    return tags
+
+@router.post("/bulk", response_model=List[schemas.Tag])
+def create_tags_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: schemas.TagBulkCreate,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Create many tags. Same rules as creating one tag.
+    """
+    deps.check_bulk_size(len(bulk_in.items))
+    if not current_user.is_superuser:
+        if not current_user.empresa_id:
+            raise HTTPException(status_code=400, detail="User does not belong to a company")
+        for tag_in in bulk_in.items:
+            tag_in.empresa_id = current_user.empresa_id
+    else:
+        for empresa_id in {tag_in.empresa_id for tag_in in bulk_in.items}:
+            if not empresa_id:
+                raise HTTPException(status_code=400, detail="Superuser must specify empresa_id to create a tag")
+            if not crud.empresa.get(db, id=empresa_id):
+                raise HTTPException(status_code=404, detail=f"Empresa with id {empresa_id} not found.")
+    _check_nomes_free(db, [(tag_in.empresa_id, tag_in.nome) for tag_in in bulk_in.items])
+    return crud.tag.create_many(db, objs_in=bulk_in.items)
+
+@router.put("/bulk", response_model=List[schemas.Tag])
+def update_tags_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: schemas.TagBulkUpdate,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Update many tags; each item has the tag id and the fields to change.
+    Same rules as updating one tag.
+    """
+    deps.check_bulk_size(len(bulk_in.items))
+    tags = _get_tags(db, [item.id for item in bulk_in.items], current_user)
+    renamed = [item for item in bulk_in.items if item.nome and item.nome != tags[item.id].nome]
+    _check_nomes_free(db, [(tags[item.id].empresa_id, item.nome) for item in renamed])
+    return crud.tag.update_many(db, objs_in=[item.dict(exclude_unset=True) for item in bulk_in.items])
+
+@router.post("/bulk/delete", response_model=schemas.BulkDeleteResult)
+def delete_tags_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: schemas.BulkDelete,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Delete many tags by id. Same rules as deleting one tag.
+    """
+    deps.check_bulk_size(len(bulk_in.ids))
+    _get_tags(db, bulk_in.ids, current_user)
+    return {"deleted": crud.tag.remove_many(db, ids=bulk_in.ids)}
+
 @router.get("/{tag_id}", response_model=schemas.Tag)
 def read_tag(
-    tag: models.Tag = Depends(get_tag_empresa_user), # Checks access
+    tag_id: int = Depends(authorize_tag), # Checks access
+    db: Session = Depends(deps.get_db),
+    if_none_match: Optional[str] = Header(None),
 ) -> Any:
     """
     Get tag by ID. Access controlled by dependency.
     """
-    return tag
+    def load() -> str:
+        tag = crud.tag.get(db, id=tag_id)
+        if tag is None:
+            raise HTTPException(status_code=404, detail="Tag not found")
+        return encode(schemas.Tag, tag)
+    empresa_id = crud.ownership.empresa_of(db, models.Tag, tag_id) # Cached by the dependency
+    cached = tenant_cache.get_or_load("tags", empresa_id, ("tag", tag_id), load)
+    return conditional.json_response(cached.body, cached.etag, if_none_match)
 
 @router.put("/{tag_id}", response_model=schemas.Tag)
 def update_tag(
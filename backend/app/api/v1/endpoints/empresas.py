@@ -1,6 +1,6 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
@@ -8,18 +8,21 @@ from app.api import deps
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.Empresa])
+@router.get("/", response_model=schemas.EmpresaPage)
 def read_empresas(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200),
     current_user: models.Usuario = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
-    Retrieve empresas (Superuser only).
+    Retrieve empresas (Superuser only). Use next_cursor from the response to get the next page.
     """
-    empresas = crud.empresa.get_multi(db, skip=skip, limit=limit)
-    return empresas
+    try:
+        empresas, next_cursor = crud.empresa.get_page(db, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": empresas, "next_cursor": next_cursor}
 
 @router.post("/", response_model=schemas.Empresa)
 def create_empresa(
@@ -1,15 +1,23 @@
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Body, Request
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import requests # To interact with Evolution API
-import json
+from starlette.concurrency import run_in_threadpool
 import logging
+import string
 
 from app import crud, models, schemas
-from app.api import deps
+from app.api import conditional, deps
+from app.core import serialization
 from app.core.config import settings
+from app.core.etag import body_etag, etag_matches, weak_etag
 from app.services.websocket_manager import manager # To potentially notify frontend
+from app.services.bulk_sender import BulkSendJob, bulk_dispatcher
+from app.services.evolution_client import EvolutionAPIError, EvolutionTarget, evolution_client # To interact with Evolution API
+from app.services.evolution_webhook import apply_webhook_event_async, broadcast_webhook_events
+from app.services.qr_store import qr_store
+from app.services.webhook_queue import get_webhook_queue
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -27,26 +35,44 @@ def get_instancia_empresa_user(
         raise HTTPException(status_code=403, detail="Not enough permissions for this instancia")
     return instancia
 
-@router.get("/", response_model=List[schemas.InstanciaEvolution])
+@router.get("/", response_model=schemas.InstanciaEvolutionPage)
 def read_instancias(
+    response: Response,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200),
+    if_none_match: Optional[str] = Header(None),
     current_user: models.Usuario = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve instancias Evolution for the user's company.
+    Use next_cursor from the response to get the next page.
+    Send the ETag back as If-None-Match to get 304 if no instancia changed.
     """
     if current_user.is_superuser:
-        # Decide if superuser should see all instancias or needs a filter
-        instancias = crud.instancia_evolution.get_multi(db, skip=skip, limit=limit)
+        scope, fingerprint = "all", crud.instancia_evolution.get_fingerprint(db)
     elif current_user.empresa_id:
-        instancias = crud.instancia_evolution.get_multi_by_empresa(
-            db, empresa_id=current_user.empresa_id, skip=skip, limit=limit
-        )
+        scope = current_user.empresa_id
+        fingerprint = crud.instancia_evolution.get_fingerprint_by_empresa(db, empresa_id=scope)
     else:
-        instancias = [] # User without company
-    return instancias
+        scope, fingerprint = None, None
+    etag = weak_etag("instancias", scope, fingerprint, cursor, limit)
+    if etag_matches(if_none_match, etag):
+        return conditional.not_modified(etag)
+    conditional.set_etag(response, etag)
+    try:
+        if current_user.is_superuser:
+            # Decide if superuser should see all instancias or needs a filter
+            instancias, next_cursor = crud.instancia_evolution.get_page(db, cursor=cursor, limit=limit)
+        elif current_user.empresa_id:
+            instancias, next_cursor = crud.instancia_evolution.get_page_by_empresa(
+                db, empresa_id=current_user.empresa_id, cursor=cursor, limit=limit
+            )
+        else:
+            instancias, next_cursor = [], None # User without company
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": instancias, "next_cursor": next_cursor}
 
 @router.post("/", response_model=schemas.InstanciaEvolution)
 def create_instancia(
@@ -133,7 +159,7 @@ def delete_instancia(
 # --- Evolution API Interaction Endpoints ---
 
 @router.post("/{instancia_id}/connect", response_model=schemas.InstanciaQRCode)
-def connect_instancia(
+async def connect_instancia(
     *,
     db: Session = Depends(deps.get_db),
     instancia: models.InstanciaEvolution = Depends(get_instancia_empresa_user),
@@ -145,45 +171,69 @@ def connect_instancia(
     """
     if not instancia.api_endpoint or not instancia.api_key:
         raise HTTPException(status_code=400, detail="API Endpoint or API Key not configured for this instancia.")
+    target = EvolutionTarget.from_instancia(instancia)
 
-    # Update status locally
-    crud.instancia_evolution.update_status(db, db_obj=instancia, status="connecting")
-    crud.instancia_evolution.update_qr_code(db, db_obj=instancia, qr_code=None) # Clear old QR
+    # Update status locally and clear old QR
+    await run_in_threadpool(qr_store.clear, instancia.id)
+    await run_in_threadpool(
+        crud.instancia_evolution.update_state,
+        db, db_obj=instancia, obj_in={"status_conexao": "connecting"}
+    )
 
     # Call Evolution API to create/connect instance
-    evolution_url = f"{str(instancia.api_endpoint).rstrip('/')}/instance/connect/{instancia.nome_instancia}"
-    headers = {"apikey": instancia.api_key}
-
     try:
-        response = requests.post(evolution_url, headers=headers, timeout=30)
-        response.raise_for_status() # Raise exception for bad status codes
-        data = response.json()
+        data = await evolution_client.connect_instance(target)
 
         qr_code = data.get("base64")
         status = "qr_code_needed" if qr_code else "connected" # Assume connected if no QR
 
-        # Update local status and QR code
-        crud.instancia_evolution.update_status(db, db_obj=instancia, status=status)
-        crud.instancia_evolution.update_qr_code(db, db_obj=instancia, qr_code=qr_code)
+        # Update local status; the QR code goes to the QR store, served by GET /{instancia_id}/qrcode
+        qr_version = await run_in_threadpool(qr_store.put, instancia.id, qr_code) if qr_code else None
+        await run_in_threadpool(
+            crud.instancia_evolution.update_state,
+            db, db_obj=instancia, obj_in={"status_conexao": status}
+        )
 
         # Notify frontend via WebSocket (optional)
-        # await manager.broadcast_to_empresa(json.dumps({"type": "instance_status", "instance_id": instancia.id, "status": status, "qr_code": qr_code}), instancia.empresa_id)
+        # await manager.broadcast_to_empresa({"type": "instance_status", "instance_id": instancia.id, "status": status, "qr_version": qr_version}, instancia.empresa_id)
 
-        return {"qr_code": qr_code, "status": status}
+        return {"qr_version": qr_version, "status": status}
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error connecting to Evolution API for instance {instancia.nome_instancia}: {e}")
-        crud.instancia_evolution.update_status(db, db_obj=instancia, status="connection_error")
+    except EvolutionAPIError as e:
+        logger.error(f"Error connecting to Evolution API for instance {target.nome_instancia}: {e}")
+        await run_in_threadpool(crud.instancia_evolution.update_status, db, db_obj=instancia, status="connection_error")
         raise HTTPException(status_code=503, detail=f"Failed to connect to Evolution API: {e}")
     except Exception as e:
-        logger.error(f"Unexpected error during Evolution connection for instance {instancia.nome_instancia}: {e}")
-        crud.instancia_evolution.update_status(db, db_obj=instancia, status="error")
+        logger.error(f"Unexpected error during Evolution connection for instance {target.nome_instancia}: {e}")
+        await run_in_threadpool(crud.instancia_evolution.update_status, db, db_obj=instancia, status="error")
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
+@router.get("/{instancia_id}/qrcode", response_class=Response, responses={200: {"content": {"image/png": {}}}})
+def read_qr_code(
+    instancia: models.InstanciaEvolution = Depends(get_instancia_empresa_user), # Checks access
+    if_none_match: Optional[str] = Header(None),
+) -> Any:
+    """
+    Current QR code of the instancia as a PNG, 404 if there is none (connected,
+    or expired: call connect again). The version is in X-QR-Version; send the
+    ETag back as If-None-Match to get 304 while the code hasn't changed.
+    """
+    qr = qr_store.get(instancia.id)
+    if qr is None:
+        raise HTTPException(status_code=404, detail="No QR code for this instancia")
+    etag = body_etag(qr.png)
+    headers = {"X-QR-Version": str(qr.version)}
+    if etag_matches(if_none_match, etag):
+        response = conditional.not_modified(etag)
+        response.headers.update(headers)
+        return response
+    response = Response(content=qr.png, media_type="image/png", headers=headers)
+    conditional.set_etag(response, etag)
+    return response
+
 @router.post("/{instancia_id}/send", status_code=202) # Accepted
-def send_message(
+async def send_message(
     *,
-    db: Session = Depends(deps.get_db),
     instancia: models.InstanciaEvolution = Depends(get_instancia_empresa_user),
     payload: schemas.SendMessagePayload,
     current_user: models.Usuario = Depends(deps.get_current_active_user), # Any active user can send
@@ -193,101 +243,143 @@ def send_message(
     """
     if not instancia.api_endpoint or not instancia.api_key or instancia.status_conexao != "connected":
         raise HTTPException(status_code=400, detail="Instancia not configured or not connected.")
-
-    evolution_url = f"{str(instancia.api_endpoint).rstrip('/')}/message/sendText/{instancia.nome_instancia}"
-    headers = {"apikey": instancia.api_key, "Content-Type": "application/json"}
+    target = EvolutionTarget.from_instancia(instancia)
 
     try:
-        response = requests.post(evolution_url, headers=headers, json=payload.dict(), timeout=15)
-        response.raise_for_status()
+        await evolution_client.send_text(target, payload.dict())
         # Log success or handle response if needed
-        logger.info(f"Message sent via instance {instancia.nome_instancia} to {payload.number}")
+        logger.info(f"Message sent via instance {target.nome_instancia} to {payload.number}")
         return {"status": "Message sent request accepted"}
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error sending message via Evolution API for instance {instancia.nome_instancia}: {e}")
+    except EvolutionAPIError as e:
+        logger.error(f"Error sending message via Evolution API for instance {target.nome_instancia}: {e}")
         raise HTTPException(status_code=503, detail=f"Failed to send message via Evolution API: {e}")
     except Exception as e:
-        logger.error(f"Unexpected error sending message for instance {instancia.nome_instancia}: {e}")
+        logger.error(f"Unexpected error sending message for instance {target.nome_instancia}: {e}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
+class _TemplateValues(dict):
+    # Leave unknown {placeholders} untouched instead of raising KeyError
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+def _render_template(text: str, variables: Dict[str, Any]) -> str:
+    try:
+        # Only plain {name} placeholders: no positional "{}"/"{0}", no "{x.y}"/"{x[0]}" lookups
+        for _, field_name, _, _ in string.Formatter().parse(text):
+            if field_name is not None and not field_name.isidentifier():
+                raise ValueError(f"unsupported placeholder {{{field_name}}}")
+        return text.format_map(_TemplateValues(variables))
+    except (ValueError, IndexError, AttributeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid message template: {e}")
+
+@router.post("/{instancia_id}/send/bulk", response_model=schemas.BulkSendJobStatus, status_code=202)
+async def send_bulk_message(
+    *,
+    instancia: models.InstanciaEvolution = Depends(get_instancia_empresa_user),
+    payload: schemas.BulkSendPayload,
+    current_user: models.Usuario = Depends(deps.get_current_active_user), # Any active user can send
+) -> Any:
+    """
+    Queue a bulk/broadcast send and return the job immediately.
+    Messages are dispatched in the background respecting the instancia's send rate.
+    Progress is pushed as "bulk_send_progress" WebSocket events.
+    """
+    if not instancia.api_endpoint or not instancia.api_key or instancia.status_conexao != "connected":
+        raise HTTPException(status_code=400, detail="Instancia not configured or not connected.")
+
+    if payload.messages:
+        messages = [message.dict() for message in payload.messages]
+    elif payload.text and payload.recipients:
+        messages = [
+            {
+                "number": recipient.number,
+                "textMessage": {"text": _render_template(payload.text, recipient.variables)},
+            }
+            for recipient in payload.recipients
+        ]
+    else:
+        raise HTTPException(status_code=400, detail="Provide either messages or text with recipients.")
+    if len(messages) > settings.BULK_SEND_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=400, detail=f"Bulk sends are limited to {settings.BULK_SEND_MAX_MESSAGES} messages."
+        )
+
+    job = await bulk_dispatcher.submit(BulkSendJob(
+        instancia_id=instancia.id,
+        empresa_id=instancia.empresa_id,
+        target=EvolutionTarget.from_instancia(instancia),
+        messages=messages,
+    ))
+    logger.info(f"Bulk send job {job.id} queued for instance {instancia.nome_instancia}: {job.total} messages")
+    return job.snapshot()
+
+@router.get("/{instancia_id}/send/bulk/{job_id}", response_model=schemas.BulkSendJobStatus)
+async def read_bulk_send_job(
+    job_id: str,
+    instancia: models.InstanciaEvolution = Depends(get_instancia_empresa_user), # Checks access
+) -> Any:
+    """
+    Get progress of a bulk send job.
+    """
+    snapshot = await bulk_dispatcher.get_status(job_id)
+    if not snapshot or snapshot["instancia_id"] != instancia.id:
+        raise HTTPException(status_code=404, detail="Bulk send job not found")
+    return snapshot
+
+@router.delete("/{instancia_id}/send/bulk/{job_id}", response_model=schemas.BulkSendJobStatus)
+async def cancel_bulk_send_job(
+    job_id: str,
+    instancia: models.InstanciaEvolution = Depends(get_instancia_empresa_user), # Checks access
+) -> Any:
+    """
+    Cancel a queued or running bulk send job. Messages already sent are not affected.
+    """
+    snapshot = await bulk_dispatcher.get_status(job_id)
+    if not snapshot or snapshot["instancia_id"] != instancia.id:
+        raise HTTPException(status_code=404, detail="Bulk send job not found")
+    return await bulk_dispatcher.cancel(job_id)
+
 # --- Webhook Endpoint ---
 # This endpoint should be configured in the Evolution API instance settings
 @router.post("/webhook/{instancia_nome}", include_in_schema=False) # Hide from OpenAPI docs
 async def evolution_webhook(
     instancia_nome: str,
     request: Request,
-    db: Session = Depends(deps.get_db),
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
 ):
     """
     Handle incoming webhooks from a specific Evolution API instance.
+    In "queue" ingestion mode the raw body is enqueued and processed by the
+    webhook workers; otherwise it is processed before returning.
     """
-    payload = await request.json()
-    logger.info(f"Webhook received for instance {instancia_nome}: {json.dumps(payload)}")
-
     # Find the corresponding instancia in our DB
-    instancia = crud.instancia_evolution.get_by_nome_instancia(db, nome_instancia=instancia_nome)
+    instancia = await crud.instancia_evolution.get_by_nome_instancia_async(db, nome_instancia=instancia_nome)
     if not instancia:
         logger.error(f"Webhook received for unknown instance: {instancia_nome}")
         # Return 200 to Evolution so it doesn't retry, but log the error
         return {"status": "Instance not found"}
 
-    # Update last webhook received time
-    crud.instancia_evolution.update(db, db_obj=instancia, obj_in={"last_webhook_received": datetime.utcnow()})
-
-    # Process the webhook payload based on its type
-    event_type = payload.get("event")
-
-    if event_type == "connection.update":
-        new_status = payload.get("data", {}).get("state", "disconnected")
-        crud.instancia_evolution.update_status(db, db_obj=instancia, status=new_status)
-        crud.instancia_evolution.update_qr_code(db, db_obj=instancia, qr_code=None) # Clear QR on status update
-        logger.info(f"Instance {instancia_nome} status updated to: {new_status}")
-        # Notify frontend via WebSocket
-        await manager.broadcast_to_empresa(json.dumps({
-            "type": "instance_status",
-            "instance_id": instancia.id,
-            "status": new_status
-        }), instancia.empresa_id)
-
-    elif event_type == "qrcode.updated":
-        qr_code = payload.get("data", {}).get("qrcode", {}).get("base64")
-        crud.instancia_evolution.update_status(db, db_obj=instancia, status="qr_code_needed")
-        crud.instancia_evolution.update_qr_code(db, db_obj=instancia, qr_code=qr_code)
-        logger.info(f"Instance {instancia_nome} QR code updated.")
-        # Notify frontend via WebSocket
-        await manager.broadcast_to_empresa(json.dumps({
-            "type": "instance_status",
-            "instance_id": instancia.id,
-            "status": "qr_code_needed",
-            "qr_code": qr_code
-        }), instancia.empresa_id)
-
-    elif event_type == "messages.upsert":
-        messages = payload.get("data", [])
-        for message in messages:
-            # Process incoming message
-            # 1. Identify sender number (e.g., message.get('key', {}).get('remoteJid'))
-            # 2. Get message content (e.g., message.get('message', {}).get('conversation'))
-            # 3. Find or create contact in CRM
-            # 4. Create new conversation or append to existing one
-            # 5. Store the message in the database
-            # 6. Notify relevant agents via WebSocket
-            logger.info(f"Received message for instance {instancia_nome}: {message.get('key', {}).get('remoteJid')} - {message.get('message', {}).get('conversation')}")
-            # --- Placeholder for message processing logic --- #
-            sender_jid = message.get('key', {}).get('remoteJid')
-            content = message.get('message', {}).get('conversation')
-            if sender_jid and content:
-                await manager.broadcast_to_empresa(json.dumps({
-                    "type": "new_message",
-                    "instance_id": instancia.id,
-                    "sender": sender_jid,
-                    "content": content
-                    # Add more message details as needed
-                }), instancia.empresa_id)
-            # --- End Placeholder --- #
-
-    # Add handling for other event types as needed (e.g., message acknowledgements)
+    if settings.WEBHOOK_INGESTION_MODE == "queue":
+        body = await request.body()
+        if not get_webhook_queue().enqueue(instancia_nome, body.decode("utf-8")):
+            logger.warning(f"Webhook queue full, dropping webhook for instance {instancia_nome}")
+            raise HTTPException(status_code=503, detail="Webhook queue full")
+        response.status_code = 202
+        return {"status": "Webhook queued"}
+
+    body = await request.body()
+    payload = serialization.loads(body)
+    logger.info(f"Webhook received for instance {instancia_nome}: {payload.get('event')}")
+    if logger.isEnabledFor(logging.DEBUG):
+        # Log the raw body rather than re-encoding the payload
+        logger.debug(f"Webhook payload for instance {instancia_nome}: {body.decode('utf-8', 'replace')}")
+
+    empresa_id = instancia.empresa_id
+    events = await apply_webhook_event_async(db, instancia, payload)
+    # Notify frontend via WebSocket
+    await broadcast_webhook_events(events, empresa_id)
 
     return {"status": "Webhook received"}
 
@@ -1,32 +1,54 @@
+import time
 from datetime import timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, schemas, models # Add models import here
 from app.api import deps
 from app.core import security
 from app.core.config import settings
+from app.core.metrics import Counter, Histogram, registry
 
 router = APIRouter()
 
+# Login throughput
+_logins_succeeded = Counter()
+_logins_failed = Counter()
+_login_latency = Histogram()
+
+def login_stats() -> dict:
+    return {
+        "succeeded": _logins_succeeded.value,
+        "failed": _logins_failed.value,
+        "rehashed": crud.usuario.rehashed.value,
+        "latency_seconds": _login_latency.snapshot(),
+    }
+
+registry.register("login", login_stats)
+
 @router.post("/login/access-token", response_model=schemas.Token)
-def login_access_token(
-    db: Session = Depends(deps.get_db),
+async def login_access_token(
+    db: AsyncSession = Depends(deps.get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.usuario.authenticate(
+    started = time.perf_counter()
+    user = await crud.usuario.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
+    _login_latency.observe(time.perf_counter() - started)
     if not user:
+        _logins_failed.inc()
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not crud.usuario.is_active(user):
+        _logins_failed.inc()
         raise HTTPException(status_code=400, detail="Inactive user")
+    _logins_succeeded.inc()
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
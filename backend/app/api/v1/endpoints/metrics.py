@@ -0,0 +1,18 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from app import models
+from app.api import deps
+from app.core.metrics import registry
+
+router = APIRouter()
+
+@router.get("/")
+def read_metrics(
+    current_user: models.Usuario = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Snapshot of in-process service metrics (Superuser only).
+    """
+    return registry.snapshot()
@@ -1,6 +1,7 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
@@ -8,35 +9,73 @@ from app.api import deps
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.Usuario])
+@router.get("/", response_model=schemas.UsuarioPage)
 def read_users(
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=200),
     current_user: models.Usuario = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
-    Retrieve users (Superuser only).
+    Retrieve users (Superuser only). Use next_cursor from the response to get the next page.
     """
-    users = crud.usuario.get_multi(db, skip=skip, limit=limit)
-    return users
+    try:
+        users, next_cursor = crud.usuario.get_page(db, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": users, "next_cursor": next_cursor}
+
+def _check_can_create(
+    current_user: models.Usuario, user_in: schemas.UsuarioCreate, empresa: Optional[models.Empresa]
+) -> None:
+    """
+    Enforce who can create whom; fills in empresa_id for company admins.
+    empresa is the row of user_in.empresa_id, looked up by the caller when a
+    superuser creates the user.
+    """
+    if not current_user.is_superuser:
+        if user_in.is_superuser:
+             raise HTTPException(status_code=403, detail="Not enough permissions to create a superuser.")
+        if user_in.empresa_id != current_user.empresa_id:
+             raise HTTPException(status_code=403, detail="Cannot create users for other companies.")
+        # Ensure non-superusers don't create users without assigning them to their company
+        if not user_in.empresa_id:
+             user_in.empresa_id = current_user.empresa_id
+    else: # Superuser creating user
+        if user_in.empresa_id and not empresa:
+            raise HTTPException(status_code=404, detail=f"Empresa with id {user_in.empresa_id} not found.")
+        # Superuser can create another superuser (empresa_id should be None)
+        if user_in.is_superuser and user_in.empresa_id:
+             raise HTTPException(status_code=400, detail="Superusers cannot belong to a specific company.")
+
+def _check_can_update(current_user: models.Usuario, user: models.Usuario, user_in: schemas.UsuarioUpdate) -> None:
+    if not current_user.is_superuser:
+        if user.empresa_id != current_user.empresa_id:
+            raise HTTPException(status_code=403, detail="Cannot update users from other companies.")
+        # Prevent non-superusers from making others superusers or changing company
+        if user_in.is_superuser is True:
+             raise HTTPException(status_code=403, detail="Not enough permissions to make a user superuser.")
+        if user_in.empresa_id is not None and user_in.empresa_id != current_user.empresa_id:
+             raise HTTPException(status_code=403, detail="Cannot change user's company.")
+        # Potentially add more granular checks (e.g., admin can update agent/supervisor, supervisor can update agent)
 
 @router.post("/", response_model=schemas.Usuario)
-def create_user(
+async def create_user(
     *, # Force keyword arguments
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     user_in: schemas.UsuarioCreate,
     # Only superuser or admin of the same company can create users
     # For MVP, let's simplify: Superuser creates admins/users for companies
     # Admin of a company creates agents/supervisors for their company
-    current_user: models.Usuario = Depends(deps.get_current_active_user),
+    current_user: models.Usuario = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Create new user.
     Superusers can create users for any company or other superusers.
     Admins (non-superusers) can create users (agents/supervisors) for their own company.
+    Async so the password hash is awaited instead of blocking a threadpool thread.
     """
-    user = crud.usuario.get_by_email(db, email=user_in.email)
+    user = await crud.usuario.get_by_email_async(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
@@ -44,26 +83,64 @@ def create_user(
         )
 
     # Logic to enforce who can create whom
-    if not current_user.is_superuser:
-        if user_in.is_superuser:
-             raise HTTPException(status_code=403, detail="Not enough permissions to create a superuser.")
-        if user_in.empresa_id != current_user.empresa_id:
-             raise HTTPException(status_code=403, detail="Cannot create users for other companies.")
-        # Ensure non-superusers don't create users without assigning them to their company
-        if not user_in.empresa_id:
-             user_in.empresa_id = current_user.empresa_id
-    else: # Superuser creating user
-        if user_in.empresa_id:
-            empresa = crud.empresa.get(db, id=user_in.empresa_id)
-            if not empresa:
-                raise HTTPException(status_code=404, detail=f"Empresa with id {user_in.empresa_id} not found.")
-        # Superuser can create another superuser (empresa_id should be None)
-        if user_in.is_superuser and user_in.empresa_id:
-             raise HTTPException(status_code=400, detail="Superusers cannot belong to a specific company.")
+    empresa = None
+    if current_user.is_superuser and user_in.empresa_id:
+        empresa = await crud.empresa.get_async(db, id=user_in.empresa_id)
+    _check_can_create(current_user, user_in, empresa)
 
-    user = crud.usuario.create(db=db, obj_in=user_in)
+    user = await crud.usuario.create_async(db, obj_in=user_in)
     return user
 
+# Bulk endpoints: many users in one request and one transaction, all or none.
+# Passwords are hashed in parallel on the password pool.
+
+@router.post("/bulk", response_model=List[schemas.Usuario])
+def create_users_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: schemas.UsuarioBulkCreate,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Create many users. Same rules as creating one user.
+    """
+    deps.check_bulk_size(len(bulk_in.items))
+    emails = [user_in.email for user_in in bulk_in.items]
+    if len(set(emails)) != len(emails):
+        raise HTTPException(status_code=400, detail="Duplicate emails in request")
+    existing = crud.usuario.get_existing_emails(db, emails=emails)
+    if existing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Users with these emails already exist in the system: {', '.join(sorted(existing))}",
+        )
+    for user_in in bulk_in.items:
+        empresa = None
+        if current_user.is_superuser and user_in.empresa_id:
+            empresa = crud.empresa.get(db, id=user_in.empresa_id)
+        _check_can_create(current_user, user_in, empresa)
+    return crud.usuario.create_many(db, objs_in=bulk_in.items)
+
+@router.put("/bulk", response_model=List[schemas.Usuario])
+def update_users_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: schemas.UsuarioBulkUpdate,
+    current_user: models.Usuario = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Update many users; each item has the user id and the fields to change.
+    Same rules as updating one user.
+    """
+    deps.check_bulk_size(len(bulk_in.items))
+    users = crud.usuario.get_many(db, ids=[item.id for item in bulk_in.items])
+    for item in bulk_in.items:
+        user = users.get(item.id)
+        if not user:
+            raise HTTPException(status_code=404, detail=f"User {item.id} does not exist in the system")
+        _check_can_update(current_user, user, item)
+    return crud.usuario.update_many(db, objs_in=[item.dict(exclude_unset=True) for item in bulk_in.items])
+
 @router.get("/me", response_model=schemas.Usuario)
 def read_user_me(
     current_user: models.Usuario = Depends(deps.get_current_active_user),
@@ -74,13 +151,13 @@ def read_user_me(
     return current_user
 
 @router.put("/me", response_model=schemas.Usuario)
-def update_user_me(
+async def update_user_me(
     *, # Force keyword arguments
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     password: str = None,
     nome: str = None,
     email: str = None,
-    current_user: models.Usuario = Depends(deps.get_current_active_user),
+    current_user: models.Usuario = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Update own user.
@@ -91,7 +168,8 @@ def update_user_me(
         email=email
     ).dict(exclude_unset=True)
 
-    user = crud.usuario.update(db, db_obj=current_user, obj_in=current_user_data)
+    user = await crud.usuario.get_async(db, id=current_user.id)
+    user = await crud.usuario.update_async(db, db_obj=user, obj_in=current_user_data)
     return user
 
 @router.get("/{user_id}", response_model=schemas.Usuario)
@@ -136,20 +214,20 @@ def read_user_by_id(
     return user
 
 @router.put("/{user_id}", response_model=schemas.Usuario)
-def update_user(
+async def update_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     user_id: int,
     user_in: schemas.UsuarioUpdate,
     # Only superuser or admin/supervisor of the same company can update users
-    current_user: models.Usuario = Depends(deps.get_current_active_user),
+    current_user: models.Usuario = Depends(deps.get_current_active_user_async),
 ) -> Any:
     """
     Update a user.
     Superusers can update any user.
     Admins/Supervisors can update users within their own company (with restrictions).
     """
-    user = crud.usuario.get(db, id=user_id)
+    user = await crud.usuario.get_async(db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -157,16 +235,8 @@ def update_user(
         )
 
     # Permission checks
-    if not current_user.is_superuser:
-        if user.empresa_id != current_user.empresa_id:
-            raise HTTPException(status_code=403, detail="Cannot update users from other companies.")
-        # Prevent non-superusers from making others superusers or changing company
-        if user_in.is_superuser is True:
-             raise HTTPException(status_code=403, detail="Not enough permissions to make a user superuser.")
-        if user_in.empresa_id is not None and user_in.empresa_id != current_user.empresa_id:
-             raise HTTPException(status_code=403, detail="Cannot change user's company.")
-        # Potentially add more granular checks (e.g., admin can update agent/supervisor, supervisor can update agent)
+    _check_can_update(current_user, user, user_in)
 
-    user = crud.usuario.update(db, db_obj=user, obj_in=user_in)
+    user = await crud.usuario.update_async(db, db_obj=user, obj_in=user_in)
     return user
 
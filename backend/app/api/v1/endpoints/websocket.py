@@ -4,6 +4,7 @@ import json
 
 from app.services.websocket_manager import manager
 from app.api import deps
+from app.core import serialization
 from app import models, schemas
 
 router = APIRouter()
@@ -37,27 +38,43 @@ async def websocket_endpoint(
     # await manager.broadcast_to_empresa(json.dumps({"type": "user_connect", "user_id": user_id}), empresa_id, exclude_user_id=user_id)
     try:
         while True:
-            data = await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
             # Process received message (e.g., chat message)
             # For MVP, we might just broadcast or handle specific commands
-            message_data = json.loads(data)
+            try:
+                if message.get("bytes") is not None:
+                    # msgpack subprotocol clients send binary frames
+                    message_data = serialization.unpackb(message["bytes"])
+                else:
+                    message_data = json.loads(message.get("text") or "")
+            except Exception:
+                await manager.send_personal_message({"type": "error", "detail": "Invalid message"}, empresa_id, user_id)
+                continue
+            if not isinstance(message_data, dict):
+                await manager.send_personal_message({"type": "error", "detail": "Messages must be objects"}, empresa_id, user_id)
+                continue
             # Example: Broadcasting a chat message to the same company
             if message_data.get("type") == "chat_message":
                 await manager.broadcast_to_empresa(
-                    json.dumps({
+                    {
                         "type": "chat_message",
                         "sender_id": user_id,
                         "content": message_data.get("content", "")
-                    }),
+                    },
                     empresa_id,
                     # exclude_user_id=user_id # Don't exclude sender if they need to see their own message
                 )
             else:
                  # Send confirmation back to sender or handle other types
-                 await manager.send_personal_message(f"Message received: {data}", empresa_id, user_id)
+                 # Events are JSON objects: msgpack connections get them re-encoded
+                 await manager.send_personal_message({"type": "message_received", "data": message_data}, empresa_id, user_id)
 
     except WebSocketDisconnect:
-        manager.disconnect(empresa_id, user_id)
+        pass
+    finally:
+        # Also on errors, so the connection and its writer don't leak
+        manager.disconnect(empresa_id, user_id, websocket)
         # Notify others (optional)
         # await manager.broadcast_to_empresa(json.dumps({"type": "user_disconnect", "user_id": user_id}), empresa_id)
-
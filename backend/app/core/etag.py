@@ -0,0 +1,32 @@
+import hashlib
+from typing import Any, Optional, Union
+
+# Entity tags for conditional GETs (If-None-Match / 304 Not Modified).
+# - strong: a hash of the exact response body
+# - weak (W/"..."): a hash of whatever identifies the body's version, e.g.
+#   (max(updated_at), count) of the rows plus the request parameters
+
+
+def body_etag(body: Union[str, bytes]) -> str:
+    if isinstance(body, str):
+        body = body.encode()
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def weak_etag(*parts: Any) -> str:
+    return 'W/"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match check with weak comparison (RFC 9110 13.1.2).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(tag.strip()) == _opaque(etag) for tag in if_none_match.split(","))
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
@@ -0,0 +1,65 @@
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence
+
+# Lightweight in-process metrics. Services register a snapshot callable
+# under a name and the /metrics endpoint returns all of them as JSON.
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets: List[float] = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + [float("inf")], self._counts):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "avg": (self._sum / self._count) if self._count else 0.0,
+                "buckets": buckets,
+            }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def register(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: provider() for name, provider in self._providers.items()}
+
+
+registry = MetricsRegistry()
@@ -1,11 +1,16 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Union, Any
+from typing import Any, List, Optional, Sequence, Tuple, Union
 from jose import jwt
 
 from app.core.config import settings
+from app.core.metrics import Counter, Histogram, registry
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 ALGORITHM = settings.ALGORITHM
 
@@ -21,9 +26,94 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# --- Password hashing pool ---
+# bcrypt costs ~100-300 ms of CPU per call. It runs on a dedicated, separately
+# sized pool so a burst of logins can't occupy the threadpool that serves the
+# sync endpoints. Sync callers block on the result; async callers await it.
+
+_password_pool: Optional[Executor] = None
+_password_pool_lock = threading.Lock()
+_password_latency = Histogram()
+_password_pending = Counter()
+_password_ops = Counter()
+
+def _get_password_pool() -> Executor:
+    global _password_pool
+    if _password_pool is None:
+        with _password_pool_lock:
+            if _password_pool is None:
+                workers = settings.PASSWORD_HASH_WORKERS
+                if settings.PASSWORD_HASH_POOL == "process":
+                    _password_pool = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    # bcrypt releases the GIL, so threads hash in parallel
+                    _password_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+    return _password_pool
+
+def shutdown_password_pool() -> None:
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is not None:
+            _password_pool.shutdown(wait=False, cancel_futures=True)
+            _password_pool = None
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _submit(fn, *args):
+    _password_pending.inc()
+    started = time.perf_counter()
+    future = _get_password_pool().submit(fn, *args)
+
+    def done(_):
+        _password_pending.inc(-1)
+        _password_ops.inc()
+        _password_latency.observe(time.perf_counter() - started)
+
+    future.add_done_callback(done)
+    return future
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _submit(_verify, plain_password, hashed_password).result()
+
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _submit(_hash, password).result()
+
+def get_password_hashes(passwords: Sequence[str]) -> List[str]:
+    """
+    Hash several passwords at once, spread over the password pool's workers.
+    """
+    futures = [_submit(_hash, password) for password in passwords]
+    return [future.result() for future in futures]
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(_submit(_verify, plain_password, hashed_password))
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password; when valid and the hash uses outdated settings (e.g. a
+    lower BCRYPT_ROUNDS), also return a new hash to store.
+    """
+    return await asyncio.wrap_future(_submit(_verify_and_update, plain_password, hashed_password))
+
+def password_pool_stats() -> dict:
+    return {
+        "pool": settings.PASSWORD_HASH_POOL,
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "pending": _password_pending.value,
+        "operations": _password_ops.value,
+        "latency_seconds": _password_latency.snapshot(),
+    }
+
+registry.register("password_hashing", password_pool_stats)
 
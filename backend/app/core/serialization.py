@@ -0,0 +1,56 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+# Fast JSON encoding for hot paths (WebSocket frames, backplane envelopes).
+# orjson is used when installed; the stdlib fallback produces the same
+# compact output, with datetimes as ISO 8601 strings.
+
+try:
+    import orjson
+except ImportError: # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError: # pragma: no cover - depends on the environment
+    msgpack = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode("utf-8")
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def packb(obj: Any) -> bytes:
+    """
+    msgpack encoding, for clients that negotiate the msgpack subprotocol.
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    """
+    Decode a msgpack frame sent by a client on the msgpack subprotocol.
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.unpackb(data, raw=False)
@@ -0,0 +1,12 @@
+from .crud_empresa import empresa  # noqa
+from .crud_usuario import usuario  # noqa
+from .crud_board import board  # noqa
+from .crud_coluna import coluna  # noqa
+from .crud_card import card  # noqa
+from .crud_tag import tag  # noqa
+from .crud_ownership import ownership  # noqa
+from .crud_crm_change import crm_change  # noqa
+from .crud_instancia_evolution import instancia_evolution  # noqa
+from .crud_contato import contato  # noqa
+from .crud_conversa import conversa  # noqa
+from .crud_mensagem import mensagem  # noqa
@@ -1,15 +1,42 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, delete, func, insert, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
 
+from app.core.config import settings
+from app.crud.pagination import paginate, paginate_async
 from app.db.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Values the DB drivers bind as they are; anything else in a schema (HttpUrl,
+# EmailStr subclasses, enums...) goes through its JSON form
+_NATIVE_TYPES = (str, int, float, bool, bytes, datetime, date, time, Decimal, dict, list, type(None))
+
+
+def column_values(obj_in: Union[BaseModel, Dict[str, Any]], *, exclude_unset: bool = False) -> Dict[str, Any]:
+    """
+    Field values of a schema ready to bind as column values. Datetimes stay
+    native; the JSON dump is only taken when some field needs it.
+    """
+    if isinstance(obj_in, dict):
+        return obj_in
+    values = obj_in.model_dump(exclude_unset=exclude_unset)
+    if not all(isinstance(value, _NATIVE_TYPES) for value in values.values()):
+        plain = obj_in.model_dump(mode="json", exclude_unset=exclude_unset)
+        values = {
+            key: value if isinstance(value, _NATIVE_TYPES) else plain[key]
+            for key, value in values.items()
+        }
+    return values
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -21,6 +48,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         * `schema`: A Pydantic model (schema) class
         """
         self.model = model
+        # Column attribute names, read from the mapper once per model
+        self.columns = frozenset(attr.key for attr in inspect(model).column_attrs)
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         return db.query(self.model).filter(self.model.id == id).first()
@@ -28,30 +57,69 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return db.query(self.model).execution_options(replica=True).offset(skip).limit(limit).all()
+
+    def get_page(
+        self,
+        db: Session,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        query: Optional[Query] = None,
+        sort_key: Any = None,
+        descending: bool = False,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Keyset-paginated list ordered by (sort_key, id); sort_key defaults to id.
+        Pass query to page over a filtered subset. Returns (items, next_cursor);
+        raises ValueError for an invalid cursor. Read from the replica when
+        one is configured.
+        """
+        if query is None:
+            query = db.query(self.model)
+        if sort_key is None:
+            sort_key = self.model.id
+        return paginate(
+            query.execution_options(replica=True), key=sort_key, id=self.model.id, cursor=cursor, limit=limit, descending=descending
+        )
+
+    def get_fingerprint(self, db: Session, *, query: Optional[Query] = None) -> Tuple[Any, int]:
+        """
+        (max(updated_at), count) of the query's rows, in one aggregate query:
+        changes whenever a row is written, added or removed. Used as the ETag
+        validator of list endpoints. Read from the replica, like the pages it
+        validates, so it is never newer than the rows served with it.
+        """
+        if query is None:
+            query = db.query(self.model)
+        row = query.with_entities(func.max(self.model.updated_at), func.count()).execution_options(replica=True).one()
+        return tuple(row)
+
+    # Writes return the object without a refresh: sessions don't expire on
+    # commit and database-computed values come back with the statement
+    # (eager_defaults on Base).
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)  # type: ignore
+        db_obj = self.model(**column_values(obj_in))  # type: ignore
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
         return db_obj
 
+    def _apply_update(self, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]) -> None:
+        """
+        Set only the given fields that are columns; unchanged values aren't
+        written, so the flush is one UPDATE ... WHERE id of the changed columns.
+        """
+        for field, value in column_values(obj_in, exclude_unset=True).items():
+            if field in self.columns:
+                setattr(db_obj, field, value)
+
     def update(
         self, db: Session, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        self._apply_update(db_obj, obj_in)
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> Optional[ModelType]:
@@ -61,3 +129,172 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             db.commit()
         return obj
 
+    # --- Batch variants: one transaction, BULK_CHUNK_SIZE rows per statement ---
+
+    def track_bulk(self, db: Session, ids: Sequence[int], deleted: bool = False) -> None:
+        """
+        Called with the ids of rows written by statements that bypass the
+        unit of work, inside their transaction (before a DELETE runs).
+        Nothing by default; see ChangeLogMixin.
+        """
+
+    def get_many(self, db: Session, *, ids: Sequence[int], refresh: bool = False) -> Dict[int, ModelType]:
+        """
+        Rows by id, one SELECT ... IN per chunk. Missing ids are left out.
+        refresh=True overwrites objects already in the session with the rows read.
+        """
+        ids = list(dict.fromkeys(ids))
+        found: Dict[int, ModelType] = {}
+        query = db.query(self.model).execution_options(populate_existing=refresh)
+        for chunk in _chunks(ids, settings.BULK_CHUNK_SIZE):
+            found.update((obj.id, obj) for obj in query.filter(self.model.id.in_(chunk)))
+        return found
+
+    def create_many(
+        self, db: Session, *, objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]]
+    ) -> List[ModelType]:
+        """
+        Insert many rows in one transaction and return them in id order.
+        Where the dialect has RETURNING each chunk is a single multi-row
+        INSERT ... RETURNING id; MySQL gets one INSERT per row, read back
+        through lastrowid. The rows are then loaded with one SELECT per chunk.
+        """
+        rows = [column_values(obj_in) for obj_in in objs_in]
+        ids: List[int] = []
+        try:
+            for chunk in _chunks(rows, settings.BULK_CHUNK_SIZE):
+                if db.get_bind().dialect.insert_executemany_returning:
+                    ids.extend(db.scalars(insert(self.model).returning(self.model.id), chunk))
+                else:
+                    db_objs = [self.model(**row) for row in chunk]
+                    db.add_all(db_objs)
+                    db.flush()
+                    ids.extend(db_obj.id for db_obj in db_objs)
+            self.track_bulk(db, ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        found = self.get_many(db, ids=ids)
+        return [found[id] for id in sorted(ids)]
+
+    def update_many(self, db: Session, *, objs_in: Sequence[Dict[str, Any]]) -> List[ModelType]:
+        """
+        Update many rows by primary key in one transaction. Each dict holds
+        "id" and the fields to change; rows changing the same fields go out
+        as one executemany UPDATE. Raises StaleDataError (and rolls back) if
+        an id doesn't exist. Returns the updated rows in input order.
+        """
+        rows = [{key: value for key, value in row.items() if key in self.columns} for row in objs_in]
+        # Consecutive rows with the same keys share a statement
+        rows.sort(key=lambda row: sorted(row))
+        try:
+            for chunk in _chunks(rows, settings.BULK_CHUNK_SIZE):
+                db.execute(update(self.model), chunk)
+            self.track_bulk(db, [row["id"] for row in rows])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        # The UPDATE bypassed objects already loaded (e.g. by the endpoint's checks)
+        found = self.get_many(db, ids=[row["id"] for row in objs_in], refresh=True)
+        return [found[row["id"]] for row in objs_in]
+
+    def remove_many(self, db: Session, *, ids: Sequence[int]) -> int:
+        """
+        Delete rows by id in one transaction, one DELETE ... IN per chunk.
+        ORM cascades don't run. Returns the number of rows deleted.
+        """
+        deleted = 0
+        try:
+            for chunk in _chunks(list(dict.fromkeys(ids)), settings.BULK_CHUNK_SIZE):
+                self.track_bulk(db, chunk, deleted=True)
+                result = db.execute(
+                    delete(self.model).where(self.model.id.in_(chunk)),
+                    execution_options={"synchronize_session": False},
+                )
+                deleted += result.rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return deleted
+
+    def insert_ignoring_duplicates(self, db: Session):
+        """
+        INSERT that skips rows hitting a unique key instead of failing the
+        whole statement, so the other rows of a multi-row insert still land.
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            # A no-op update rather than INSERT IGNORE, which would also hide other errors
+            return mysql_insert(self.model).on_duplicate_key_update(id=self.model.id)
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            return sqlite_insert(self.model).on_conflict_do_nothing()
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+            return postgresql_insert(self.model).on_conflict_do_nothing()
+        raise NotImplementedError(f"insert_ignoring_duplicates is not supported on {dialect}")
+
+    # --- Async variants, for async endpoints (AsyncSession) ---
+
+    async def get_async(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def get_page_async(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        query: Optional[Select] = None,
+        sort_key: Any = None,
+        descending: bool = False,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        get_page on an AsyncSession; query is a select() of the model.
+        """
+        if query is None:
+            query = select(self.model)
+        if sort_key is None:
+            sort_key = self.model.id
+        return await paginate_async(
+            db, query.execution_options(replica=True), key=sort_key, id=self.model.id, cursor=cursor, limit=limit, descending=descending
+        )
+
+    async def get_fingerprint_async(self, db: AsyncSession, *, query: Optional[Select] = None) -> Tuple[Any, int]:
+        """
+        get_fingerprint on an AsyncSession; query is a select() of the model.
+        """
+        if query is None:
+            query = select(self.model)
+        query = query.with_only_columns(func.max(self.model.updated_at), func.count()).order_by(None)
+        row = (await db.execute(query.execution_options(replica=True))).one()
+        return tuple(row)
+
+    async def create_async(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        db_obj = self.model(**column_values(obj_in))  # type: ignore
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+
+    async def update_async(
+        self, db: AsyncSession, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        self._apply_update(db_obj, obj_in)
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+
+    async def remove_async(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+        obj = await db.get(self.model, id)
+        if obj:
+            await db.delete(obj)
+            await db.commit()
+        return obj
+
+def _chunks(items: Sequence[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -1,23 +1,75 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy.orm import Session
-from sqlalchemy import asc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import asc, select
 
 from app.crud.base import CRUDBase
-from app.models.crm import Board
+from app.crud.crud_crm_change import ChangeLogMixin
+from app.crud.crud_ownership import OwnershipInvalidationMixin, TenantCacheInvalidationMixin
+from app.models.crm import Board, Card, Coluna
 from app.schemas.crm import BoardCreate, BoardUpdate
 
-class CRUDBoard(CRUDBase[Board, BoardCreate, BoardUpdate]):
-    def get_multi_by_empresa(
-        self, db: Session, *, empresa_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Board]:
-        return (
-            db.query(self.model)
-            .filter(Board.empresa_id == empresa_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+# Columns a board snapshot can project, per level
+SNAPSHOT_FIELDS = {
+    "board": ("id", "nome", "empresa_id", "created_at", "updated_at"),
+    "colunas": ("id", "nome", "ordem", "board_id", "created_at", "updated_at"),
+    "cards": ("id", "titulo", "descricao", "ordem", "coluna_id", "empresa_id", "created_at", "updated_at"),
+}
+
+class CRUDBoard(ChangeLogMixin, TenantCacheInvalidationMixin, OwnershipInvalidationMixin, CRUDBase[Board, BoardCreate, BoardUpdate]):
+    cache_entities = ("boards",)
+
+    def _with_colunas(self, query):
+        # schemas.Board nests colunas -> cards; load both levels up front
+        # (two extra queries in total) instead of one lazy load per row
+        return query.options(selectinload(Board.colunas).selectinload(Coluna.cards))
+
+    def get_with_colunas(self, db: Session, *, id: int) -> Optional[Board]:
+        return self._with_colunas(db.query(self.model)).filter(Board.id == id).first()
+
+    def get_page(
+        self, db: Session, *, cursor: Optional[str] = None, limit: int = 100, query=None, **kwargs
+    ) -> Tuple[List[Board], Optional[str]]:
+        if query is None:
+            query = db.query(self.model)
+        return super().get_page(db, query=self._with_colunas(query), cursor=cursor, limit=limit, **kwargs)
+
+    def get_page_by_empresa(
+        self, db: Session, *, empresa_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Board], Optional[str]]:
+        query = db.query(self.model).filter(Board.empresa_id == empresa_id)
+        return self.get_page(db, query=query, cursor=cursor, limit=limit)
+
+    def get_snapshot_rows(
+        self,
+        db: Session,
+        *,
+        board_id: int,
+        coluna_fields: Sequence[str] = SNAPSHOT_FIELDS["colunas"],
+        card_fields: Sequence[str] = SNAPSHOT_FIELDS["cards"],
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        A board's colunas and cards as plain rows, in display order, using two
+        queries regardless of board size. Only the requested columns are
+        selected (plus the ids needed to nest cards under colunas). Read from
+        the replica when one is configured.
+        """
+        coluna_columns = [getattr(Coluna, f) for f in dict.fromkeys(("id", *coluna_fields))]
+        colunas = db.execute(
+            select(*coluna_columns)
+            .where(Coluna.board_id == board_id)
+            .order_by(Coluna.ordem, Coluna.id)
+            .execution_options(replica=True)
+        ).mappings().all()
+        card_columns = [getattr(Card, f) for f in dict.fromkeys(("coluna_id", *card_fields))]
+        cards = db.execute(
+            select(*card_columns)
+            .join(Coluna, Card.coluna_id == Coluna.id)
+            .where(Coluna.board_id == board_id)
+            .order_by(Card.coluna_id, Card.ordem, Card.id)
+            .execution_options(replica=True)
+        ).mappings().all()
+        return colunas, cards
 
 board = CRUDBoard(Board)
 
@@ -1,43 +1,191 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, func
+from sqlalchemy import and_, asc, bindparam, func, or_, select, update
 
-from app.crud.base import CRUDBase
-from app.models.crm import Card
+from app.core.config import settings
+from app.crud.base import CRUDBase, column_values
+from app.crud.crud_crm_change import ChangeLogMixin
+from app.crud.crud_ownership import OwnershipInvalidationMixin, TenantCacheInvalidationMixin, ownership
+from app.models.crm import Card, Coluna
 from app.schemas.crm import CardCreate, CardUpdate
+from app.services.tenant_cache import tenant_cache
 
-class CRUDCard(CRUDBase[Card, CardCreate, CardUpdate]):
-    def get_multi_by_coluna(
-        self, db: Session, *, coluna_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Card]:
-        return (
-            db.query(self.model)
-            .filter(Card.coluna_id == coluna_id)
-            .order_by(asc(Card.ordem))
-            .offset(skip)
-            .limit(limit)
-            .all()
+# Cards are ordered by (ordem, id) within a coluna. Positions are spaced
+# CARD_ORDER_GAP apart, so a move takes the midpoint between its new
+# neighbours and only the moved row is written. When two neighbours end up
+# adjacent the coluna is renumbered (rebalance).
+
+class CRUDCard(ChangeLogMixin, TenantCacheInvalidationMixin, OwnershipInvalidationMixin, CRUDBase[Card, CardCreate, CardUpdate]):
+    cache_entities = ("boards", "colunas") # Board and coluna reads nest their cards
+
+    def get_page_by_coluna(
+        self, db: Session, *, coluna_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Card], Optional[str]]:
+        # Served by the (coluna_id, ordem) index
+        query = db.query(self.model).filter(Card.coluna_id == coluna_id)
+        return self.get_page(db, query=query, sort_key=Card.ordem, cursor=cursor, limit=limit)
+
+    async def get_page_by_coluna_async(
+        self, db: AsyncSession, *, coluna_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Card], Optional[str]]:
+        query = select(Card).where(Card.coluna_id == coluna_id)
+        return await self.get_page_async(db, query=query, sort_key=Card.ordem, cursor=cursor, limit=limit)
+
+    async def get_fingerprint_by_coluna_async(self, db: AsyncSession, *, coluna_id: int) -> Tuple[Any, int]:
+        return await self.get_fingerprint_async(db, query=select(Card).where(Card.coluna_id == coluna_id))
+
+    def _lock_colunas(self, coluna_ids: Sequence[int]):
+        """
+        SELECT ... FOR UPDATE of the colunas cards are appended to. Appends to
+        a coluna then run one at a time, so two can't compute the same MAX(ordem)
+        (which would leave adjacent positions a later move can't split).
+        """
+        return select(Coluna.id).where(Coluna.id.in_(sorted(set(coluna_ids)))).with_for_update()
+
+    def _new_card(self, obj_in: CardCreate, coluna_id: int, empresa_id: int) -> Card:
+        obj_in_data = column_values(obj_in)
+        obj_in_data["coluna_id"] = coluna_id
+        obj_in_data["empresa_id"] = empresa_id # Ensure empresa_id is set
+        # Append at the end of the column. The position is computed inside the
+        # INSERT itself instead of a separate MAX() round trip; callers hold the
+        # coluna's row lock (_lock_colunas) so concurrent appends don't tie.
+        last = (
+            select((func.coalesce(func.max(Card.ordem), 0) + settings.CARD_ORDER_GAP).label("ordem"))
+            .where(Card.coluna_id == coluna_id)
+            .subquery() # Derived table: MySQL won't read the INSERT target directly
         )
+        obj_in_data["ordem"] = select(last.c.ordem).scalar_subquery()
+        return self.model(**obj_in_data)
 
     def create_with_coluna_empresa(
         self, db: Session, *, obj_in: CardCreate, coluna_id: int, empresa_id: int
     ) -> Card:
-        # Calculate next order value for the new card within the column
-        max_order = db.query(func.max(Card.ordem)).filter(Card.coluna_id == coluna_id).scalar()
-        next_order = (max_order or 0) + 1
-
-        obj_in_data = obj_in.dict()
-        obj_in_data["coluna_id"] = coluna_id
-        obj_in_data["empresa_id"] = empresa_id # Ensure empresa_id is set
-        obj_in_data["ordem"] = next_order
-        db_obj = self.model(**obj_in_data)
+        db.execute(self._lock_colunas([coluna_id]))
+        db_obj = self._new_card(obj_in, coluna_id, empresa_id)
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
+        self.invalidate_cache([empresa_id])
+        # ordem was a SQL expression: read back just that column
+        db.refresh(db_obj, ["ordem"])
+        return db_obj
+
+    async def create_with_coluna_empresa_async(
+        self, db: AsyncSession, *, obj_in: CardCreate, coluna_id: int, empresa_id: int
+    ) -> Card:
+        await db.execute(self._lock_colunas([coluna_id]))
+        db_obj = self._new_card(obj_in, coluna_id, empresa_id)
+        db.add(db_obj)
+        await db.commit()
+        self.invalidate_cache([empresa_id])
+        await db.refresh(db_obj, ["ordem"])
         return db_obj
 
-    # Optional: Add method to update card order within or between columns
+    def create_many(
+        self, db: Session, *, objs_in: Sequence[Union[CardCreate, Dict[str, Any]]]
+    ) -> List[Card]:
+        """
+        Cards are appended to their colunas in input order, CARD_ORDER_GAP
+        apart, after one MAX(ordem) query for all the colunas involved
+        (with the colunas locked until the commit).
+        """
+        rows = [dict(column_values(obj_in)) for obj_in in objs_in]
+        coluna_ids = {row["coluna_id"] for row in rows}
+        db.execute(self._lock_colunas(coluna_ids))
+        last = dict(
+            db.query(Card.coluna_id, func.max(Card.ordem))
+            .filter(Card.coluna_id.in_(coluna_ids))
+            .group_by(Card.coluna_id)
+            .all()
+        )
+        for row in rows:
+            row["ordem"] = last[row["coluna_id"]] = (last.get(row["coluna_id"]) or 0) + settings.CARD_ORDER_GAP
+        return super().create_many(db, objs_in=rows)
+
+    def _neighbours(
+        self, db: Session, *, coluna_id: int, after: Optional[Card], exclude_id: int
+    ) -> Optional[int]:
+        """
+        ordem of the card that follows `after` (or the first card) in the coluna.
+        """
+        query = db.query(Card.ordem).filter(Card.coluna_id == coluna_id, Card.id != exclude_id)
+        if after is not None:
+            query = query.filter(
+                or_(Card.ordem > after.ordem, and_(Card.ordem == after.ordem, Card.id > after.id))
+            )
+        return query.order_by(asc(Card.ordem), asc(Card.id)).limit(1).scalar()
+
+    def _position(
+        self, db: Session, *, coluna_id: int, after: Optional[Card], exclude_id: int
+    ) -> Optional[int]:
+        """
+        A free position right after `after`, or None if the neighbours are adjacent.
+        """
+        gap = settings.CARD_ORDER_GAP
+        next_ordem = self._neighbours(db, coluna_id=coluna_id, after=after, exclude_id=exclude_id)
+        if after is None:
+            return gap if next_ordem is None else next_ordem - gap
+        if next_ordem is None:
+            return after.ordem + gap
+        if next_ordem - after.ordem < 2:
+            return None
+        return (after.ordem + next_ordem) // 2
+
+    def move(
+        self, db: Session, *, card: Card, coluna_id: int, after_card_id: Optional[int] = None
+    ) -> bool:
+        """
+        Place card in coluna_id right after after_card_id (None: at the top).
+        Only the card's row changes unless there is no room left, in which case
+        the coluna is rebalanced first. Flushes but doesn't commit, so several
+        moves can share a transaction. Returns True when the new position left
+        no gap next to it and the coluna should be rebalanced soon.
+        """
+        after = None
+        if after_card_id is not None:
+            after = db.query(Card).filter(Card.id == after_card_id, Card.coluna_id == coluna_id).first()
+            if after is None or after.id == card.id:
+                raise ValueError(f"Card {after_card_id} is not a valid anchor in coluna {coluna_id}")
+        ordem = self._position(db, coluna_id=coluna_id, after=after, exclude_id=card.id)
+        if ordem is None:
+            self.rebalance(db, coluna_id=coluna_id)
+            ordem = self._position(db, coluna_id=coluna_id, after=after, exclude_id=card.id)
+        card.coluna_id = coluna_id
+        card.ordem = ordem
+        db.flush()
+        tenant_cache.invalidate_on_commit(db, self.cache_entities, [card.empresa_id])
+        if after is None:
+            return False # Moving to the top always leaves a full gap
+        next_ordem = self._neighbours(db, coluna_id=coluna_id, after=card, exclude_id=card.id)
+        return ordem - after.ordem < 2 or (next_ordem is not None and next_ordem - ordem < 2)
+
+    def rebalance(self, db: Session, *, coluna_id: int) -> int:
+        """
+        Renumber a coluna's cards CARD_ORDER_GAP apart, keeping their order.
+        Flushes but doesn't commit. Returns the number of cards.
+        """
+        db.flush()
+        ids = db.scalars(
+            select(Card.id).where(Card.coluna_id == coluna_id).order_by(asc(Card.ordem), asc(Card.id))
+        ).all()
+        if ids:
+            gap = settings.CARD_ORDER_GAP
+            db.connection().execute(
+                update(Card.__table__)
+                .where(Card.__table__.c.id == bindparam("card_id"))
+                .values(ordem=bindparam("new_ordem")),
+                [{"card_id": id, "new_ordem": (i + 1) * gap} for i, id in enumerate(ids)],
+            )
+            self.track_bulk(db, ids)
+            tenant_cache.invalidate_on_commit(
+                db, self.cache_entities, [ownership.empresa_of(db, Coluna, coluna_id)]
+            )
+            # Loaded cards of this coluna now hold stale positions
+            for obj in db.identity_map.values():
+                if isinstance(obj, Card) and obj.coluna_id == coluna_id:
+                    db.expire(obj, ["ordem"])
+        return len(ids)
 
 card = CRUDCard(Card)
 
@@ -0,0 +1,62 @@
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.lru import LRUCache
+from app.crud.base import CRUDBase
+from app.models.conversa import Contato
+from app.schemas.conversa import ContatoCreate, ContatoUpdate
+
+class CRUDContato(CRUDBase[Contato, ContatoCreate, ContatoUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        # (empresa_id, remote_jid) -> contato id
+        self.id_cache = LRUCache(maxsize=50000)
+
+    def get_by_remote_jid(self, db: Session, *, empresa_id: int, remote_jid: str) -> Optional[Contato]:
+        return (
+            db.query(self.model)
+            .filter(Contato.empresa_id == empresa_id, Contato.remote_jid == remote_jid)
+            .first()
+        )
+
+    def _select_ids(self, db: Session, *, empresa_id: int, remote_jids, for_update: bool = False) -> Dict[str, int]:
+        query = db.query(Contato.remote_jid, Contato.id).filter(Contato.empresa_id == empresa_id, Contato.remote_jid.in_(remote_jids))
+        if for_update:
+            query = query.with_for_update(read=True)
+        rows = query.all()
+        return {remote_jid: contato_id for remote_jid, contato_id in rows}
+
+    def get_or_create_ids(
+        self, db: Session, *, empresa_id: int, contatos: Dict[str, Optional[str]]
+    ) -> Dict[str, int]:
+        """
+        Resolve {remote_jid: nome} to {remote_jid: contato id}, creating missing
+        contatos with one multi-row INSERT. Does not commit.
+        """
+        ids: Dict[str, int] = {}
+        missing = []
+        for remote_jid in contatos:
+            contato_id = self.id_cache.get((empresa_id, remote_jid))
+            if contato_id is None:
+                missing.append(remote_jid)
+            else:
+                ids[remote_jid] = contato_id
+
+        if missing:
+            found = self._select_ids(db, empresa_id=empresa_id, remote_jids=missing)
+            to_create = [remote_jid for remote_jid in missing if remote_jid not in found]
+            if to_create:
+                # Rows created concurrently by another worker are skipped, not fatal
+                db.execute(self.insert_ignoring_duplicates(db), [
+                    {"empresa_id": empresa_id, "remote_jid": remote_jid, "nome": contatos[remote_jid]}
+                    for remote_jid in to_create
+                ])
+                # Locking read: sees the other worker's committed rows under REPEATABLE READ
+                found.update(self._select_ids(db, empresa_id=empresa_id, remote_jids=to_create, for_update=True))
+            for remote_jid, contato_id in found.items():
+                self.id_cache.set((empresa_id, remote_jid), contato_id)
+            ids.update(found)
+        return ids
+
+contato = CRUDContato(Contato)
@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.lru import LRUCache
+from app.crud.base import CRUDBase
+from app.models.conversa import Conversa
+from app.schemas.conversa import ConversaCreate, ConversaUpdate
+
+class CRUDConversa(CRUDBase[Conversa, ConversaCreate, ConversaUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        # (instancia_id, contato_id) -> conversa id
+        self.id_cache = LRUCache(maxsize=50000)
+
+    def get_page_by_empresa(
+        self, db: Session, *, empresa_id: int, cursor: Optional[str] = None, limit: int = 50
+    ) -> Tuple[List[Conversa], Optional[str]]:
+        """
+        Conversas ordered by most recent message, keyset-paginated on (last_message_at, id).
+        """
+        query = (
+            db.query(self.model)
+            .options(joinedload(Conversa.contato))
+            .filter(Conversa.empresa_id == empresa_id)
+        )
+        return self.get_page(
+            db, query=query, sort_key=Conversa.last_message_at, descending=True, cursor=cursor, limit=limit
+        )
+
+    def _select_ids(self, db: Session, *, instancia_id: int, contato_ids, for_update: bool = False) -> Dict[int, int]:
+        query = db.query(Conversa.contato_id, Conversa.id).filter(Conversa.instancia_id == instancia_id, Conversa.contato_id.in_(contato_ids))
+        if for_update:
+            query = query.with_for_update(read=True)
+        rows = query.all()
+        return {contato_id: conversa_id for contato_id, conversa_id in rows}
+
+    def get_or_create_ids(
+        self, db: Session, *, empresa_id: int, instancia_id: int, contato_ids: Dict[int, datetime]
+    ) -> Dict[int, int]:
+        """
+        Resolve {contato id: first message time} to {contato id: conversa id}
+        for an instancia, creating missing conversas in one INSERT. Does not commit.
+        """
+        ids: Dict[int, int] = {}
+        missing = []
+        for contato_id in contato_ids:
+            conversa_id = self.id_cache.get((instancia_id, contato_id))
+            if conversa_id is None:
+                missing.append(contato_id)
+            else:
+                ids[contato_id] = conversa_id
+
+        if missing:
+            found = self._select_ids(db, instancia_id=instancia_id, contato_ids=missing)
+            to_create = [contato_id for contato_id in missing if contato_id not in found]
+            if to_create:
+                # Rows created concurrently by another worker are skipped, not fatal
+                db.execute(self.insert_ignoring_duplicates(db), [
+                    {
+                        "empresa_id": empresa_id,
+                        "instancia_id": instancia_id,
+                        "contato_id": contato_id,
+                        "last_message_at": contato_ids[contato_id],
+                    }
+                    for contato_id in to_create
+                ])
+                # Locking read: sees the other worker's committed rows under REPEATABLE READ
+                found.update(self._select_ids(db, instancia_id=instancia_id, contato_ids=to_create, for_update=True))
+            for contato_id, conversa_id in found.items():
+                self.id_cache.set((instancia_id, contato_id), conversa_id)
+            ids.update(found)
+        return ids
+
+conversa = CRUDConversa(Conversa)
@@ -0,0 +1,285 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, event, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from app.core.config import settings
+from app.crud.crud_ownership import ownership
+from app.models.crm import Board, Card, Coluna, CrmChange, CrmVersion, Tag
+from app.models.empresa import Empresa
+from app.services.websocket_manager import manager
+
+# Per-empresa change log of the CRM, so a client keeps a board current by
+# replaying what changed since the version it last saw instead of reloading
+# the board.
+#
+# Each committed transaction that writes boards, colunas, cards or tags
+# advances the empresa's crm_versions row by one per row written and logs the
+# rows as (version, entity, id, deleted). ORM writes are picked up after each
+# flush; bulk statements, which bypass the unit of work, report their ids
+# through track() (CRUDBase.track_bulk). The log is written right before the
+# commit, in the same transaction. The UPDATE of crm_versions holds its row
+# lock until then, so versions become visible in order and without gaps.
+# crm_versions has no foreign keys on either side, so that lock never waits
+# on the shared locks the transaction's own inserts hold on empresas.
+# Once committed, the changes (with the rows) are pushed to the empresa's
+# WebSocket connections as a "crm_changes" event.
+
+ENTITIES = {Board: "board", Coluna: "coluna", Card: "card", Tag: "tag"}
+MODELS = {entity: model for model, entity in ENTITIES.items()}
+
+# Session.info keys: changes of the open transaction, {(entity, id): (empresa_id,
+# deleted, obj or None)}, and events waiting for the commit
+_PENDING = "crm_changes_pending"
+_PUSH = "crm_changes_push"
+
+
+class ChangesGone(Exception):
+    """
+    The requested version is older than the retained log.
+    """
+
+
+class CRUDCrmChange:
+    def track(self, db: Session, model: Any, ids: Sequence[int], deleted: bool = False) -> None:
+        """
+        Log rows written outside the unit of work in db's transaction.
+        For deletes, call before the DELETE: the owners are resolved here.
+        """
+        entity = ENTITIES.get(model)
+        if entity is None:
+            return
+        owners = ownership.empresas_by_id(db, model, ids)
+        pending = db.info.setdefault(_PENDING, {})
+        for id in ids:
+            if id in owners:
+                pending[(entity, id)] = (owners[id], deleted, None)
+
+    def _track_flush(self, db: Session) -> None:
+        pending = None
+        dirty = [obj for obj in db.dirty if db.is_modified(obj)]
+        for deleted, objs in ((False, db.new), (False, dirty), (True, db.deleted)):
+            for obj in objs:
+                entity = ENTITIES.get(type(obj))
+                if entity is None:
+                    continue
+                empresa_id = _empresa_of_obj(db, obj)
+                if empresa_id is None:
+                    continue
+                if pending is None:
+                    pending = db.info.setdefault(_PENDING, {})
+                pending[(entity, obj.id)] = (empresa_id, deleted, None if deleted else obj)
+
+    def _advance(self, db: Session, empresa_id: int, count: int) -> int:
+        """
+        Add count to the empresa's version and return the new value.
+        Locks its crm_versions row until the transaction ends.
+        """
+        versions = CrmVersion.__table__
+        statement = (
+            update(versions)
+            .where(versions.c.empresa_id == empresa_id)
+            .values(version=versions.c.version + count)
+        )
+        if db.get_bind().dialect.update_returning:
+            version = db.execute(statement.returning(versions.c.version)).scalar_one_or_none()
+        elif db.execute(statement).rowcount:
+            version = db.execute(select(versions.c.version).where(versions.c.empresa_id == empresa_id)).scalar_one()
+        else:
+            version = None
+        if version is not None:
+            return version
+        # No row yet: empresa created without the ORM
+        try:
+            with db.begin_nested():
+                db.execute(insert(versions).values(empresa_id=empresa_id, version=count))
+        except IntegrityError:
+            return self._advance(db, empresa_id, count) # Created concurrently
+        return count
+
+    def _write_pending(self, db: Session) -> None:
+        """
+        before_commit: log the transaction's changes and stage their events.
+        """
+        db.flush() # Writes still pending are tracked by _track_flush
+        pending = db.info.pop(_PENDING, None)
+        if not pending:
+            return
+        by_empresa: Dict[int, List[Tuple[str, int, bool, Any]]] = {}
+        for (entity, id), (empresa_id, deleted, obj) in pending.items():
+            by_empresa.setdefault(empresa_id, []).append((entity, id, deleted, obj))
+        now = datetime.utcnow()
+        events = []
+        # One empresa row lock after another, always in the same order
+        for empresa_id in sorted(by_empresa):
+            changes = by_empresa[empresa_id]
+            version = self._advance(db, empresa_id, len(changes))
+            since = version - len(changes)
+            db.execute(
+                insert(CrmChange.__table__),
+                [
+                    {"empresa_id": empresa_id, "version": since + i, "entity": entity,
+                     "entity_id": id, "deleted": deleted, "created_at": now}
+                    for i, (entity, id, deleted, obj) in enumerate(changes, 1)
+                ],
+            )
+            events.append((empresa_id, {
+                "type": "crm_changes",
+                "since": since, # Apply only on top of this version, else GET /crm/changes?since=
+                "version": version,
+                "changes": self._deltas(db, changes),
+            }))
+        db.info[_PUSH] = events
+
+    def _deltas(self, db: Session, changes: Sequence[Tuple[str, int, bool, Any]]) -> List[Dict[str, Any]]:
+        """
+        Change entries with the current row of each upsert. Rows come from
+        the flushed object when it is fully loaded, otherwise with one
+        SELECT per entity; rows no longer there become deletes.
+        """
+        data: Dict[Tuple[str, int], Optional[Dict[str, Any]]] = {}
+        missing: Dict[str, List[int]] = {}
+        for entity, id, deleted, obj in changes:
+            if deleted:
+                continue
+            row = _row_of_obj(obj) if obj is not None else None
+            if row is None:
+                missing.setdefault(entity, []).append(id)
+            else:
+                data[(entity, id)] = row
+        for entity, ids in missing.items():
+            data.update(((entity, id), row) for id, row in self._load_rows(db, entity, ids).items())
+        deltas = []
+        for entity, id, deleted, obj in changes:
+            row = None if deleted else data.get((entity, id))
+            deltas.append({"entity": entity, "id": id, "deleted": row is None, "data": row})
+        return deltas
+
+    def _load_rows(self, db: Session, entity: str, ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        table = MODELS[entity].__table__
+        found = {}
+        for start in range(0, len(ids), settings.BULK_CHUNK_SIZE):
+            chunk = ids[start:start + settings.BULK_CHUNK_SIZE]
+            for row in db.execute(select(table).where(table.c.id.in_(chunk))).mappings():
+                found[row["id"]] = dict(row)
+        return found
+
+    def _push_pending(self, db: Session) -> None:
+        for empresa_id, message in db.info.pop(_PUSH, ()):
+            manager.broadcast_to_empresa_threadsafe(message, empresa_id)
+
+    def get_version(self, db: Session, *, empresa_id: int) -> int:
+        return db.query(CrmVersion.version).filter(CrmVersion.empresa_id == empresa_id).scalar() or 0
+
+    def get_since(self, db: Session, *, empresa_id: int, since: int, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Compacted changes after version `since`, at most `limit` log entries:
+        one entry per row, with its current data, or deleted. Returns
+        {"version", "changes", "has_more"}; pass version as the next since.
+        An unchanged empresa costs one primary key lookup. Raises ChangesGone
+        when the log no longer reaches back to since.
+        """
+        version = self.get_version(db, empresa_id=empresa_id)
+        if since > version:
+            raise ChangesGone() # Not a version of this log
+        if since == version:
+            return {"version": version, "changes": [], "has_more": False}
+        log = db.execute(
+            select(CrmChange.version, CrmChange.entity, CrmChange.entity_id, CrmChange.deleted)
+            .where(CrmChange.empresa_id == empresa_id, CrmChange.version > since)
+            .order_by(CrmChange.version)
+            .limit(limit + 1)
+        ).all()
+        if not log or log[0].version != since + 1:
+            raise ChangesGone() # Pruned
+        has_more = len(log) > limit
+        log = log[:limit]
+        # Last change per row wins, in the order of that last change
+        latest: Dict[Tuple[str, int], bool] = {}
+        for entry in log:
+            key = (entry.entity, entry.entity_id)
+            latest.pop(key, None)
+            latest[key] = entry.deleted
+        changes = self._deltas(db, [(entity, id, deleted, None) for (entity, id), deleted in latest.items()])
+        return {"version": log[-1].version, "changes": changes, "has_more": has_more}
+
+    def prune(self, db: Session, *, before: datetime) -> int:
+        """
+        Delete log entries older than before, BULK_CHUNK_SIZE per statement.
+        Clients behind them get ChangesGone and reload. Returns the count.
+        """
+        deleted = 0
+        while True:
+            ids = db.scalars(
+                select(CrmChange.id).where(CrmChange.created_at < before).limit(settings.BULK_CHUNK_SIZE)
+            ).all()
+            if not ids:
+                return deleted
+            deleted += db.execute(delete(CrmChange).where(CrmChange.id.in_(ids))).rowcount
+            db.commit()
+
+
+def _empresa_of_obj(db: Session, obj: Any) -> Optional[int]:
+    if isinstance(obj, Coluna):
+        # A coluna deleted together with its board: the board row is gone
+        board = inspect(obj).attrs.board.loaded_value
+        if board is not NO_VALUE and board is not None:
+            return board.empresa_id
+    return ownership.empresa_of_obj(db, obj)
+
+
+def _row_of_obj(obj: Any) -> Optional[Dict[str, Any]]:
+    """
+    Column values of a loaded object, or None if some are expired.
+    """
+    state = inspect(obj)
+    if state.expired_attributes:
+        return None
+    values = state.dict
+    keys = [column.key for column in obj.__table__.columns]
+    if any(key not in values for key in keys):
+        return None
+    return {key: values[key] for key in keys}
+
+
+class ChangeLogMixin:
+    """
+    For CRUD classes of boards, colunas, cards and tags: log the rows
+    written by bulk statements (ORM writes are logged from the flush).
+    """
+    def track_bulk(self, db: Session, ids: Sequence[int], deleted: bool = False) -> None:
+        crm_change.track(db, self.model, ids, deleted=deleted)
+
+
+crm_change = CRUDCrmChange()
+
+
+@event.listens_for(Empresa, "after_insert")
+def _create_version(mapper: Any, connection: Any, target: Empresa) -> None:
+    # The row exists before any write of the empresa's CRM: advancing then
+    # never inserts it, which would race (and gap lock) on MySQL
+    connection.execute(insert(CrmVersion.__table__).values(empresa_id=target.id, version=0))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context: Any) -> None:
+    crm_change._track_flush(session)
+
+
+@event.listens_for(Session, "before_commit")
+def _write_pending(session: Session) -> None:
+    crm_change._write_pending(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _push_pending(session: Session) -> None:
+    crm_change._push_pending(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+    session.info.pop(_PUSH, None)
@@ -1,34 +1,113 @@
-from typing import List, Optional
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.config import settings
 from app.crud.base import CRUDBase
 from app.models.instancia_evolution import InstanciaEvolution
 from app.schemas.instancia_evolution import InstanciaEvolutionCreate, InstanciaEvolutionUpdate
 
 class CRUDInstanciaEvolution(CRUDBase[InstanciaEvolution, InstanciaEvolutionCreate, InstanciaEvolutionUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        # Coalesced state writes: {instancia_id: {field: value}}
+        self._pending_state: Dict[int, Dict[str, Any]] = {}
+        # Monotonic time of the last heartbeat staged per instancia
+        self._last_heartbeat: Dict[int, float] = {}
+        self._state_lock = threading.Lock()
+
     def get_by_nome_instancia(self, db: Session, *, nome_instancia: str) -> Optional[InstanciaEvolution]:
         return db.query(self.model).filter(InstanciaEvolution.nome_instancia == nome_instancia).first()
 
-    def get_multi_by_empresa(
-        self, db: Session, *, empresa_id: int, skip: int = 0, limit: int = 100
-    ) -> List[InstanciaEvolution]:
-        return (
-            db.query(self.model)
-            .filter(InstanciaEvolution.empresa_id == empresa_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
-
-    # Add methods to update status, qr_code etc.
-    def update_status(self, db: Session, *, db_obj: InstanciaEvolution, status: str) -> InstanciaEvolution:
-        update_data = {"status_conexao": status}
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+    async def get_by_nome_instancia_async(
+        self, db: AsyncSession, *, nome_instancia: str
+    ) -> Optional[InstanciaEvolution]:
+        return await db.scalar(select(self.model).where(InstanciaEvolution.nome_instancia == nome_instancia))
 
-    def update_qr_code(self, db: Session, *, db_obj: InstanciaEvolution, qr_code: Optional[str]) -> InstanciaEvolution:
-        update_data = {"qr_code_base64": qr_code}
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+    def get_page_by_empresa(
+        self, db: Session, *, empresa_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[InstanciaEvolution], Optional[str]]:
+        query = db.query(self.model).filter(InstanciaEvolution.empresa_id == empresa_id)
+        return self.get_page(db, query=query, cursor=cursor, limit=limit)
 
-instancia_evolution = CRUDInstanciaEvolution(InstanciaEvolution)
+    def get_fingerprint_by_empresa(self, db: Session, *, empresa_id: int) -> Tuple[Any, int]:
+        query = db.query(self.model).filter(InstanciaEvolution.empresa_id == empresa_id)
+        return self.get_fingerprint(db, query=query)
+
+    # --- Coalesced state writes (status, last webhook) ---
+
+    def stage_state(self, *, instancia_id: int, obj_in: Dict[str, Any]) -> None:
+        """
+        Merge state changes for an instancia into the pending buffer.
+        They are written by flush_state as a single UPDATE per instancia.
+        """
+        with self._state_lock:
+            self._pending_state.setdefault(instancia_id, {}).update(obj_in)
+
+    def stage_heartbeat(self, *, instancia_id: int) -> None:
+        """
+        Debounced last_webhook_received: staged at most once per
+        INSTANCIA_HEARTBEAT_INTERVAL seconds per instancia.
+        """
+        now = time.monotonic()
+        with self._state_lock:
+            last = self._last_heartbeat.get(instancia_id)
+            if last is not None and now - last < settings.INSTANCIA_HEARTBEAT_INTERVAL:
+                return
+            self._last_heartbeat[instancia_id] = now
+            self._pending_state.setdefault(instancia_id, {})["last_webhook_received"] = datetime.utcnow()
 
+    def flush_state(self, db: Session, *, instancia_id: Optional[int] = None) -> int:
+        """
+        Write pending state changes (all instancias, or only one) and commit once.
+        Returns the number of UPDATE statements issued.
+        """
+        with self._state_lock:
+            if instancia_id is None:
+                pending, self._pending_state = self._pending_state, {}
+            elif instancia_id in self._pending_state:
+                pending = {instancia_id: self._pending_state.pop(instancia_id)}
+            else:
+                pending = {}
+        if not pending:
+            return 0
+        try:
+            for pending_id, values in pending.items():
+                db.execute(
+                    update(self.model).where(self.model.id == pending_id).values(**values)
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the changes back, without overwriting newer staged values
+            with self._state_lock:
+                for pending_id, values in pending.items():
+                    self._pending_state[pending_id] = {**values, **self._pending_state.get(pending_id, {})}
+            raise
+        return len(pending)
+
+    def update_state(self, db: Session, *, db_obj: InstanciaEvolution, obj_in: Dict[str, Any]) -> InstanciaEvolution:
+        """
+        Write state changes immediately, together with anything already staged
+        for this instancia, in a single UPDATE.
+        """
+        # updated_at set here rather than by onupdate, so db_obj gets the same value
+        self.stage_state(instancia_id=db_obj.id, obj_in={**obj_in, "updated_at": datetime.utcnow()})
+        with self._state_lock:
+            values = dict(self._pending_state.get(db_obj.id, {}))
+        self.flush_state(db, instancia_id=db_obj.id)
+        # The UPDATE bypasses the ORM: copy what was written onto db_obj
+        for key, value in values.items():
+            set_committed_value(db_obj, key, value)
+        return db_obj
+
+    def update_status(self, db: Session, *, db_obj: InstanciaEvolution, status: str) -> InstanciaEvolution:
+        return self.update_state(db, db_obj=db_obj, obj_in={"status_conexao": status})
+
+instancia_evolution = CRUDInstanciaEvolution(InstanciaEvolution)
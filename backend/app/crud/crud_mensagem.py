@@ -0,0 +1,128 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.crud.crud_contato import contato as crud_contato
+from app.crud.crud_conversa import conversa as crud_conversa
+from app.models.conversa import Conversa, Mensagem
+from app.schemas.conversa import MensagemCreate
+
+class CRUDMensagem(CRUDBase[Mensagem, MensagemCreate, MensagemCreate]):
+    def get_page_by_conversa(
+        self, db: Session, *, conversa_id: int, cursor: Optional[str] = None, limit: int = 50
+    ) -> Tuple[List[Mensagem], Optional[str]]:
+        """
+        Messages of a conversa, newest first, keyset-paginated on (timestamp, id).
+        Served by the (conversa_id, timestamp, id) index.
+        """
+        query = db.query(self.model).filter(Mensagem.conversa_id == conversa_id)
+        return self.get_page(
+            db, query=query, sort_key=Mensagem.timestamp, descending=True, cursor=cursor, limit=limit
+        )
+
+    def create_from_webhook(
+        self, db: Session, *, empresa_id: int, instancia_id: int, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Store the messages of one webhook: resolve contatos and conversas in bulk,
+        insert all messages with a single multi-row INSERT and commit once.
+        Messages already stored for the instancia (same Evolution key.id) are
+        skipped, so a redelivered webhook stores nothing twice.
+
+        Each message is a dict with remote_jid, nome, message_id, from_me, tipo,
+        conteudo and timestamp. Returns the inserted rows with conversa_id and
+        remote_jid set.
+        """
+        messages = self._drop_stored(db, instancia_id=instancia_id, messages=messages)
+        if not messages:
+            return []
+
+        contatos: Dict[str, Optional[str]] = {}
+        for message in messages:
+            if not message["from_me"] or message["remote_jid"] not in contatos:
+                contatos[message["remote_jid"]] = message.get("nome") # Prefer the contact's own pushName
+        try:
+            return self._create_from_webhook(
+                db, empresa_id=empresa_id, instancia_id=instancia_id, messages=messages, contatos=contatos
+            )
+        except Exception:
+            db.rollback()
+            # Ids cached during the failed transaction may not exist
+            for remote_jid in contatos:
+                crud_contato.id_cache.pop((empresa_id, remote_jid))
+            crud_conversa.id_cache.clear()
+            raise
+
+    def _drop_stored(
+        self, db: Session, *, instancia_id: int, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        message_ids = {message["message_id"] for message in messages if message.get("message_id")}
+        seen = set()
+        if message_ids:
+            seen.update(db.scalars(
+                select(Mensagem.message_id)
+                .where(Mensagem.instancia_id == instancia_id, Mensagem.message_id.in_(message_ids))
+            ))
+        kept = []
+        for message in messages:
+            message_id = message.get("message_id")
+            if message_id:
+                if message_id in seen:
+                    continue
+                seen.add(message_id)
+            kept.append(message)
+        return kept
+
+    def _create_from_webhook(
+        self,
+        db: Session,
+        *,
+        empresa_id: int,
+        instancia_id: int,
+        messages: List[Dict[str, Any]],
+        contatos: Dict[str, Optional[str]],
+    ) -> List[Dict[str, Any]]:
+        contato_ids = crud_contato.get_or_create_ids(db, empresa_id=empresa_id, contatos=contatos)
+
+        first_seen: Dict[int, datetime] = {}
+        for message in messages:
+            contato_id = contato_ids[message["remote_jid"]]
+            first_seen.setdefault(contato_id, message["timestamp"])
+        conversa_ids = crud_conversa.get_or_create_ids(
+            db, empresa_id=empresa_id, instancia_id=instancia_id, contato_ids=first_seen
+        )
+
+        rows = []
+        last_message_at: Dict[int, datetime] = {}
+        for message in messages:
+            conversa_id = conversa_ids[contato_ids[message["remote_jid"]]]
+            rows.append({
+                "conversa_id": conversa_id,
+                "empresa_id": empresa_id,
+                "instancia_id": instancia_id,
+                "message_id": message.get("message_id"),
+                "from_me": message["from_me"],
+                "tipo": message["tipo"],
+                "conteudo": message.get("conteudo"),
+                "timestamp": message["timestamp"],
+            })
+            if message["timestamp"] > last_message_at.get(conversa_id, datetime.min):
+                last_message_at[conversa_id] = message["timestamp"]
+
+        # Unique (instancia_id, message_id): a message stored concurrently by another worker is skipped
+        db.execute(self.insert_ignoring_duplicates(db), rows)
+        for conversa_id, timestamp in last_message_at.items():
+            db.execute(
+                update(Conversa)
+                .where(Conversa.id == conversa_id, Conversa.last_message_at < timestamp)
+                .values(last_message_at=timestamp)
+            )
+        db.commit()
+        for message, row in zip(messages, rows):
+            row["remote_jid"] = message["remote_jid"]
+        return rows
+
+mensagem = CRUDMensagem(Mensagem)
@@ -0,0 +1,232 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Type, Union
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import settings
+from app.core.lru import LRUCache
+from app.core.metrics import registry
+from app.db.base import Base
+from app.models.crm import Board, Card, Coluna, Tag
+from app.services.tenant_cache import tenant_cache
+
+# Tenant ownership of CRM resources: which empresa a board, coluna, card or
+# tag belongs to. Resolved with at most one query (colunas join their board;
+# the others carry empresa_id) and cached as (table, id) -> empresa_id.
+# Writes invalidate this worker's entries; the TTL bounds how long other
+# workers keep an outdated owner.
+
+class CRUDOwnership:
+    def __init__(self, maxsize: int = 100000, ttl: float = settings.OWNERSHIP_CACHE_TTL):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def _owner_query(self, db: Session, model: Type[Base], *entities: Any) -> Query:
+        if model is Coluna:
+            return (
+                db.query(*entities, Board.empresa_id)
+                .select_from(Coluna)
+                .join(Board, Coluna.board_id == Board.id)
+            )
+        return db.query(*entities, model.empresa_id)
+
+    def _owner_select(self, model: Type[Base], *entities: Any) -> Select:
+        if model is Coluna:
+            return select(*entities, Board.empresa_id).select_from(Coluna).join(Board, Coluna.board_id == Board.id)
+        return select(*entities, model.empresa_id)
+
+    def get_with_empresa(self, db: Session, model: Type[Base], id: int) -> Optional[Tuple[Any, int]]:
+        """
+        Load a resource together with its owning empresa_id in one query.
+        """
+        row = self._owner_query(db, model, model).filter(model.id == id).first()
+        if row is None:
+            return None
+        obj, empresa_id = row
+        self.cache.set((model.__tablename__, id), empresa_id)
+        return obj, empresa_id
+
+    def empresa_of(self, db: Session, model: Type[Base], id: int) -> Optional[int]:
+        """
+        Owning empresa_id of a resource, or None if it doesn't exist.
+        """
+        key = (model.__tablename__, id)
+        empresa_id = self.cache.get(key)
+        if empresa_id is None:
+            empresa_id = self._owner_query(db, model).filter(model.id == id).scalar()
+            if empresa_id is not None:
+                self.cache.set(key, empresa_id)
+        return empresa_id
+
+    async def get_with_empresa_async(
+        self, db: AsyncSession, model: Type[Base], id: int
+    ) -> Optional[Tuple[Any, int]]:
+        row = (await db.execute(self._owner_select(model, model).where(model.id == id))).first()
+        if row is None:
+            return None
+        obj, empresa_id = row
+        self.cache.set((model.__tablename__, id), empresa_id)
+        return obj, empresa_id
+
+    async def empresa_of_async(self, db: AsyncSession, model: Type[Base], id: int) -> Optional[int]:
+        key = (model.__tablename__, id)
+        empresa_id = self.cache.get(key)
+        if empresa_id is None:
+            empresa_id = await db.scalar(self._owner_select(model).where(model.id == id))
+            if empresa_id is not None:
+                self.cache.set(key, empresa_id)
+        return empresa_id
+
+    def empresas_by_id(self, db: Session, model: Type[Base], ids: Iterable[int]) -> Dict[int, int]:
+        """
+        {id: owning empresa_id} of several resources: cached ones first, the
+        rest with one query per BULK_CHUNK_SIZE ids. Missing ids are left out.
+        """
+        found: Dict[int, int] = {}
+        missing = []
+        for id in set(ids):
+            empresa_id = self.cache.get((model.__tablename__, id))
+            if empresa_id is None:
+                missing.append(id)
+            else:
+                found[id] = empresa_id
+        for start in range(0, len(missing), settings.BULK_CHUNK_SIZE):
+            chunk = missing[start:start + settings.BULK_CHUNK_SIZE]
+            for id, empresa_id in self._owner_query(db, model, model.id).filter(model.id.in_(chunk)):
+                self.cache.set((model.__tablename__, id), empresa_id)
+                found[id] = empresa_id
+        return found
+
+    def empresas_of(self, db: Session, model: Type[Base], ids: Iterable[int]) -> Set[int]:
+        """
+        Owning empresa_ids of several resources.
+        """
+        return set(self.empresas_by_id(db, model, ids).values())
+
+    def empresa_of_obj(self, db: Session, obj: Any) -> Optional[int]:
+        """
+        Owning empresa_id of a loaded resource (colunas through their board).
+        """
+        if isinstance(obj, Coluna):
+            return self.empresa_of(db, Board, obj.board_id)
+        return obj.empresa_id
+
+    async def empresa_of_obj_async(self, db: AsyncSession, obj: Any) -> Optional[int]:
+        if isinstance(obj, Coluna):
+            return await self.empresa_of_async(db, Board, obj.board_id)
+        return obj.empresa_id
+
+    def invalidate(self, model: Type[Base], id: int) -> None:
+        if model is Board:
+            # Deleting or re-homing a board affects every coluna under it
+            self.cache.clear()
+        else:
+            self.cache.pop((model.__tablename__, id))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+ownership = CRUDOwnership()
+registry.register("ownership_cache", ownership.stats)
+
+
+class OwnershipInvalidationMixin:
+    """
+    For CRUD classes of owned CRM models: update (e.g. a card moved to another
+    coluna) and remove, single or batch, drop the cached owner of the rows.
+    """
+    def update(self, db: Session, *, db_obj: Any, obj_in: Union[Any, Dict[str, Any]]) -> Any:
+        obj = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        ownership.invalidate(self.model, obj.id)
+        return obj
+
+    def remove(self, db: Session, *, id: int) -> Any:
+        obj = super().remove(db, id=id)
+        ownership.invalidate(self.model, id)
+        return obj
+
+    def update_many(self, db: Session, *, objs_in: Sequence[Dict[str, Any]]) -> List[Any]:
+        objs = super().update_many(db, objs_in=objs_in)
+        for obj in objs:
+            ownership.invalidate(self.model, obj.id)
+        return objs
+
+    def remove_many(self, db: Session, *, ids: Sequence[int]) -> int:
+        deleted = super().remove_many(db, ids=ids)
+        for id in ids:
+            ownership.invalidate(self.model, id)
+        return deleted
+
+    async def update_async(self, db: AsyncSession, *, db_obj: Any, obj_in: Union[Any, Dict[str, Any]]) -> Any:
+        obj = await super().update_async(db, db_obj=db_obj, obj_in=obj_in)
+        ownership.invalidate(self.model, obj.id)
+        return obj
+
+    async def remove_async(self, db: AsyncSession, *, id: int) -> Any:
+        obj = await super().remove_async(db, id=id)
+        ownership.invalidate(self.model, id)
+        return obj
+
+
+class TenantCacheInvalidationMixin:
+    """
+    For CRUD classes of models shown in cached tenant reads: after each
+    committed write, bump the cached entities (cache_entities) of the
+    empresas whose rows changed.
+    """
+    cache_entities: Tuple[str, ...] = ()
+
+    def invalidate_cache(self, empresa_ids: Iterable[Optional[int]]) -> None:
+        tenant_cache.invalidate(self.cache_entities, empresa_ids)
+
+    def create(self, db: Session, *, obj_in: Any) -> Any:
+        obj = super().create(db, obj_in=obj_in)
+        self.invalidate_cache([ownership.empresa_of_obj(db, obj)])
+        return obj
+
+    def update(self, db: Session, *, db_obj: Any, obj_in: Union[Any, Dict[str, Any]]) -> Any:
+        before = ownership.empresa_of_obj(db, db_obj)
+        obj = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self.invalidate_cache([before, ownership.empresa_of_obj(db, obj)])
+        return obj
+
+    def remove(self, db: Session, *, id: int) -> Any:
+        obj = super().remove(db, id=id)
+        if obj is not None:
+            self.invalidate_cache([ownership.empresa_of_obj(db, obj)])
+        return obj
+
+    def create_many(self, db: Session, *, objs_in: Sequence[Any]) -> List[Any]:
+        objs = super().create_many(db, objs_in=objs_in)
+        self.invalidate_cache({ownership.empresa_of_obj(db, obj) for obj in objs})
+        return objs
+
+    def update_many(self, db: Session, *, objs_in: Sequence[Dict[str, Any]]) -> List[Any]:
+        before = ownership.empresas_of(db, self.model, [row["id"] for row in objs_in])
+        objs = super().update_many(db, objs_in=objs_in)
+        self.invalidate_cache(before | {ownership.empresa_of_obj(db, obj) for obj in objs})
+        return objs
+
+    def remove_many(self, db: Session, *, ids: Sequence[int]) -> int:
+        before = ownership.empresas_of(db, self.model, ids)
+        deleted = super().remove_many(db, ids=ids)
+        self.invalidate_cache(before)
+        return deleted
+
+    async def create_async(self, db: AsyncSession, *, obj_in: Any) -> Any:
+        obj = await super().create_async(db, obj_in=obj_in)
+        self.invalidate_cache([await ownership.empresa_of_obj_async(db, obj)])
+        return obj
+
+    async def update_async(self, db: AsyncSession, *, db_obj: Any, obj_in: Union[Any, Dict[str, Any]]) -> Any:
+        before = await ownership.empresa_of_obj_async(db, db_obj)
+        obj = await super().update_async(db, db_obj=db_obj, obj_in=obj_in)
+        self.invalidate_cache([before, await ownership.empresa_of_obj_async(db, obj)])
+        return obj
+
+    async def remove_async(self, db: AsyncSession, *, id: int) -> Any:
+        obj = await super().remove_async(db, id=id)
+        if obj is not None:
+            self.invalidate_cache([await ownership.empresa_of_obj_async(db, obj)])
+        return obj
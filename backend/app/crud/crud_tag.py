@@ -1,12 +1,17 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set, Tuple
 
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
+from app.crud.crud_crm_change import ChangeLogMixin
+from app.crud.crud_ownership import OwnershipInvalidationMixin, TenantCacheInvalidationMixin
 from app.models.crm import Tag
 from app.schemas.crm import TagCreate, TagUpdate
 
-class CRUDTag(CRUDBase[Tag, TagCreate, TagUpdate]):
+class CRUDTag(ChangeLogMixin, TenantCacheInvalidationMixin, OwnershipInvalidationMixin, CRUDBase[Tag, TagCreate, TagUpdate]):
+    cache_entities = ("tags",)
+
     def get_by_nome_and_empresa(
         self, db: Session, *, nome: str, empresa_id: int
     ) -> Optional[Tag]:
@@ -16,16 +21,23 @@ class CRUDTag(CRUDBase[Tag, TagCreate, TagUpdate]):
             .first()
         )
 
-    def get_multi_by_empresa(
-        self, db: Session, *, empresa_id: int, skip: int = 0, limit: int = 100
-    ) -> List[Tag]:
-        return (
-            db.query(self.model)
-            .filter(Tag.empresa_id == empresa_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+    def get_existing_nomes(
+        self, db: Session, *, keys: Iterable[Tuple[int, str]]
+    ) -> Set[Tuple[int, str]]:
+        """
+        Which of the (empresa_id, nome) pairs are already taken.
+        """
+        keys = set(keys)
+        if not keys:
+            return set()
+        rows = db.execute(select(Tag.empresa_id, Tag.nome).where(tuple_(Tag.empresa_id, Tag.nome).in_(keys)))
+        return {tuple(row) for row in rows}
+
+    def get_page_by_empresa(
+        self, db: Session, *, empresa_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[Tag], Optional[str]]:
+        query = db.query(self.model).filter(Tag.empresa_id == empresa_id)
+        return self.get_page(db, query=query, cursor=cursor, limit=limit)
 
 tag = CRUDTag(Tag)
 
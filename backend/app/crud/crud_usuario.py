@@ -1,45 +1,153 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Sequence, Set, Union
 
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
+from app.core.config import settings
+from app.core.lru import LRUCache
+from app.core.metrics import Counter
+from app.core.security import (
+    get_password_hash, get_password_hash_async, get_password_hashes, verify_and_update_password_async,
+    verify_password,
+)
 from app.crud.base import CRUDBase
 from app.models.usuario import Usuario
 from app.schemas import UsuarioCreate, UsuarioUpdate
 
 class CRUDUsuario(CRUDBase[Usuario, UsuarioCreate, UsuarioUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        # user id -> auth state (active flag and roles), see get_state
+        self.state_cache = LRUCache(maxsize=10000, ttl=settings.AUTH_USER_STATE_TTL)
+        self.rehashed = Counter() # Hashes upgraded on login
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[Usuario]:
         return db.query(Usuario).filter(Usuario.email == email).first()
 
-    def create(self, db: Session, *, obj_in: UsuarioCreate) -> Usuario:
-        db_obj = Usuario(
+    def get_existing_emails(self, db: Session, *, emails: Sequence[str]) -> Set[str]:
+        return set(db.scalars(select(Usuario.email).where(Usuario.email.in_(set(emails)))))
+
+    async def get_by_email_async(self, db: AsyncSession, *, email: str) -> Optional[Usuario]:
+        return await db.scalar(select(Usuario).where(Usuario.email == email))
+
+    def _new_user(self, obj_in: UsuarioCreate, hashed_password: str) -> Usuario:
+        return Usuario(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password,
             nome=obj_in.nome,
             is_superuser=obj_in.is_superuser,
             is_supervisor=obj_in.is_supervisor,
             empresa_id=obj_in.empresa_id,
             is_active=obj_in.is_active
         )
+
+    def create(self, db: Session, *, obj_in: UsuarioCreate) -> Usuario:
+        db_obj = self._new_user(obj_in, get_password_hash(obj_in.password))
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
         return db_obj
 
+    def _update_data(self, obj_in: Union[UsuarioUpdate, Dict[str, Any]]) -> Dict[str, Any]:
+        if isinstance(obj_in, dict):
+            return dict(obj_in)
+        return obj_in.dict(exclude_unset=True)
+
     def update(
         self, db: Session, *, db_obj: Usuario, obj_in: Union[UsuarioUpdate, Dict[str, Any]]
     ) -> Usuario:
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
+        update_data = self._update_data(obj_in)
+        password = update_data.pop("password", None)
+        if password:
+            update_data["hashed_password"] = get_password_hash(password)
+
+        user = super().update(db, db_obj=db_obj, obj_in=update_data)
+        self.state_cache.pop(user.id)
+        return user
+
+    # Async variants: the hash is awaited on the password pool instead of
+    # holding a threadpool thread while bcrypt runs
 
-        if update_data.get("password"):
-            hashed_password = get_password_hash(update_data["password"])
-            del update_data["password"]
-            update_data["hashed_password"] = hashed_password
+    async def create_async(self, db: AsyncSession, *, obj_in: UsuarioCreate) -> Usuario:
+        db_obj = self._new_user(obj_in, await get_password_hash_async(obj_in.password))
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
 
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+    async def update_async(
+        self, db: AsyncSession, *, db_obj: Usuario, obj_in: Union[UsuarioUpdate, Dict[str, Any]]
+    ) -> Usuario:
+        update_data = self._update_data(obj_in)
+        password = update_data.pop("password", None)
+        if password:
+            update_data["hashed_password"] = await get_password_hash_async(password)
+
+        user = await super().update_async(db, db_obj=db_obj, obj_in=update_data)
+        self.state_cache.pop(user.id)
+        return user
+
+    def remove(self, db: Session, *, id: int) -> Optional[Usuario]:
+        user = super().remove(db, id=id)
+        self.state_cache.pop(id)
+        return user
+
+    def create_many(self, db: Session, *, objs_in: Sequence[UsuarioCreate]) -> List[Usuario]:
+        hashes = get_password_hashes([obj_in.password for obj_in in objs_in])
+        rows = []
+        for obj_in, hashed_password in zip(objs_in, hashes):
+            row = obj_in.dict(exclude={"password"})
+            row["hashed_password"] = hashed_password
+            rows.append(row)
+        return super().create_many(db, objs_in=rows)
+
+    def update_many(self, db: Session, *, objs_in: Sequence[Dict[str, Any]]) -> List[Usuario]:
+        rows = [dict(row) for row in objs_in]
+        changing = [row for row in rows if row.get("password")]
+        hashes = get_password_hashes([row["password"] for row in changing])
+        for row, hashed_password in zip(changing, hashes):
+            row["hashed_password"] = hashed_password
+        for row in rows:
+            row.pop("password", None)
+        users = super().update_many(db, objs_in=rows)
+        for user in users:
+            self.state_cache.pop(user.id)
+        return users
+
+    def remove_many(self, db: Session, *, ids: Sequence[int]) -> int:
+        deleted = super().remove_many(db, ids=ids)
+        for id in ids:
+            self.state_cache.pop(id)
+        return deleted
+
+    def _state_select(self, id: int):
+        return select(
+            Usuario.empresa_id, Usuario.is_active, Usuario.is_superuser, Usuario.is_supervisor
+        ).where(Usuario.id == id)
+
+    def get_state(self, db: Session, *, id: int) -> Optional[Dict[str, Any]]:
+        """
+        Auth state of a user (empresa_id, is_active, is_superuser, is_supervisor),
+        cached for AUTH_USER_STATE_TTL seconds. update/remove invalidate the entry
+        in this process; other workers see the change once the entry expires.
+        """
+        state = self.state_cache.get(id)
+        if state is None:
+            row = db.execute(self._state_select(id)).first()
+            if row is None:
+                return None
+            state = dict(row._mapping)
+            self.state_cache.set(id, state)
+        return state
+
+    async def get_state_async(self, db: AsyncSession, *, id: int) -> Optional[Dict[str, Any]]:
+        state = self.state_cache.get(id)
+        if state is None:
+            row = (await db.execute(self._state_select(id))).first()
+            if row is None:
+                return None
+            state = dict(row._mapping)
+            self.state_cache.set(id, state)
+        return state
 
     def authenticate(
         self, db: Session, *, email: str, password: str
@@ -51,6 +159,33 @@ class CRUDUsuario(CRUDBase[Usuario, UsuarioCreate, UsuarioUpdate]):
             return None
         return user
 
+    async def authenticate_async(
+        self, db: AsyncSession, *, email: str, password: str
+    ) -> Optional[Usuario]:
+        """
+        authenticate for async endpoints: the lookup runs on the AsyncSession and
+        bcrypt in the password pool. Outdated hashes are upgraded on success
+        when PASSWORD_REHASH_ON_LOGIN is set.
+        """
+        user = await self.get_by_email_async(db, email=email)
+        if not user:
+            return None
+        # Give the pooled connection back while bcrypt runs; otherwise a burst
+        # of logins holds one DB connection each for the whole hash.
+        # close() detaches user but keeps its loaded attributes.
+        await db.close()
+        valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+        if not valid:
+            return None
+        if new_hash and settings.PASSWORD_REHASH_ON_LOGIN:
+            await db.execute(
+                update(Usuario).where(Usuario.id == user.id).values(hashed_password=new_hash),
+                execution_options={"synchronize_session": False},
+            )
+            await db.commit()
+            self.rehashed.inc()
+        return user
+
     def is_active(self, user: Usuario) -> bool:
         return user.is_active
 
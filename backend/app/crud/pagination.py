@@ -0,0 +1,96 @@
+import base64
+import operator
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Select, asc, desc, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+
+from app.core import serialization
+
+# Keyset ("seek") pagination on (sort key, id). A page is found by
+# seeking past the last row of the previous one, so page 10000 costs the
+# same as page 1 given an index on the sort key, unlike OFFSET, which
+# reads and throws away every skipped row.
+
+# Opaque cursors: base64 of the JSON array [sort key, id]
+def encode_cursor(key: Any, id: int) -> str:
+    return base64.urlsafe_b64encode(serialization.dumps([key, id]).encode()).decode()
+
+def decode_cursor(cursor: str, column: Any = None) -> Tuple[Any, int]:
+    """
+    Raises ValueError for a malformed cursor. Datetime keys are parsed back
+    when column is a DateTime column.
+    """
+    try:
+        key, id = serialization.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if column is not None and isinstance(column.type, DateTime) and key is not None:
+            key = datetime.fromisoformat(key)
+        return key, int(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def seek(query: Any, *, key: Any, id: Any, cursor: Optional[str] = None, descending: bool = False) -> Any:
+    """
+    Order query by (key, id) and start it after the cursor's row. Works on
+    both a Query and a select(). key is a non-nullable column; pass key=id
+    to page on the primary key alone.
+    """
+    after, from_ = (operator.lt, operator.le) if descending else (operator.gt, operator.ge)
+    direction = desc if descending else asc
+    if key is id:
+        if cursor:
+            _, last_id = decode_cursor(cursor)
+            query = query.filter(after(id, last_id))
+        return query.order_by(direction(id))
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, key)
+        # The redundant key bound lets the planner seek into the index
+        # instead of evaluating the OR over every row
+        query = query.filter(
+            from_(key, last_key), or_(after(key, last_key), after(id, last_id))
+        )
+    return query.order_by(direction(key), direction(id))
+
+def _page(items: List[Any], *, key: Any, id: Any, limit: int) -> Tuple[List[Any], Optional[str]]:
+    # One extra row was fetched to tell whether there is a next page
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, key.key), getattr(last, id.key))
+    return items, next_cursor
+
+def paginate(
+    query: Query,
+    *,
+    key: Any,
+    id: Any,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of query ordered by (key, id), plus the cursor of the next page
+    (None on the last one).
+    """
+    query = seek(query, key=key, id=id, cursor=cursor, descending=descending)
+    return _page(query.limit(limit + 1).all(), key=key, id=id, limit=limit)
+
+async def paginate_async(
+    db: AsyncSession,
+    stmt: Select,
+    *,
+    key: Any,
+    id: Any,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    descending: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    paginate for a select() of one entity on an AsyncSession.
+    """
+    stmt = seek(stmt, key=key, id=id, cursor=cursor, descending=descending)
+    items = (await db.scalars(stmt.limit(limit + 1))).all()
+    return _page(list(items), key=key, id=id, limit=limit)
@@ -1,8 +1,20 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.dialects import mysql
 from datetime import datetime
 
-Base = declarative_base()
+class _Base:
+    # Values computed by the database (server defaults, SQL expressions) come
+    # back with the INSERT/UPDATE itself (RETURNING where the dialect has it),
+    # so writes don't need a refresh afterwards
+    __mapper_args__ = {"eager_defaults": True}
+
+Base = declarative_base(cls=_Base)
+
+# DATETIME with microseconds on MySQL (plain DATETIME keeps whole seconds).
+# For updated_at columns used as HTTP validators, where two writes in the
+# same second must still look different.
+PreciseDateTime = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
 
 # You can add common columns here if needed, e.g., id, created_at, updated_at
 # class BaseMixin:
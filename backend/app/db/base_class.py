@@ -1,8 +1,9 @@
 from app.db.base import Base # noqa
 from app.models.empresa import Empresa # noqa
 from app.models.usuario import Usuario # noqa
-from app.models.crm import Board, Coluna, Card, Tag # noqa
+from app.models.crm import Board, Coluna, Card, Tag, CrmChange # noqa
 from app.models.instancia_evolution import InstanciaEvolution # noqa
+from app.models.conversa import Contato, Conversa, Mensagem # noqa
 
 # Import other models here to ensure they are registered with Base's metadata
 # e.g., from app.models.item import Item # noqa
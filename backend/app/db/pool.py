@@ -0,0 +1,66 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import Counter, Histogram
+
+# Connection pools that record checkout metrics, exported under "db_pool"
+# in /metrics: how long a checkout waited, how many connections are in use,
+# and how often the pool had to open overflow connections or gave up.
+
+# Checkouts from a warm pool take microseconds; waits for a busy one
+# can reach DB_POOL_TIMEOUT
+CHECKOUT_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class InstrumentedPoolMixin:
+    def __init__(self, *args: Any, **kw: Any):
+        super().__init__(*args, **kw)
+        self.checkout_wait = Histogram(CHECKOUT_WAIT_BUCKETS)
+        self.overflow_opened = Counter() # Connections opened beyond pool_size
+        self.timeouts = Counter() # Checkouts that waited DB_POOL_TIMEOUT and failed
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts.inc()
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+    def _inc_overflow(self) -> bool:
+        opened = super()._inc_overflow()
+        if opened and self._overflow > 0:
+            self.overflow_opened.inc()
+        return opened
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "overflow_opened": self.overflow_opened.value,
+            "timeouts": self.timeouts.value,
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    # engine.pool is read each time: dispose() swaps in a new pool
+    pool = engine.pool
+    if isinstance(pool, InstrumentedPoolMixin):
+        return pool.stats()
+    return {"status": pool.status()}
@@ -1,8 +1,103 @@
+from typing import Any, Dict, Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import registry
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_stats
+
+def engine_options(url: Any, *, asynchronous: bool = False) -> Dict[str, Any]:
+    """
+    Pool settings from DB_POOL_*. In-memory SQLite keeps SQLAlchemy's
+    default single-connection pool.
+    """
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs marked with the "replica" execution option
+    (query.execution_options(replica=True)) to the read replica, when one is
+    configured. Everything else goes to the primary, and so does every
+    statement after the session's first write, so a request always sees
+    what it wrote itself.
+    """
+    def __init__(self, *args: Any, replica_bind: Any = None, **kw: Any):
+        super().__init__(*args, **kw)
+        self.replica_bind = replica_bind
+        self._wrote = False
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self._flushing or (clause is not None and clause.is_dml):
+            self._wrote = True
+        elif (
+            self.replica_bind is not None
+            and not self._wrote
+            and clause is not None
+            and clause.get_execution_options().get("replica")
+        ):
+            return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kw)
+
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **engine_options(settings.SQLALCHEMY_DATABASE_URI))
+replica_engine = None
+if settings.REPLICA_DATABASE_URI:
+    replica_engine = create_engine(settings.REPLICA_DATABASE_URI, **engine_options(settings.REPLICA_DATABASE_URI))
+# expire_on_commit=False: objects keep the values they were written with, so
+# returning one after commit doesn't cost another SELECT (same as async)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+    replica_bind=replica_engine,
+)
+
+# Async stack for async endpoints: same database, async driver. Sessions
+# keep attributes after commit since lazy loads can't run implicitly there.
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(url: str) -> URL:
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+_async_url = settings.ASYNC_DATABASE_URI or async_database_url(settings.SQLALCHEMY_DATABASE_URI)
+async_engine = create_async_engine(_async_url, **engine_options(_async_url, asynchronous=True))
+async_replica_engine = None
+if settings.REPLICA_DATABASE_URI:
+    _async_replica_url = async_database_url(settings.REPLICA_DATABASE_URI)
+    async_replica_engine = create_async_engine(
+        _async_replica_url, **engine_options(_async_replica_url, asynchronous=True)
+    )
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    replica_bind=async_replica_engine.sync_engine if async_replica_engine is not None else None,
+)
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def db_pool_stats() -> Dict[str, Any]:
+    engines: Dict[str, Optional[Any]] = {
+        "primary": engine,
+        "replica": replica_engine,
+        "async_primary": async_engine.sync_engine,
+        "async_replica": async_replica_engine.sync_engine if async_replica_engine is not None else None,
+    }
+    return {name: pool_stats(e) for name, e in engines.items() if e is not None}
 
+registry.register("db_pool", db_pool_stats)
@@ -1,7 +1,16 @@
+import asyncio
+
 from fastapi import FastAPI
 
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.security import shutdown_password_pool
+from app.services.bulk_sender import bulk_dispatcher
+from app.services.crm_changes import run_change_log_pruner
+from app.services.evolution_client import evolution_client
+from app.services.evolution_webhook import run_state_flusher
+from app.services.webhook_queue import get_webhook_queue
+from app.services.websocket_manager import manager as websocket_manager
 # Optional: Add CORS middleware if frontend will be on a different domain
 # from fastapi.middleware.cors import CORSMiddleware
 
@@ -22,6 +31,31 @@ app = FastAPI(
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+_background_tasks = []
+
+@app.on_event("startup")
+async def start_webhook_workers():
+    if settings.WEBHOOK_INGESTION_MODE == "queue":
+        get_webhook_queue().start()
+    if settings.INSTANCIA_STATE_FLUSH_INTERVAL > 0:
+        _background_tasks.append(asyncio.create_task(run_state_flusher()))
+    if settings.CRM_CHANGES_RETENTION_HOURS > 0:
+        _background_tasks.append(asyncio.create_task(run_change_log_pruner()))
+    await websocket_manager.start()
+
+@app.on_event("shutdown")
+async def stop_webhook_workers():
+    if settings.WEBHOOK_INGESTION_MODE == "queue":
+        await get_webhook_queue().stop()
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    await bulk_dispatcher.stop()
+    await websocket_manager.stop()
+    shutdown_password_pool()
+    await evolution_client.aclose()
+
 # Optional: Add a root endpoint for health check or basic info
 @app.get("/")
 def read_root():
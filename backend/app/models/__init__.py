@@ -3,6 +3,7 @@
 from app.db.base_class import Base  # noqa
 from .empresa import Empresa  # noqa
 from .usuario import Usuario  # noqa
-from .crm import Board, Coluna, Card, Tag  # noqa
+from .crm import Board, Coluna, Card, Tag, CrmChange, CrmVersion  # noqa
 from .instancia_evolution import InstanciaEvolution  # noqa
+from .conversa import Contato, Conversa, Mensagem  # noqa
 
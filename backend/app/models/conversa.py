@@ -0,0 +1,58 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, ForeignKey, Text, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from app.db.base import Base
+
+# --- Messaging Models ---
+
+class Contato(Base):
+    __tablename__ = "contatos"
+    __table_args__ = (
+        UniqueConstraint("empresa_id", "remote_jid", name="uq_contatos_empresa_remote_jid"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
+    remote_jid = Column(String(100), nullable=False) # WhatsApp JID, e.g. 5511999999999@s.whatsapp.net
+    nome = Column(String(255), nullable=True) # pushName reported by WhatsApp
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Conversa(Base):
+    __tablename__ = "conversas"
+    __table_args__ = (
+        UniqueConstraint("instancia_id", "contato_id", name="uq_conversas_instancia_contato"),
+        Index("ix_conversas_empresa_last_message", "empresa_id", "last_message_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
+    instancia_id = Column(Integer, ForeignKey("instancias_evolution.id"), nullable=False)
+    contato_id = Column(Integer, ForeignKey("contatos.id"), nullable=False)
+    status = Column(String(20), default="aberta") # aberta, fechada
+    last_message_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    contato = relationship("Contato")
+
+class Mensagem(Base):
+    __tablename__ = "mensagens"
+    __table_args__ = (
+        # Keyset pagination of a conversation's history
+        Index("ix_mensagens_conversa_timestamp", "conversa_id", "timestamp", "id"),
+        # A webhook redelivered past the dedup window can't store a message twice
+        UniqueConstraint("instancia_id", "message_id", name="uq_mensagens_instancia_message_id"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    conversa_id = Column(Integer, ForeignKey("conversas.id"), nullable=False)
+    empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False) # Denormalized for easier filtering
+    instancia_id = Column(Integer, ForeignKey("instancias_evolution.id"), nullable=False) # Denormalized for the unique key
+    message_id = Column(String(100), nullable=True) # Evolution key.id
+    from_me = Column(Boolean(), default=False)
+    tipo = Column(String(30), default="conversation") # Evolution messageType
+    conteudo = Column(Text, nullable=True)
+    timestamp = Column(DateTime, nullable=False) # When the message was sent on WhatsApp
+    created_at = Column(DateTime, default=datetime.utcnow)
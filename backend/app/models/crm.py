@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
-from app.db.base import Base
+from app.db.base import Base, PreciseDateTime
 
 # --- CRM Models ---
 
@@ -10,7 +10,7 @@ class Board(Base):
     __tablename__ = "crm_boards"
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
-    empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
+    empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -20,7 +20,7 @@ class Coluna(Base):
     __tablename__ = "crm_colunas"
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
-    ordem = Column(Integer, default=0) # To define column order within a board
+    ordem = Column(Integer, nullable=False, default=0, server_default="0") # To define column order within a board; a seek pagination key
     board_id = Column(Integer, ForeignKey("crm_boards.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -28,27 +28,41 @@ class Coluna(Base):
     board = relationship("Board", back_populates="colunas")
     cards = relationship("Card", back_populates="coluna", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_crm_colunas_board_ordem", "board_id", "ordem"),
+    )
+
 class Card(Base):
     __tablename__ = "crm_cards"
     id = Column(Integer, primary_key=True, index=True)
     titulo = Column(String(255), nullable=False)
     descricao = Column(Text, nullable=True)
-    ordem = Column(Integer, default=0) # To define card order within a column
+    ordem = Column(Integer, nullable=False, default=0, server_default="0") # Sparse position within a column (see crud_card), ties broken by id
     coluna_id = Column(Integer, ForeignKey("crm_colunas.id"), nullable=False)
-    empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False) # Denormalized for easier filtering
+    empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False, index=True) # Denormalized for easier filtering
     # Link to conversation (optional, can be added later)
     # conversa_id = Column(Integer, ForeignKey("conversas.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(PreciseDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     coluna = relationship("Coluna", back_populates="cards")
     # tags = relationship("Tag", secondary=card_tags, back_populates="cards") # Many-to-many for tags
 
+    __table_args__ = (
+        # Listing a coluna in order and finding a card's neighbours
+        Index("ix_crm_cards_coluna_ordem", "coluna_id", "ordem"),
+    )
+
 # Optional: Tag model and association table for MVP
 class Tag(Base):
     __tablename__ = "crm_tags"
+    __table_args__ = (
+        # Tag names are unique per company, not globally
+        UniqueConstraint("empresa_id", "nome", name="uq_crm_tags_empresa_nome"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
-    nome = Column(String(50), unique=True, index=True, nullable=False)
+    nome = Column(String(50), nullable=False)
     cor = Column(String(7), default="#FFFFFF") # Hex color code
     empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -61,3 +75,32 @@ class Tag(Base):
 #     Column("tag_id", Integer, ForeignKey("crm_tags.id"), primary_key=True),
 # )
 
+# Change log: one row per board, coluna, card or tag written, numbered by the
+# company's version in crm_versions (see crud_crm_change). Clients sync from a
+# version.
+class CrmChange(Base):
+    __tablename__ = "crm_changes"
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
+    version = Column(Integer, nullable=False) # CrmVersion.version after this change
+    entity = Column(String(20), nullable=False) # board, coluna, card or tag
+    entity_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Reading a company's changes after a version
+        Index("ix_crm_changes_empresa_version", "empresa_id", "version", unique=True),
+        # Pruning by age
+        Index("ix_crm_changes_created_at", "created_at"),
+    )
+
+
+# Last version of each company's change log. Deliberately without a foreign key
+# to empresas, and nothing references it: the row lock taken to advance the
+# version can't wait on the shared locks that inserting boards, colunas, cards
+# or tags takes on the parent rows (a lock upgrade that deadlocks on InnoDB).
+class CrmVersion(Base):
+    __tablename__ = "crm_versions"
+    empresa_id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
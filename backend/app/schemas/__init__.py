@@ -1,9 +1,10 @@
 # Adiciona os imports necessários para expor os schemas
-from .token import Token, TokenData
-from .empresa import Empresa, EmpresaCreate, EmpresaUpdate, EmpresaInDB
-from .usuario import Usuario, UsuarioCreate, UsuarioUpdate, UsuarioInDB
-from .crm import Board, BoardCreate, BoardUpdate, Coluna, ColunaCreate, ColunaUpdate, Card, CardCreate, CardUpdate, Tag, TagCreate, TagUpdate
-from .instancia_evolution import InstanciaEvolution, InstanciaEvolutionCreate, InstanciaEvolutionUpdate, InstanciaQRCode, SendMessagePayload
+from .token import Token, TokenData, TokenPayload
+from .empresa import Empresa, EmpresaCreate, EmpresaUpdate, EmpresaInDB, EmpresaPage
+from .usuario import Usuario, UsuarioCreate, UsuarioUpdate, UsuarioInDB, UsuarioPage, UsuarioBulkCreate, UsuarioBulkUpdateItem, UsuarioBulkUpdate
+from .crm import Board, BoardCreate, BoardUpdate, BoardPage, Coluna, ColunaCreate, ColunaUpdate, ColunaPage, Card, CardCreate, CardUpdate, CardPage, CardMove, CardReorder, CardBulkCreate, CardBulkUpdateItem, CardBulkUpdate, Tag, TagCreate, TagUpdate, TagPage, TagBulkCreate, TagBulkUpdateItem, TagBulkUpdate, BulkDelete, BulkDeleteResult, CrmChange, CrmChanges
+from .instancia_evolution import InstanciaEvolution, InstanciaEvolutionCreate, InstanciaEvolutionUpdate, InstanciaEvolutionPage, InstanciaQRCode, SendMessagePayload, BulkRecipient, BulkSendPayload, BulkSendJobStatus
+from .conversa import Contato, ContatoCreate, ContatoUpdate, Conversa, ConversaCreate, ConversaUpdate, ConversaPage, Mensagem, MensagemCreate, MensagemPage
 
 # Exemplo de como usar BaseModel e Field (se necessário em outros schemas)
 from pydantic import BaseModel, Field, EmailStr
@@ -0,0 +1,74 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+# --- Contato Schemas ---
+class ContatoCreate(BaseModel):
+    empresa_id: int
+    remote_jid: str
+    nome: Optional[str] = None
+
+class ContatoUpdate(BaseModel):
+    nome: Optional[str] = None
+
+class Contato(BaseModel):
+    id: int
+    empresa_id: int
+    remote_jid: str
+    nome: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# --- Conversa Schemas ---
+class ConversaCreate(BaseModel):
+    empresa_id: int
+    instancia_id: int
+    contato_id: int
+
+class ConversaUpdate(BaseModel):
+    status: Optional[str] = None # aberta, fechada
+
+class Conversa(BaseModel):
+    id: int
+    empresa_id: int
+    instancia_id: int
+    contato_id: int
+    status: str
+    last_message_at: datetime
+    created_at: datetime
+    contato: Optional[Contato] = None
+
+    class Config:
+        from_attributes = True
+
+class ConversaPage(BaseModel):
+    items: List[Conversa]
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get the next page
+
+# --- Mensagem Schemas ---
+class MensagemCreate(BaseModel):
+    conversa_id: int
+    empresa_id: int
+    message_id: Optional[str] = None
+    from_me: bool = False
+    tipo: str = "conversation"
+    conteudo: Optional[str] = None
+    timestamp: datetime
+
+class Mensagem(BaseModel):
+    id: int
+    conversa_id: int
+    message_id: Optional[str] = None
+    from_me: bool
+    tipo: str
+    conteudo: Optional[str] = None
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
+class MensagemPage(BaseModel):
+    items: List[Mensagem] # Newest first
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get older messages
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 # --- Tag Schemas ---
@@ -25,11 +25,31 @@ class TagInDBBase(TagBase):
 class Tag(TagInDBBase):
     pass
 
+class TagPage(BaseModel):
+    items: List[Tag]
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get the next page
+
+class TagBulkCreate(BaseModel):
+    items: List[TagCreate]
+
+class TagBulkUpdateItem(TagUpdate):
+    id: int
+
+class TagBulkUpdate(BaseModel):
+    items: List[TagBulkUpdateItem]
+
+# --- Bulk delete (cards, tags) ---
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
+
 # --- Card Schemas ---
 class CardBase(BaseModel):
     titulo: str
     descricao: Optional[str] = None
-    ordem: Optional[int] = 0
+    ordem: int = 0
 
 class CardCreate(CardBase):
     coluna_id: int
@@ -38,9 +58,26 @@ class CardCreate(CardBase):
 class CardUpdate(CardBase):
     titulo: Optional[str] = None
     descricao: Optional[str] = None
-    ordem: Optional[int] = None
+    ordem: int = None # Omitted keeps it; null is rejected, ordem is NOT NULL
     coluna_id: Optional[int] = None # Allow moving card between columns
 
+class CardMove(BaseModel):
+    card_id: int
+    coluna_id: int # Target column (may be the card's current one)
+    after_card_id: Optional[int] = None # Place right after this card; None = top of the column
+
+class CardReorder(BaseModel):
+    moves: List[CardMove] # Applied in order, in one transaction
+
+class CardBulkCreate(BaseModel):
+    items: List[CardCreate] # Appended to their columns in this order
+
+class CardBulkUpdateItem(CardUpdate):
+    id: int
+
+class CardBulkUpdate(BaseModel):
+    items: List[CardBulkUpdateItem]
+
 class CardInDBBase(CardBase):
     id: int
     coluna_id: int
@@ -55,17 +92,21 @@ class CardInDBBase(CardBase):
 class Card(CardInDBBase):
     pass
 
+class CardPage(BaseModel):
+    items: List[Card]
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get the next page
+
 # --- Coluna Schemas ---
 class ColunaBase(BaseModel):
     nome: str
-    ordem: Optional[int] = 0
+    ordem: int = 0
 
 class ColunaCreate(ColunaBase):
     board_id: int
 
 class ColunaUpdate(ColunaBase):
     nome: Optional[str] = None
-    ordem: Optional[int] = None
+    ordem: int = None # Omitted keeps it; null is rejected, ordem is NOT NULL
 
 class ColunaInDBBase(ColunaBase):
     id: int
@@ -80,6 +121,10 @@ class ColunaInDBBase(ColunaBase):
 class Coluna(ColunaInDBBase):
     pass
 
+class ColunaPage(BaseModel):
+    items: List[Coluna]
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get the next page
+
 # --- Board Schemas ---
 class BoardBase(BaseModel):
     nome: str
@@ -103,3 +148,18 @@ class BoardInDBBase(BoardBase):
 class Board(BoardInDBBase):
     pass
 
+class BoardPage(BaseModel):
+    items: List[Board]
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get the next page
+
+# --- Change log ---
+class CrmChange(BaseModel):
+    entity: str # board, coluna, card or tag
+    id: int
+    deleted: bool = False
+    data: Optional[Dict[str, Any]] = None # The row's current columns (no nested colunas/cards); None if deleted
+
+class CrmChanges(BaseModel):
+    version: int # Pass as ?since= next time
+    changes: List[CrmChange] = []
+    has_more: bool = False # More changes after version: ask again right away
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 # Shared properties
@@ -31,6 +31,11 @@ class EmpresaInDBBase(EmpresaBase):
 class Empresa(EmpresaInDBBase):
     pass
 
+# Page of companies (cursor pagination)
+class EmpresaPage(BaseModel):
+    items: List[Empresa]
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get the next page
+
 # Properties properties stored in DB
 class EmpresaInDB(EmpresaInDBBase):
     pass
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Any
 from datetime import datetime
 
 # --- InstanciaEvolution Schemas ---
@@ -19,14 +19,12 @@ class InstanciaEvolutionUpdate(BaseModel): # Allow partial updates
     api_endpoint: Optional[HttpUrl] = None
     is_active: Optional[bool] = None
     status_conexao: Optional[str] = None
-    qr_code_base64: Optional[str] = None
     last_webhook_received: Optional[datetime] = None
 
 class InstanciaEvolutionInDBBase(InstanciaEvolutionBase):
     id: int
     empresa_id: int
     status_conexao: str
-    qr_code_base64: Optional[str] = None
     last_webhook_received: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
@@ -38,9 +36,13 @@ class InstanciaEvolutionInDBBase(InstanciaEvolutionBase):
 class InstanciaEvolution(InstanciaEvolutionInDBBase):
     pass
 
-# Schema for QR Code response
+class InstanciaEvolutionPage(BaseModel):
+    items: List[InstanciaEvolution]
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get the next page
+
+# Schema for QR Code response; the image is at GET /evolution/{id}/qrcode
 class InstanciaQRCode(BaseModel):
-    qr_code: Optional[str] = None
+    qr_version: Optional[int] = None # None when there is no QR code to scan
     status: str
 
 # Schema for sending message via Evolution
@@ -48,3 +50,29 @@ class SendMessagePayload(BaseModel):
     number: str
     textMessage: Dict[str, str]
     # Add other message types as needed (media, etc.)
+
+# Schemas for bulk/broadcast sends
+class BulkRecipient(BaseModel):
+    number: str
+    variables: Dict[str, str] = {} # Values for {placeholders} in the template
+
+class BulkSendPayload(BaseModel):
+    # Either a text template sent to each recipient...
+    text: Optional[str] = None
+    recipients: List[BulkRecipient] = []
+    # ...or fully built payloads
+    messages: List[SendMessagePayload] = []
+
+class BulkSendJobStatus(BaseModel):
+    job_id: str
+    instancia_id: int
+    status: str
+    total: int
+    sent: int
+    failed: int
+    pending: int
+    throughput_per_second: float
+    errors: List[Dict[str, Any]] = []
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
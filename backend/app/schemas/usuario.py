@@ -34,6 +34,21 @@ class Usuario(UsuarioBase):
     class Config:
         orm_mode = True
 
+# Página de usuários (paginação por cursor)
+class UsuarioPage(BaseModel):
+    items: List[Usuario]
+    next_cursor: Optional[str] = None # Pass as ?cursor= to get the next page
+
+# Criação e atualização em lote
+class UsuarioBulkCreate(BaseModel):
+    items: List[UsuarioCreate]
+
+class UsuarioBulkUpdateItem(UsuarioUpdate):
+    id: int
+
+class UsuarioBulkUpdate(BaseModel):
+    items: List[UsuarioBulkUpdateItem]
+
 # Schema para usuário no banco de dados
 class UsuarioInDB(Usuario):
     hashed_password: str
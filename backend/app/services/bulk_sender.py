@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core import serialization
+from app.core.config import settings
+from app.core.metrics import Counter, registry
+from app.services.evolution_client import EvolutionAPIError, EvolutionTarget, evolution_client
+from app.services.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+# Background dispatcher for bulk/broadcast sends. Jobs are queued per
+# instancia and sent through a per-instancia token bucket so a campaign
+# doesn't exceed the rate WhatsApp tolerates for a single number.
+#
+# Each message is its own sendText call: Evolution's send endpoints take a
+# single number, so there is nothing to batch on the wire; the pooled client
+# reuses connections and BULK_SEND_CONCURRENCY overlaps the calls.
+#
+# With several workers the bucket and job state must be shared, or each
+# worker would send at the full rate and only know its own jobs: the redis
+# backend keeps buckets in Redis (refilled atomically by a script) and
+# mirrors job progress and cancellations there, so any worker answers the
+# status and cancel endpoints. The memory backend is for a single worker.
+
+MAX_JOB_ERRORS = 100 # Errors kept per job for the status endpoint
+PROGRESS_EVENT_INTERVAL = 1.0 # Seconds between WebSocket progress events
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class RedisTokenBucket:
+    """
+    Token bucket shared by every worker: state in a Redis hash, refilled and
+    taken in one script run on Redis time.
+    """
+    SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate, capacity = tonumber(ARGV[1]), tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+    def __init__(self, client, key: str, rate: float, capacity: float):
+        self.client = client
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+
+    async def acquire(self) -> None:
+        while True:
+            # A zero wait means a token was taken
+            wait = float(await self.client.eval(self.SCRIPT, 1, self.key, self.rate, self.capacity))
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class RedisBulkSendState:
+    """
+    Shared buckets, job snapshots and cancellation flags.
+    """
+    def __init__(self, client=None, prefix: str = "bulk_send:", job_ttl: int = 86400):
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        self.client = client
+        self.prefix = prefix
+        self.job_ttl = job_ttl
+
+    def bucket(self, instancia_id: int, rate: float, capacity: float) -> RedisTokenBucket:
+        return RedisTokenBucket(self.client, f"{self.prefix}bucket:{instancia_id}", rate, capacity)
+
+    async def save(self, job: "BulkSendJob") -> None:
+        await self.client.set(f"{self.prefix}job:{job.id}", serialization.dumps(job.snapshot()), ex=self.job_ttl)
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        value = await self.client.get(f"{self.prefix}job:{job_id}")
+        return serialization.loads(value) if value is not None else None
+
+    async def request_cancel(self, job_id: str) -> None:
+        await self.client.set(f"{self.prefix}cancel:{job_id}", 1, ex=self.job_ttl)
+
+    async def cancel_requested(self, job_id: str) -> bool:
+        return bool(await self.client.exists(f"{self.prefix}cancel:{job_id}"))
+
+
+@dataclass
+class BulkSendJob:
+    instancia_id: int
+    empresa_id: int
+    target: EvolutionTarget
+    messages: List[Dict[str, Any]]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued" # queued, running, completed, cancelled, failed
+    sent: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.messages)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "instancia_id": self.instancia_id,
+            "status": self.status,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "pending": self.total - self.sent - self.failed,
+            "throughput_per_second": ((self.sent + self.failed) / elapsed) if elapsed > 0 else 0.0,
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class BulkDispatcher:
+    def __init__(
+        self,
+        *,
+        rate_per_second: float = settings.EVOLUTION_SEND_RATE_PER_SECOND,
+        burst: int = settings.EVOLUTION_SEND_BURST,
+        concurrency: int = settings.BULK_SEND_CONCURRENCY,
+        max_jobs: int = 1000,
+        shared: Optional[RedisBulkSendState] = None,
+    ):
+        self.shared = shared
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, BulkSendJob]" = OrderedDict()
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._buckets: Dict[int, Any] = {} # TokenBucket or RedisTokenBucket
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.messages_sent = Counter()
+        self.messages_failed = Counter()
+
+    async def submit(self, job: BulkSendJob) -> BulkSendJob:
+        self._jobs[job.id] = job
+        self._evict_finished_jobs()
+        if self.shared is not None:
+            await self.shared.save(job)
+        queue = self._queues.get(job.instancia_id)
+        if queue is None:
+            queue = self._queues[job.instancia_id] = asyncio.Queue()
+            if self.shared is not None:
+                self._buckets[job.instancia_id] = self.shared.bucket(job.instancia_id, self.rate_per_second, self.burst)
+            else:
+                self._buckets[job.instancia_id] = TokenBucket(self.rate_per_second, self.burst)
+        queue.put_nowait(job)
+        worker = self._workers.get(job.instancia_id)
+        if worker is None or worker.done():
+            self._workers[job.instancia_id] = asyncio.create_task(self._run_instancia(job.instancia_id))
+        return job
+
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot of a job, whichever worker runs it.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.snapshot()
+        if self.shared is not None:
+            return await self.shared.load(job_id)
+        return None
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job and return its snapshot. A job of
+        another worker stops at its next progress check.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.status in ("queued", "running"):
+                job.status = "cancelled"
+                if self.shared is not None:
+                    await self.shared.save(job)
+            return job.snapshot()
+        snapshot = await self.get_status(job_id)
+        if snapshot is not None and snapshot["status"] in ("queued", "running"):
+            await self.shared.request_cancel(job_id)
+            snapshot["status"] = "cancelled"
+        return snapshot
+
+    def _evict_finished_jobs(self) -> None:
+        while len(self._jobs) > self.max_jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in ("queued", "running"):
+                break
+            del self._jobs[oldest_id]
+
+    async def _run_instancia(self, instancia_id: int) -> None:
+        queue = self._queues[instancia_id]
+        while not queue.empty():
+            job = queue.get_nowait()
+            if job.status == "queued" and self.shared is not None and await self.shared.cancel_requested(job.id):
+                job.status = "cancelled"
+                await self.shared.save(job)
+            if job.status == "cancelled":
+                continue
+            try:
+                await self._run_job(job)
+            except Exception:
+                logger.exception(f"Bulk send job {job.id} aborted")
+                job.status = "failed"
+                job.finished_at = time.time()
+                if self.shared is not None:
+                    await self.shared.save(job)
+
+    async def _run_job(self, job: BulkSendJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        bucket = self._buckets[job.instancia_id]
+        pending = iter(enumerate(job.messages))
+        last_event = 0.0
+
+        async def notify(force: bool = False) -> None:
+            nonlocal last_event
+            now = time.monotonic()
+            if not force and now - last_event < PROGRESS_EVENT_INTERVAL:
+                return
+            last_event = now
+            if self.shared is not None:
+                if job.status == "running" and await self.shared.cancel_requested(job.id):
+                    job.status = "cancelled"
+                await self.shared.save(job)
+            snapshot = job.snapshot()
+            snapshot.pop("errors")
+            await manager.broadcast_to_empresa({"type": "bulk_send_progress", **snapshot}, job.empresa_id)
+
+        async def sender() -> None:
+            for index, message in pending:
+                if job.status == "cancelled":
+                    return
+                await bucket.acquire()
+                try:
+                    await evolution_client.send_text(job.target, message)
+                    job.sent += 1
+                    self.messages_sent.inc()
+                except EvolutionAPIError as e:
+                    job.failed += 1
+                    self.messages_failed.inc()
+                    if len(job.errors) < MAX_JOB_ERRORS:
+                        job.errors.append({"index": index, "number": message.get("number"), "error": str(e)})
+                await notify()
+
+        await notify(force=True)
+        await asyncio.gather(*(sender() for _ in range(max(1, self.concurrency))))
+        if job.status != "cancelled":
+            job.status = "completed"
+        job.finished_at = time.time()
+        logger.info(
+            f"Bulk send job {job.id} via {job.target.nome_instancia} {job.status}: "
+            f"{job.sent} sent, {job.failed} failed"
+        )
+        await notify(force=True)
+
+    async def stop(self) -> None:
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.shared is not None else "memory",
+            "jobs_running": sum(1 for j in self._jobs.values() if j.status == "running"),
+            "jobs_queued": sum(1 for j in self._jobs.values() if j.status == "queued"),
+            "messages_sent": self.messages_sent.value,
+            "messages_failed": self.messages_failed.value,
+        }
+
+
+def create_bulk_dispatcher() -> BulkDispatcher:
+    if settings.BULK_SEND_BACKEND != "redis" and settings.WEB_CONCURRENCY > 1:
+        # Every worker would send at the full rate for the same number
+        raise RuntimeError("BULK_SEND_BACKEND=memory needs a single worker: use redis with WEB_CONCURRENCY > 1")
+    shared = RedisBulkSendState() if settings.BULK_SEND_BACKEND == "redis" else None
+    dispatcher = BulkDispatcher(shared=shared)
+    registry.register("bulk_sender", dispatcher.stats)
+    return dispatcher
+
+
+bulk_dispatcher = create_bulk_dispatcher()
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from starlette.concurrency import run_in_threadpool
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Retention of the CRM change log (crud_crm_change). Clients that fall
+# further behind get 410 from GET /crm/changes and reload their boards.
+
+def _prune() -> None:
+    db = SessionLocal()
+    try:
+        before = datetime.utcnow() - timedelta(hours=settings.CRM_CHANGES_RETENTION_HOURS)
+        deleted = crud.crm_change.prune(db, before=before)
+        if deleted:
+            logger.info(f"Pruned {deleted} CRM change log entries")
+    finally:
+        db.close()
+
+async def run_change_log_pruner() -> None:
+    """
+    Periodically delete change log entries older than CRM_CHANGES_RETENTION_HOURS.
+    Runs until cancelled.
+    """
+    while True:
+        try:
+            await run_in_threadpool(_prune)
+        except Exception:
+            logger.exception("Error pruning the CRM change log")
+        await asyncio.sleep(settings.CRM_CHANGES_PRUNE_INTERVAL)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Union
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, registry
+from app.models.instancia_evolution import InstanciaEvolution
+
+logger = logging.getLogger(__name__)
+
+# Async client for the Evolution API. Keeps one keep-alive connection pool per
+# api_endpoint, limits concurrency per host and retries transient failures
+# with exponential backoff and full jitter.
+
+# Responses that mean the request was not processed and can be retried
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+# Errors raised before the request reached Evolution, so retrying is safe
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+@dataclass(frozen=True)
+class EvolutionTarget:
+    """
+    Connection details of an instancia, detached from the DB session so calls
+    don't trigger lazy loads after a commit.
+    """
+    nome_instancia: str
+    api_endpoint: Optional[str]
+    api_key: Optional[str]
+
+    @classmethod
+    def from_instancia(cls, instancia: InstanciaEvolution) -> "EvolutionTarget":
+        return cls(
+            nome_instancia=instancia.nome_instancia,
+            api_endpoint=str(instancia.api_endpoint) if instancia.api_endpoint else None,
+            api_key=instancia.api_key,
+        )
+
+
+class EvolutionAPIError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _InstanceMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.retries = Counter()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests.value,
+            "errors": self.errors.value,
+            "retries": self.retries.value,
+            "latency_seconds": self.latency.snapshot(),
+        }
+
+
+class EvolutionClient:
+    def __init__(
+        self,
+        *,
+        max_connections_per_host: int = settings.EVOLUTION_HTTP_MAX_CONNECTIONS_PER_HOST,
+        timeout: float = settings.EVOLUTION_HTTP_TIMEOUT,
+        connect_timeout: float = settings.EVOLUTION_HTTP_CONNECT_TIMEOUT,
+        max_retries: int = settings.EVOLUTION_HTTP_MAX_RETRIES,
+        backoff_base: float = settings.EVOLUTION_HTTP_BACKOFF_BASE,
+        backoff_max: float = 10.0,
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._metrics: Dict[str, _InstanceMetrics] = {}
+
+    def _get_client(self, base_url: str) -> httpx.AsyncClient:
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections_per_host,
+                    max_keepalive_connections=self.max_connections_per_host,
+                ),
+            )
+            self._clients[base_url] = client
+            self._semaphores[base_url] = asyncio.Semaphore(self.max_connections_per_host)
+        return client
+
+    def _instance_metrics(self, nome_instancia: str) -> _InstanceMetrics:
+        if nome_instancia not in self._metrics:
+            self._metrics[nome_instancia] = _InstanceMetrics()
+        return self._metrics[nome_instancia]
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(
+        self,
+        instancia: Union[InstanciaEvolution, EvolutionTarget],
+        method: str,
+        path: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call the Evolution API for an instancia and return the decoded JSON body.
+        Raises EvolutionAPIError on failure after retries.
+        """
+        if not instancia.api_endpoint or not instancia.api_key:
+            raise EvolutionAPIError("API Endpoint or API Key not configured for this instancia.")
+
+        base_url = str(instancia.api_endpoint).rstrip("/")
+        client = self._get_client(base_url)
+        semaphore = self._semaphores[base_url]
+        metrics = self._instance_metrics(instancia.nome_instancia)
+        headers = {"apikey": instancia.api_key}
+        request_timeout = httpx.Timeout(timeout, connect=self.timeout.connect) if timeout else self.timeout
+
+        attempt = 0
+        while True:
+            metrics.requests.inc()
+            started = time.perf_counter()
+            try:
+                async with semaphore:
+                    response = await client.request(
+                        method, path, headers=headers, json=json, timeout=request_timeout
+                    )
+            except httpx.HTTPError as e:
+                metrics.latency.observe(time.perf_counter() - started)
+                metrics.errors.inc()
+                if isinstance(e, RETRY_EXCEPTIONS) and attempt < self.max_retries:
+                    metrics.retries.inc()
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                raise EvolutionAPIError(f"{type(e).__name__}: {e}") from e
+            metrics.latency.observe(time.perf_counter() - started)
+
+            if response.status_code >= 400:
+                metrics.errors.inc()
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    metrics.retries.inc()
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                raise EvolutionAPIError(
+                    f"Evolution API returned {response.status_code}: {response.text[:200]}",
+                    status_code=response.status_code,
+                )
+            return response.json() if response.content else {}
+
+    async def connect_instance(self, instancia: Union[InstanciaEvolution, EvolutionTarget]) -> Dict[str, Any]:
+        return await self.request(
+            instancia, "POST", f"/instance/connect/{instancia.nome_instancia}", timeout=30
+        )
+
+    async def send_text(self, instancia: Union[InstanciaEvolution, EvolutionTarget], payload: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.request(
+            instancia, "POST", f"/message/sendText/{instancia.nome_instancia}", json=payload
+        )
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        self._semaphores.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pools": len(self._clients),
+            "instances": {nome: m.snapshot() for nome, m in self._metrics.items()},
+        }
+
+
+evolution_client = EvolutionClient()
+registry.register("evolution_client", evolution_client.stats)
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import crud
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models.instancia_evolution import InstanciaEvolution
+from app.services.qr_store import qr_store
+from app.services.webhook_dedup import webhook_deduplicator
+from app.services.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+# Processing of Evolution API webhook payloads, shared by the inline endpoint
+# and the queue workers. apply_webhook_event is sync code; the async callers
+# run it on an AsyncSession through run_sync (apply_webhook_event_async). Work
+# outside the DB that may block on the network (Redis dedup and QR store
+# backends) is done first by prepare_webhook_event, in the threadpool when it would block.
+# The resulting WebSocket events are broadcast afterwards on the event loop.
+
+def parse_message(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Normalize an Evolution messages.upsert entry. Returns None for entries
+    without a remoteJid (e.g. protocol messages).
+    """
+    key = message.get("key", {})
+    remote_jid = key.get("remoteJid")
+    if not remote_jid:
+        return None
+    content = message.get("message") or {}
+    text = content.get("conversation") or content.get("extendedTextMessage", {}).get("text")
+    timestamp = message.get("messageTimestamp")
+    return {
+        "remote_jid": remote_jid,
+        "nome": message.get("pushName"),
+        "message_id": key.get("id"),
+        "from_me": bool(key.get("fromMe")),
+        "tipo": message.get("messageType") or "conversation",
+        "conteudo": text,
+        "timestamp": datetime.utcfromtimestamp(int(timestamp)) if timestamp else datetime.utcnow(),
+    }
+
+def _messages(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    data = payload.get("data", [])
+    # Evolution sends either a single message object or a list of them
+    return [data] if isinstance(data, dict) else data
+
+def prepare_webhook_event(instancia_id: int, instancia_nome: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the non-DB part of a webhook and return the payload to apply:
+    messages.upsert keeps only messages not seen before, qrcode.updated gets
+    the qr_version of the code now in the QR store.
+    """
+    event_type = payload.get("event")
+    if event_type == "connection.update":
+        qr_store.clear(instancia_id) # Clear QR on status update
+    elif event_type == "qrcode.updated":
+        qr_code = payload.get("data", {}).get("qrcode", {}).get("base64")
+        # The image goes to the QR store; the row and the event only change version
+        payload = {**payload, "qr_version": qr_store.put(instancia_id, qr_code)}
+    elif event_type == "messages.upsert" and webhook_deduplicator is not None:
+        # Drop redeliveries before any DB write or fan-out
+        payload = {**payload, "data": webhook_deduplicator.filter_new(instancia_nome, _messages(payload))}
+    return payload
+
+def _prepare_blocks(payload: Dict[str, Any]) -> bool:
+    event_type = payload.get("event")
+    if event_type in ("connection.update", "qrcode.updated"):
+        return qr_store.blocking
+    return event_type == "messages.upsert" and webhook_deduplicator is not None and webhook_deduplicator.blocking
+
+def apply_webhook_event(
+    db: Session, instancia: InstanciaEvolution, payload: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Apply a payload returned by prepare_webhook_event to the DB and return the
+    WebSocket events to broadcast.
+    """
+    instancia_id = instancia.id
+    empresa_id = instancia.empresa_id
+    instancia_nome = instancia.nome_instancia
+
+    # State changes are staged and merged into a single UPDATE per instancia;
+    # last_webhook_received is a debounced heartbeat
+    crud.instancia_evolution.stage_heartbeat(instancia_id=instancia_id)
+
+    event_type = payload.get("event")
+    events: List[Dict[str, Any]] = []
+
+    if event_type == "connection.update":
+        new_status = payload.get("data", {}).get("state", "disconnected")
+        crud.instancia_evolution.stage_state(
+            instancia_id=instancia_id,
+            obj_in={"status_conexao": new_status}
+        )
+        logger.info(f"Instance {instancia_nome} status updated to: {new_status}")
+        events.append({
+            "type": "instance_status",
+            "instance_id": instancia_id,
+            "status": new_status
+        })
+
+    elif event_type == "qrcode.updated":
+        crud.instancia_evolution.stage_state(
+            instancia_id=instancia_id,
+            obj_in={"status_conexao": "qr_code_needed"}
+        )
+        logger.info(f"Instance {instancia_nome} QR code updated.")
+        events.append({
+            "type": "instance_status",
+            "instance_id": instancia_id,
+            "status": "qr_code_needed",
+            "qr_version": payload.get("qr_version")
+        })
+
+    elif event_type == "messages.upsert":
+        parsed = [m for m in (parse_message(message) for message in _messages(payload)) if m]
+        if parsed:
+            rows = crud.mensagem.create_from_webhook(
+                db, empresa_id=empresa_id, instancia_id=instancia_id, messages=parsed
+            )
+            logger.info(f"Stored {len(rows)} messages for instance {instancia_nome}")
+            for row in rows: # Messages already stored are not in rows
+                # Notify relevant agents via WebSocket
+                events.append({
+                    "type": "new_message",
+                    "instance_id": instancia_id,
+                    "conversa_id": row["conversa_id"],
+                    "message_id": row["message_id"],
+                    "sender": row["remote_jid"],
+                    "from_me": row["from_me"],
+                    "content": row["conteudo"],
+                    "timestamp": row["timestamp"].isoformat(),
+                })
+
+    # Add handling for other event types as needed (e.g., message acknowledgements)
+
+    if settings.INSTANCIA_STATE_FLUSH_INTERVAL <= 0:
+        # No flush window: write this webhook's changes now
+        crud.instancia_evolution.flush_state(db, instancia_id=instancia_id)
+
+    return events
+
+async def apply_webhook_event_async(
+    db: AsyncSession, instancia: InstanciaEvolution, payload: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    prepare_webhook_event then apply_webhook_event on an AsyncSession. The DB
+    part runs through run_sync on the session's connection, without a
+    threadpool hop; the rest only hops when its backend would block the loop.
+    """
+    instancia_nome = instancia.nome_instancia
+    if _prepare_blocks(payload):
+        payload = await run_in_threadpool(prepare_webhook_event, instancia.id, instancia_nome, payload)
+    else:
+        payload = prepare_webhook_event(instancia.id, instancia_nome, payload)
+    try:
+        return await db.run_sync(apply_webhook_event, instancia, payload)
+    except Exception:
+        if payload.get("event") == "messages.upsert" and webhook_deduplicator is not None:
+            # Unmark the messages so Evolution's retry isn't dropped
+            if webhook_deduplicator.blocking:
+                await run_in_threadpool(webhook_deduplicator.forget, instancia_nome, _messages(payload))
+            else:
+                webhook_deduplicator.forget(instancia_nome, _messages(payload))
+        raise
+
+async def broadcast_webhook_events(events: List[Dict[str, Any]], empresa_id: int) -> None:
+    for event in events:
+        await manager.broadcast_to_empresa(event, empresa_id)
+
+async def process_webhook(instancia_nome: str, payload: Dict[str, Any]) -> None:
+    """
+    Process a webhook outside of the request cycle (used by the queue workers).
+    """
+    async with AsyncSessionLocal() as db:
+        instancia = await crud.instancia_evolution.get_by_nome_instancia_async(db, nome_instancia=instancia_nome)
+        if not instancia:
+            # Instance removed between enqueue and processing
+            logger.warning(f"Dropping queued webhook for unknown instance: {instancia_nome}")
+            return
+        empresa_id = instancia.empresa_id
+        events = await apply_webhook_event_async(db, instancia, payload)
+    if events:
+        await broadcast_webhook_events(events, empresa_id)
+
+def _flush_state() -> None:
+    db = SessionLocal()
+    try:
+        crud.instancia_evolution.flush_state(db)
+    finally:
+        db.close()
+
+async def run_state_flusher() -> None:
+    """
+    Periodically write coalesced instancia state changes. Runs until cancelled,
+    then flushes whatever is still pending.
+    """
+    try:
+        while True:
+            await asyncio.sleep(settings.INSTANCIA_STATE_FLUSH_INTERVAL)
+            try:
+                await run_in_threadpool(_flush_state)
+            except Exception:
+                logger.exception("Error flushing instancia state writes")
+    finally:
+        await run_in_threadpool(_flush_state)
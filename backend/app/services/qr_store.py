@@ -0,0 +1,170 @@
+import base64
+import binascii
+import logging
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.lru import LRUCache
+from app.core.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+# Short-lived store for Evolution QR codes, kept out of instancias_evolution.
+# A QR code is tens of KB of base64 that Evolution replaces every few tens of
+# seconds, so it lives here as PNG bytes for QR_CODE_TTL seconds and is
+# served by GET /evolution/{id}/qrcode. Each stored code gets a new version
+# per instancia; events and the connect response carry only that version.
+
+
+class QRCode(NamedTuple):
+    png: bytes
+    version: int
+
+
+class MemoryQRCodeBackend:
+    """
+    Per-worker store: bounded LRU whose entries expire after the TTL.
+    """
+    def __init__(self, ttl: float, maxsize: int):
+        self._codes = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def put(self, instancia_id: int, png: bytes) -> int:
+        with self._lock:
+            version = self._versions[instancia_id] = self._versions.get(instancia_id, 0) + 1
+        self._codes.set(instancia_id, QRCode(png, version))
+        return version
+
+    def get(self, instancia_id: int) -> Optional[QRCode]:
+        return self._codes.get(instancia_id)
+
+    def clear(self, instancia_id: int) -> None:
+        self._codes.pop(instancia_id)
+
+
+class RedisQRCodeBackend:
+    """
+    Shared store across workers: a hash per instancia with EXPIRE, versions
+    from INCR.
+    """
+    blocking = True # Network round trips: keep off the event loop
+    def __init__(self, ttl: float, client=None, prefix: str = "qrcode:"):
+        if client is None:
+            import redis
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        self.client = client
+        self.ttl = max(1, int(ttl))
+        self.prefix = prefix
+
+    def put(self, instancia_id: int, png: bytes) -> int:
+        version = self.client.incr(f"{self.prefix}version:{instancia_id}")
+        key = f"{self.prefix}{instancia_id}"
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={"png": png, "version": version})
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+        return version
+
+    def get(self, instancia_id: int) -> Optional[QRCode]:
+        png, version = self.client.hmget(f"{self.prefix}{instancia_id}", "png", "version")
+        if png is None or version is None:
+            return None
+        return QRCode(png, int(version))
+
+    def clear(self, instancia_id: int) -> None:
+        self.client.delete(f"{self.prefix}{instancia_id}")
+
+
+def decode_qr_code(qr_code: str) -> bytes:
+    """
+    PNG bytes of a QR code as Evolution sends it: base64, with or without a
+    data:image/png;base64, prefix. Raises ValueError if it isn't base64.
+    """
+    if qr_code.startswith("data:"):
+        qr_code = qr_code.partition(",")[2]
+    try:
+        return base64.b64decode(qr_code, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid QR code data: {e}") from e
+
+
+class QRCodeStore:
+    def __init__(self, backend):
+        self.backend = backend
+        self.stored = Counter()
+        self.served = Counter()
+        self.errors = Counter()
+
+    @property
+    def blocking(self) -> bool:
+        """
+        Whether calls wait on the network, so async callers use the threadpool.
+        """
+        return getattr(self.backend, "blocking", False)
+
+    def put(self, instancia_id: int, qr_code: Optional[str]) -> Optional[int]:
+        """
+        Store the instancia's current QR code and return its version. None
+        (and the previous code cleared) if qr_code is empty, invalid or the
+        store is down.
+        """
+        try:
+            png = decode_qr_code(qr_code) if qr_code else None
+        except ValueError:
+            logger.warning(f"Ignoring invalid QR code for instancia {instancia_id}")
+            png = None
+        try:
+            if png is None:
+                self.backend.clear(instancia_id)
+                return None
+            version = self.backend.put(instancia_id, png)
+        except Exception:
+            self.errors.inc()
+            logger.exception("QR code store error")
+            return None
+        self.stored.inc()
+        return version
+
+    def get(self, instancia_id: int) -> Optional[QRCode]:
+        try:
+            qr = self.backend.get(instancia_id)
+        except Exception:
+            self.errors.inc()
+            logger.exception("QR code store error")
+            return None
+        if qr is not None:
+            self.served.inc()
+        return qr
+
+    def clear(self, instancia_id: int) -> None:
+        try:
+            self.backend.clear(instancia_id)
+        except Exception:
+            self.errors.inc()
+            logger.exception("QR code store error")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "stored": self.stored.value,
+            "served": self.served.value,
+            "errors": self.errors.value,
+        }
+
+
+def create_qr_store() -> QRCodeStore:
+    if settings.QR_CODE_STORE_BACKEND != "redis" and settings.WEB_CONCURRENCY > 1:
+        # A worker would 404 on the codes stored by the others' webhooks
+        raise RuntimeError("QR_CODE_STORE_BACKEND=memory needs a single worker: use redis with WEB_CONCURRENCY > 1")
+    if settings.QR_CODE_STORE_BACKEND == "redis":
+        backend = RedisQRCodeBackend(settings.QR_CODE_TTL)
+    else:
+        backend = MemoryQRCodeBackend(settings.QR_CODE_TTL, maxsize=settings.QR_CODE_STORE_MAXSIZE)
+    store = QRCodeStore(backend)
+    registry.register("qr_store", store.stats)
+    return store
+
+
+qr_store = create_qr_store()
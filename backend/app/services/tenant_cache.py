@@ -0,0 +1,231 @@
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.etag import body_etag
+from app.core.config import settings
+from app.core.lru import LRUCache
+from app.core.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+# Read-through cache for tenant-scoped CRM reads (board, coluna and tag
+# lists and single reads). Values are encoded JSON response bodies, keyed by
+# (entity, empresa_id, version, params). Writes don't delete entries: the CRUD
+# write methods bump the (entity, empresa_id) version after their commit, so
+# every cached read of that tenant's entity becomes unreachable at once and
+# ages out of the LRU. A read that raced a write is stored under the old
+# version and never served.
+#
+# Entities: "boards" (boards nest colunas and cards), "colunas" (colunas nest
+# cards) and "tags".
+
+
+class CachedBody(NamedTuple):
+    body: str
+    etag: str # Strong ETag of body, computed once per fill
+
+
+class RedisCacheTier:
+    """
+    Shared tier: values and versions live in Redis, so a write in one worker
+    invalidates the cached reads of every worker.
+    """
+    def __init__(self, ttl: float, client=None, prefix: str = "tenant_cache:"):
+        if client is None:
+            import redis
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        self.client = client
+        self.ttl = max(1, int(ttl))
+        self.prefix = prefix
+
+    def _version_key(self, entity: str, empresa_id: int) -> str:
+        return f"{self.prefix}version:{entity}:{empresa_id}"
+
+    def version(self, entity: str, empresa_id: int) -> int:
+        return int(self.client.get(self._version_key(entity, empresa_id)) or 0)
+
+    def bump(self, entity: str, empresa_id: int) -> None:
+        self.client.incr(self._version_key(entity, empresa_id))
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str) -> None:
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+
+class TenantCache:
+    def __init__(self, maxsize: int, ttl: float, shared: Optional[RedisCacheTier] = None, enabled: bool = True):
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self.enabled = enabled
+        self._versions: Dict[Tuple[str, int], int] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.shared_hits = Counter()
+        self.loads = Counter() # Misses in every tier, served from the database
+        self.coalesced = Counter() # Misses that waited for another request's load
+        self.invalidations = Counter()
+        self.errors = Counter()
+
+    def _version(self, entity: str, empresa_id: int) -> int:
+        if self.shared is not None:
+            return self.shared.version(entity, empresa_id)
+        return self._versions.get((entity, empresa_id), 0)
+
+    def get_or_load(self, entity: str, empresa_id: int, params: Tuple, loader: Callable[[], str]) -> CachedBody:
+        """
+        Cached body for (entity, empresa_id, params), or loader() stored for
+        next time. Concurrent misses for the same key share one load.
+        Exceptions from loader propagate and nothing is stored.
+        """
+        if not self.enabled:
+            return _cached(loader())
+        try:
+            key = f"{entity}:{empresa_id}:{self._version(entity, empresa_id)}:{params!r}"
+        except Exception:
+            # Fail open: a Redis outage falls back to the database
+            self.errors.inc()
+            logger.exception("Tenant cache backend error")
+            return _cached(loader())
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        return self._single_flight(key, lambda: self._load(key, loader))
+
+    def _load(self, key: str, loader: Callable[[], str]) -> CachedBody:
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                self.errors.inc()
+                logger.exception("Tenant cache backend error")
+                value = None
+            if value is not None:
+                self.shared_hits.inc()
+                cached = _cached(value)
+                self.local.set(key, cached)
+                return cached
+        self.loads.inc()
+        cached = _cached(loader())
+        self.local.set(key, cached)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, cached.body)
+            except Exception:
+                self.errors.inc()
+                logger.exception("Tenant cache backend error")
+        return cached
+
+    def _single_flight(self, key: Hashable, load: Callable[[], CachedBody]) -> CachedBody:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self.coalesced.inc()
+            return future.result()
+        try:
+            value = load()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def invalidate(self, entities: Iterable[str], empresa_ids: Iterable[Optional[int]]) -> None:
+        """
+        Bump the version of each entity for each empresa. Call after the
+        write is committed.
+        """
+        empresa_ids = {empresa_id for empresa_id in empresa_ids if empresa_id is not None}
+        for entity in entities:
+            for empresa_id in empresa_ids:
+                self.invalidations.inc()
+                with self._lock:
+                    self._versions[(entity, empresa_id)] = self._versions.get((entity, empresa_id), 0) + 1
+                if self.shared is not None:
+                    try:
+                        self.shared.bump(entity, empresa_id)
+                    except Exception:
+                        self.errors.inc()
+                        logger.exception("Tenant cache backend error")
+
+    def invalidate_on_commit(
+        self, db: Session, entities: Iterable[str], empresa_ids: Iterable[Optional[int]]
+    ) -> None:
+        """
+        invalidate() once db's current transaction commits; dropped if it
+        rolls back. For writes that flush without committing.
+        """
+        if not db.in_transaction():
+            self.invalidate(entities, empresa_ids)
+            return
+        pending = db.info.setdefault("tenant_cache_pending", set())
+        pending.update((entity, empresa_id) for entity in entities for empresa_id in empresa_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "none" if not self.enabled else ("redis" if self.shared is not None else "memory"),
+            "local": self.local.stats(),
+            "shared_hits": self.shared_hits.value,
+            "loads": self.loads.value,
+            "coalesced": self.coalesced.value,
+            "invalidations": self.invalidations.value,
+            "errors": self.errors.value,
+        }
+
+
+def _cached(body: str) -> CachedBody:
+    return CachedBody(body, body_etag(body))
+
+
+def encode(schema: Type[BaseModel], value: Any) -> str:
+    """
+    JSON body of value (ORM objects or dicts of them) as the response schema.
+    """
+    return schema.model_validate(value, from_attributes=True).model_dump_json()
+
+
+def create_tenant_cache() -> TenantCache:
+    backend_name = settings.TENANT_CACHE_BACKEND
+    if backend_name == "memory" and settings.WEB_CONCURRENCY > 1:
+        # Invalidations would stay in the writing worker: stale lists and 304s elsewhere
+        raise RuntimeError("TENANT_CACHE_BACKEND=memory needs a single worker: use redis or none with WEB_CONCURRENCY > 1")
+    shared = RedisCacheTier(settings.TENANT_CACHE_TTL) if backend_name == "redis" else None
+    cache = TenantCache(
+        maxsize=settings.TENANT_CACHE_MAXSIZE,
+        ttl=settings.TENANT_CACHE_TTL,
+        shared=shared,
+        enabled=backend_name != "none",
+    )
+    registry.register("tenant_cache", cache.stats)
+    return cache
+
+
+tenant_cache = create_tenant_cache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_pending(session: Session) -> None:
+    pending = session.info.pop("tenant_cache_pending", None)
+    if pending:
+        for entity, empresa_id in pending:
+            tenant_cache.invalidate([entity], [empresa_id])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop("tenant_cache_pending", None)
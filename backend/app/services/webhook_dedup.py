@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.core.lru import LRUCache
+from app.core.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+# Deduplication of Evolution webhook messages by (instancia_nome, key.id).
+# Evolution retries webhooks on timeouts, so the same message can arrive more
+# than once; duplicates are dropped before any DB write or WebSocket fan-out.
+
+
+class MemoryDedupBackend:
+    """
+    Exact seen-set: bounded LRU whose entries expire after the window.
+    """
+    def __init__(self, window: float, maxsize: int):
+        self._seen = LRUCache(maxsize=maxsize, ttl=window)
+        self._lock = threading.Lock()
+
+    def add(self, key: str) -> bool:
+        """
+        Mark key as seen. Returns False if it was already seen within the window.
+        """
+        # get + set is not atomic across threads; the lock keeps two workers
+        # from both accepting the same key
+        with self._lock:
+            if self._seen.get(key) is not None:
+                return False
+            self._seen.set(key, True)
+            return True
+
+    def forget(self, key: str) -> None:
+        self._seen.pop(key)
+
+
+class BloomDedupBackend:
+    """
+    Fixed-memory approximate seen-set. Two Bloom filters are rotated every half
+    window, so a key is remembered for between window/2 and window seconds.
+    False positives (dropping a new message) happen at roughly error_rate.
+    """
+    def __init__(self, window: float, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.rotate_every = window / 2
+        self._current = bytearray(self.size // 8 + 1)
+        self._previous = bytearray(self.size // 8 + 1)
+        self._rotated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    @staticmethod
+    def _contains(bits: bytearray, positions: Iterable[int]) -> bool:
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add(self, key: str) -> bool:
+        positions = self._positions(key)
+        with self._lock:
+            now = time.monotonic()
+            if now - self._rotated_at >= self.rotate_every:
+                self._previous, self._current = self._current, bytearray(len(self._current))
+                self._rotated_at = now
+            if self._contains(self._current, positions) or self._contains(self._previous, positions):
+                return False
+            for p in positions:
+                self._current[p >> 3] |= 1 << (p & 7)
+            return True
+
+    def forget(self, key: str) -> None:
+        pass # Bloom filters can't remove keys; a failed message stays marked until rotation
+
+
+class RedisDedupBackend:
+    """
+    Shared seen-set across workers and nodes using SET NX EX.
+    """
+    blocking = True # Network round trips: keep off the event loop
+    def __init__(self, window: float, client=None, prefix: str = "webhook:dedup:"):
+        if client is None:
+            import redis
+            client = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        self.client = client
+        self.window = max(1, int(window))
+        self.prefix = prefix
+
+    def add(self, key: str) -> bool:
+        return bool(self.client.set(self.prefix + key, 1, nx=True, ex=self.window))
+
+    def forget(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+class WebhookDeduplicator:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = Counter() # Duplicates dropped
+        self.misses = Counter() # First-time messages
+        self.errors = Counter()
+
+    @property
+    def blocking(self) -> bool:
+        """
+        Whether calls wait on the network, so async callers use the threadpool.
+        """
+        return getattr(self.backend, "blocking", False)
+
+    @staticmethod
+    def _key(instancia_nome: str, message: Dict[str, Any]) -> Optional[str]:
+        message_id = message.get("key", {}).get("id")
+        return f"{instancia_nome}:{message_id}" if message_id else None
+
+    def filter_new(self, instancia_nome: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Return only messages not seen before, marking them as seen.
+        Messages without key.id are always kept.
+        """
+        new_messages = []
+        for message in messages:
+            key = self._key(instancia_nome, message)
+            if key is None:
+                new_messages.append(message)
+                continue
+            try:
+                is_new = self.backend.add(key)
+            except Exception:
+                # Fail open: a dedup outage must not lose messages
+                self.errors.inc()
+                logger.exception("Webhook dedup backend error")
+                is_new = True
+            if is_new:
+                self.misses.inc()
+                new_messages.append(message)
+            else:
+                self.hits.inc()
+        return new_messages
+
+    def forget(self, instancia_nome: str, messages: List[Dict[str, Any]]) -> None:
+        """
+        Unmark messages whose processing failed, so a retry is not dropped.
+        """
+        for message in messages:
+            key = self._key(instancia_nome, message)
+            if key is not None:
+                try:
+                    self.backend.forget(key)
+                except Exception:
+                    logger.exception("Webhook dedup backend error")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits.value + self.misses.value
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "errors": self.errors.value,
+            "hit_rate": (self.hits.value / lookups) if lookups else 0.0,
+        }
+
+
+def create_deduplicator() -> Optional[WebhookDeduplicator]:
+    backend_name = settings.WEBHOOK_DEDUP_BACKEND
+    window = settings.WEBHOOK_DEDUP_WINDOW
+    if backend_name == "none":
+        return None # mensagens' unique (instancia_id, message_id) key still keeps storage idempotent
+    if backend_name in ("memory", "bloom") and settings.WEB_CONCURRENCY > 1:
+        # Each worker would only know the deliveries it handled itself
+        raise RuntimeError(
+            f"WEBHOOK_DEDUP_BACKEND={backend_name} needs a single worker: use redis with WEB_CONCURRENCY > 1"
+        )
+    if backend_name == "redis":
+        backend = RedisDedupBackend(window)
+    elif backend_name == "bloom":
+        backend = BloomDedupBackend(window, capacity=settings.WEBHOOK_DEDUP_MAXSIZE)
+    else:
+        backend = MemoryDedupBackend(window, maxsize=settings.WEBHOOK_DEDUP_MAXSIZE)
+    deduplicator = WebhookDeduplicator(backend)
+    registry.register("webhook_dedup", deduplicator.stats)
+    return deduplicator
+
+
+webhook_deduplicator = create_deduplicator()
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from app.core import serialization
+from app.core.config import settings
+from app.core.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+# Bounded ingestion queue for Evolution API webhooks. The endpoint only
+# validates the instance and enqueues the raw body; a pool of workers drains
+# the queue and runs the actual processing.
+
+@dataclass
+class WebhookJob:
+    instancia_nome: str
+    body: str # Raw request body, parsed by the worker
+    enqueued_at: float = field(default_factory=time.time)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+class MemoryQueueBackend:
+    """
+    In-process backend. Jobs are lost on restart; useful for tests and single-node setups.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._queue: Deque[WebhookJob] = deque()
+        self._not_empty = asyncio.Event()
+
+    def put_nowait(self, job: WebhookJob) -> bool:
+        if len(self._queue) >= self.maxsize:
+            return False
+        self._queue.append(job)
+        self._not_empty.set()
+        return True
+
+    async def get(self) -> WebhookJob:
+        while not self._queue:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self._queue.popleft()
+
+    def ack(self, job: WebhookJob) -> None:
+        pass
+
+    def qsize(self) -> int:
+        return len(self._queue)
+
+    def oldest_enqueued_at(self) -> Optional[float]:
+        return self._queue[0].enqueued_at if self._queue else None
+
+
+class FileQueueBackend(MemoryQueueBackend):
+    """
+    Local-file backend. Every job is appended to a spool file and every processed
+    job to an ack file, so pending jobs survive a restart. Both files are
+    truncated once the queue is fully drained.
+    """
+    def __init__(self, maxsize: int, path: str):
+        super().__init__(maxsize)
+        self.path = path
+        self.ack_path = f"{path}.acks"
+        self._in_flight: Set[str] = set()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._recover()
+        self._spool = open(self.path, "a", encoding="utf-8")
+        self._acks = open(self.ack_path, "a", encoding="utf-8")
+
+    def _recover(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        acked = set()
+        if os.path.exists(self.ack_path):
+            with open(self.ack_path, encoding="utf-8") as f:
+                acked = {line.strip() for line in f if line.strip()}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    job = WebhookJob(**json.loads(line))
+                except (ValueError, TypeError):
+                    logger.error("Skipping corrupt line in webhook spool file")
+                    continue
+                if job.id not in acked:
+                    self._queue.append(job)
+        if self._queue:
+            logger.info(f"Recovered {len(self._queue)} pending webhooks from {self.path}")
+            self._not_empty.set()
+
+    def put_nowait(self, job: WebhookJob) -> bool:
+        if not super().put_nowait(job):
+            return False
+        self._spool.write(json.dumps(job.__dict__) + "\n")
+        self._spool.flush()
+        return True
+
+    async def get(self) -> WebhookJob:
+        job = await super().get()
+        self._in_flight.add(job.id)
+        return job
+
+    def ack(self, job: WebhookJob) -> None:
+        self._in_flight.discard(job.id)
+        if not self._queue and not self._in_flight:
+            # Fully drained: compact by truncating both files
+            self._spool.truncate(0)
+            self._acks.truncate(0)
+            return
+        self._acks.write(job.id + "\n")
+        self._acks.flush()
+
+    def close(self) -> None:
+        self._spool.close()
+        self._acks.close()
+
+
+class WebhookQueue:
+    def __init__(
+        self,
+        backend: MemoryQueueBackend,
+        handler: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        workers: int = 4,
+    ):
+        self.backend = backend
+        self.handler = handler
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self.enqueued = Counter()
+        self.processed = Counter()
+        self.failed = Counter()
+        self.dropped = Counter()
+        self.last_lag_seconds = 0.0
+
+    def enqueue(self, instancia_nome: str, body: str) -> bool:
+        """
+        Enqueue a raw webhook body. Returns False (and counts a drop) when the queue is full.
+        """
+        if not self.backend.put_nowait(WebhookJob(instancia_nome=instancia_nome, body=body)):
+            self.dropped.inc()
+            return False
+        self.enqueued.inc()
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.backend.get()
+            self.last_lag_seconds = time.time() - job.enqueued_at
+            try:
+                await self.handler(job.instancia_nome, serialization.loads(job.body))
+                self.processed.inc()
+            except asyncio.CancelledError:
+                # Stopped mid-job: left unacked, a spooled job runs again on restart
+                raise
+            except Exception:
+                self.failed.inc()
+                logger.exception(f"Error processing queued webhook for instance {job.instancia_nome}")
+            self.backend.ack(job)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if hasattr(self.backend, "close"):
+            self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        oldest = self.backend.oldest_enqueued_at()
+        return {
+            "depth": self.backend.qsize(),
+            "maxsize": self.backend.maxsize,
+            "workers": len(self._tasks),
+            "enqueued": self.enqueued.value,
+            "processed": self.processed.value,
+            "failed": self.failed.value,
+            "dropped": self.dropped.value,
+            "last_lag_seconds": self.last_lag_seconds,
+            "oldest_pending_seconds": (time.time() - oldest) if oldest else 0.0,
+        }
+
+
+def create_backend() -> MemoryQueueBackend:
+    if settings.WEBHOOK_QUEUE_BACKEND == "file":
+        return FileQueueBackend(settings.WEBHOOK_QUEUE_MAXSIZE, settings.WEBHOOK_QUEUE_PATH)
+    return MemoryQueueBackend(settings.WEBHOOK_QUEUE_MAXSIZE)
+
+
+def _default_handler(instancia_nome: str, payload: Dict[str, Any]) -> Awaitable[None]:
+    # Imported lazily to keep this module free of DB imports
+    from app.services.evolution_webhook import process_webhook
+    return process_webhook(instancia_nome, payload)
+
+
+webhook_queue: Optional[WebhookQueue] = None
+
+def get_webhook_queue() -> WebhookQueue:
+    global webhook_queue
+    if webhook_queue is None:
+        webhook_queue = WebhookQueue(create_backend(), _default_handler, workers=settings.WEBHOOK_QUEUE_WORKERS)
+        registry.register("webhook_queue", webhook_queue.stats)
+    return webhook_queue
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core import serialization
+from app.core.config import settings
+from app.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub backplane for the WebSocket hub. Every broadcast or personal
+# message is published as an envelope:
+#   {"empresa_id": int, "user_id": int | None, "exclude_user_id": int | None, "message": str}
+# (message is the already-encoded JSON frame) and each process delivers it
+# to the sockets it holds locally. With several
+# uvicorn workers (or nodes), the Redis backplane lets a webhook handled in
+# one worker reach agents connected to another.
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class InProcessBackplane:
+    """
+    Single-process backplane: publishing delivers straight to the local handler.
+    """
+    def __init__(self):
+        self.handler: Optional[Handler] = None
+        self.published = Counter()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        self.published.inc()
+        await self.handler(envelope)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "published": self.published.value}
+
+
+class RedisBackplane:
+    """
+    Redis PUBLISH/SUBSCRIBE backplane. Local sockets are served directly;
+    the envelope is also published so the other processes can serve theirs.
+    Messages carry the publishing node's id, so a node ignores its own.
+    """
+    def __init__(self, channel: str, client=None, reconnect_delay: float = 1.0):
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+        self.client = client
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.node_id = uuid.uuid4().hex
+        self.handler: Optional[Handler] = None
+        self._listener: Optional[asyncio.Task] = None
+        self.published = Counter()
+        self.received = Counter()
+        self.errors = Counter()
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        await self.client.aclose()
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        await self.handler(envelope)
+        try:
+            await self.client.publish(self.channel, serialization.dumps({**envelope, "origin": self.node_id}))
+            self.published.inc()
+        except Exception:
+            # Local clients were already served; only remote workers miss this one
+            self.errors.inc()
+            logger.exception("WebSocket backplane publish failed")
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for item in pubsub.listen():
+                    if item.get("type") != "message":
+                        continue
+                    envelope = serialization.loads(item["data"])
+                    if envelope.pop("origin", None) == self.node_id:
+                        continue
+                    self.received.inc()
+                    await self.handler(envelope)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors.inc()
+                logger.exception(f"WebSocket backplane subscription lost, retrying in {self.reconnect_delay}s")
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "node_id": self.node_id,
+            "published": self.published.value,
+            "received": self.received.value,
+            "errors": self.errors.value,
+        }
+
+
+def create_backplane():
+    if settings.WS_BACKPLANE == "redis":
+        return RedisBackplane(settings.WS_BACKPLANE_CHANNEL)
+    return InProcessBackplane()
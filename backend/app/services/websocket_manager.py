@@ -1,33 +1,277 @@
-from typing import List, Dict
-from fastapi import WebSocket, WebSocketDisconnect
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Set, Union
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from app.core.config import settings
+from app.core import serialization
+from app.core.metrics import Counter, Histogram, registry
+from app.services.websocket_backplane import create_backplane
+
+logger = logging.getLogger(__name__)
+
+# Policies for a connection whose outbound queue is full
+SLOW_CONSUMER_DROP = "drop" # Drop the new message for that connection only
+SLOW_CONSUMER_DISCONNECT = "disconnect" # Close the connection; the client reconnects and reloads
+
+# Subprotocol a client can request for binary frames instead of JSON text
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+
+class Frame:
+    """
+    An event encoded once and shared by every recipient. The msgpack form is
+    built on first use, only if some connection negotiated it.
+    """
+    __slots__ = ("text", "_binary")
+
+    def __init__(self, text: str):
+        self.text = text
+        self._binary: Optional[bytes] = None
+
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = serialization.packb(serialization.loads(self.text))
+        return self._binary
+
+
+class _Connection:
+    """
+    A WebSocket with its own bounded outbound queue, drained by a dedicated
+    writer task. Broadcasting only enqueues, so a slow or dead socket never
+    delays delivery to the others.
+    """
+    def __init__(self, websocket: WebSocket, empresa_id: int, user_id: int, maxsize: int):
+        self.websocket = websocket
+        self.empresa_id = empresa_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.binary = False # Negotiated the msgpack subprotocol
+
 
 class ConnectionManager:
-    def __init__(self):
-        # Structure: {empresa_id: {user_id: websocket}}
-        self.active_connections: Dict[int, Dict[int, WebSocket]] = {}
+    def __init__(
+        self,
+        *,
+        queue_size: int = settings.WS_OUTBOUND_QUEUE_SIZE,
+        send_timeout: float = settings.WS_SEND_TIMEOUT,
+        slow_consumer_policy: str = settings.WS_SLOW_CONSUMER_POLICY,
+        backplane=None,
+    ):
+        # Structure: {empresa_id: {user_id: {connection, ...}}}, one per open tab/device
+        self.active_connections: Dict[int, Dict[int, Set[_Connection]]] = {}
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_latency = Histogram()
+        self.messages_sent = Counter()
+        self.messages_dropped = Counter()
+        self.send_errors = Counter()
+        self.slow_consumer_disconnects = Counter()
+        self.bytes_sent = Counter()
+        # Broadcasts go through the backplane so every worker process delivers
+        # to the sockets it holds
+        self.backplane = backplane if backplane is not None else create_backplane()
+        self.backplane.handler = self._deliver
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self.backplane.start()
 
     async def connect(self, websocket: WebSocket, empresa_id: int, user_id: int):
-        await websocket.accept()
-        if empresa_id not in self.active_connections:
-            self.active_connections[empresa_id] = {}
-        self.active_connections[empresa_id][user_id] = websocket
-
-    def disconnect(self, empresa_id: int, user_id: int):
-        if empresa_id in self.active_connections and user_id in self.active_connections[empresa_id]:
-            del self.active_connections[empresa_id][user_id]
-            if not self.active_connections[empresa_id]: # Remove empresa_id if no users left
-                del self.active_connections[empresa_id]
-
-    async def send_personal_message(self, message: str, empresa_id: int, user_id: int):
-        if empresa_id in self.active_connections and user_id in self.active_connections[empresa_id]:
-            websocket = self.active_connections[empresa_id][user_id]
-            await websocket.send_text(message)
-
-    async def broadcast_to_empresa(self, message: str, empresa_id: int, exclude_user_id: int = None):
-        if empresa_id in self.active_connections:
-            for user_id, websocket in self.active_connections[empresa_id].items():
-                if exclude_user_id is None or user_id != exclude_user_id:
-                    await websocket.send_text(message)
+        subprotocols = getattr(websocket, "scope", {}).get("subprotocols", [])
+        binary = MSGPACK_SUBPROTOCOL in subprotocols and serialization.msgpack is not None
+        if binary:
+            await websocket.accept(subprotocol=MSGPACK_SUBPROTOCOL)
+        else:
+            await websocket.accept()
+        connection = _Connection(websocket, empresa_id, user_id, self.queue_size)
+        connection.binary = binary
+        connection.writer = asyncio.create_task(self._writer(connection))
+        self.active_connections.setdefault(empresa_id, {}).setdefault(user_id, set()).add(connection)
 
-manager = ConnectionManager()
+    def disconnect(self, empresa_id: int, user_id: int, websocket: Optional[WebSocket] = None):
+        """
+        Remove the connection for websocket, or all of the user's connections if not given.
+        """
+        connections = self.active_connections.get(empresa_id, {}).get(user_id, set())
+        for connection in list(connections):
+            if websocket is None or connection.websocket is websocket:
+                self._discard(connection)
 
+    def _discard(self, connection: _Connection) -> None:
+        """
+        Stop a connection's writer and remove it from the hub.
+        """
+        connection.closed = True
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        users = self.active_connections.get(connection.empresa_id)
+        if users is None:
+            return
+        connections = users.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections: # Remove user_id if no tabs left
+                del users[connection.user_id]
+        if not users: # Remove empresa_id if no users left
+            del self.active_connections[connection.empresa_id]
+
+    async def _close(self, connection: _Connection, code: int) -> None:
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            pass # Already closed by the client
+
+    async def _writer(self, connection: _Connection) -> None:
+        while True:
+            frame = await connection.queue.get()
+            started = time.perf_counter()
+            try:
+                if connection.binary:
+                    data = frame.binary()
+                    await asyncio.wait_for(connection.websocket.send_bytes(data), timeout=self.send_timeout)
+                else:
+                    data = frame.text
+                    await asyncio.wait_for(connection.websocket.send_text(data), timeout=self.send_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"WebSocket send timed out for user {connection.user_id} (empresa {connection.empresa_id}), disconnecting"
+                )
+                self.slow_consumer_disconnects.inc()
+                self._discard(connection)
+                await self._close(connection, status.WS_1013_TRY_AGAIN_LATER)
+                return
+            except (WebSocketDisconnect, RuntimeError, OSError) as e:
+                # Dead socket: drop it without affecting the other connections
+                logger.info(f"WebSocket send failed for user {connection.user_id} (empresa {connection.empresa_id}): {e!r}")
+                self.send_errors.inc()
+                self._discard(connection)
+                return
+            except Exception:
+                # E.g. a frame msgpack can't encode: without this the writer
+                # dies silently and the connection stops receiving
+                logger.exception(f"WebSocket send error for user {connection.user_id} (empresa {connection.empresa_id}), disconnecting")
+                self.send_errors.inc()
+                self._discard(connection)
+                await self._close(connection, status.WS_1011_INTERNAL_ERROR)
+                return
+            self.send_latency.observe(time.perf_counter() - started)
+            self.messages_sent.inc()
+            self.bytes_sent.inc(len(data))
+
+    def _enqueue(self, connection: _Connection, frame: Frame) -> None:
+        if connection.closed:
+            return
+        try:
+            connection.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.messages_dropped.inc()
+            if self.slow_consumer_policy == SLOW_CONSUMER_DISCONNECT:
+                logger.warning(
+                    f"Outbound queue full for user {connection.user_id} (empresa {connection.empresa_id}), disconnecting"
+                )
+                self.slow_consumer_disconnects.inc()
+                self._discard(connection)
+                asyncio.create_task(self._close(connection, status.WS_1013_TRY_AGAIN_LATER))
+
+    async def _deliver(self, envelope: Dict[str, Any]) -> None:
+        """
+        Backplane handler: enqueue a published message on this process's sockets.
+        """
+        users = self.active_connections.get(envelope["empresa_id"])
+        if not users:
+            return
+        frame = Frame(envelope["message"])
+        user_id = envelope.get("user_id")
+        if user_id is not None:
+            targets = list(users.get(user_id, ()))
+        else:
+            exclude_user_id = envelope.get("exclude_user_id")
+            # Copy: _enqueue may remove slow consumers while iterating
+            targets = [
+                connection
+                for uid, connections in users.items()
+                if exclude_user_id is None or uid != exclude_user_id
+                for connection in connections
+            ]
+        for connection in targets:
+            self._enqueue(connection, frame)
+
+    @staticmethod
+    def _encode(message: Union[str, Dict[str, Any]]) -> str:
+        """
+        Events are passed as dicts and encoded here, once per publish.
+        Pre-encoded strings are still accepted.
+        """
+        return message if isinstance(message, str) else serialization.dumps(message)
+
+    async def send_personal_message(self, message: Union[str, Dict[str, Any]], empresa_id: int, user_id: int):
+        await self.backplane.publish(
+            {"empresa_id": empresa_id, "user_id": user_id, "exclude_user_id": None, "message": self._encode(message)}
+        )
+
+    async def broadcast_to_empresa(self, message: Union[str, Dict[str, Any]], empresa_id: int, exclude_user_id: int = None):
+        await self.backplane.publish(
+            {"empresa_id": empresa_id, "user_id": None, "exclude_user_id": exclude_user_id, "message": self._encode(message)}
+        )
+
+    def broadcast_to_empresa_threadsafe(self, message: Union[str, Dict[str, Any]], empresa_id: int) -> None:
+        """
+        broadcast_to_empresa from synchronous code on any thread (e.g. a sync
+        endpoint in the threadpool), scheduled on the event loop without
+        waiting. Dropped when the manager isn't started (scripts, CLI).
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+        future = asyncio.run_coroutine_threadsafe(self.broadcast_to_empresa(message, empresa_id), self._loop)
+        future.add_done_callback(_log_publish_error)
+
+    async def stop(self) -> None:
+        writers = [
+            connection.writer
+            for users in self.active_connections.values()
+            for connections in users.values()
+            for connection in connections
+            if connection.writer is not None
+        ]
+        for task in writers:
+            task.cancel()
+        await asyncio.gather(*writers, return_exceptions=True)
+        await self.backplane.stop()
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [
+            connection.queue.qsize()
+            for users in self.active_connections.values()
+            for connections in users.values()
+            for connection in connections
+        ]
+        return {
+            "connections": len(depths),
+            "users": sum(len(users) for users in self.active_connections.values()),
+            "empresas": len(self.active_connections),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "messages_sent": self.messages_sent.value,
+            "messages_dropped": self.messages_dropped.value,
+            "send_errors": self.send_errors.value,
+            "slow_consumer_disconnects": self.slow_consumer_disconnects.value,
+            "bytes_sent": self.bytes_sent.value,
+            "send_latency_seconds": self.send_latency.snapshot(),
+            "backplane": self.backplane.stats(),
+        }
+
+def _log_publish_error(future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("WebSocket broadcast failed", exc_info=future.exception())
+
+
+manager = ConnectionManager()
+registry.register("websocket", manager.stats)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a throwaway SQLite file
+# before anything from app is imported
+_db_dir = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("INSTANCIA_STATE_FLUSH_INTERVAL", "0")
+os.environ.setdefault("TENANT_CACHE_BACKEND", "none")
+
+from typing import Iterator, List
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.security import get_password_hash
+from app.db.base_class import Base
+from app.db.session import SessionLocal, engine
+from app.main import app
+
+PASSWORD = "secret"
+
+
+@pytest.fixture(autouse=True)
+def database() -> Iterator[None]:
+    """
+    Fresh tables for every test, with one empresa and a supervisor of it.
+    """
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    crud.ownership.cache.clear() # Ids are reused across tests
+    db = SessionLocal()
+    try:
+        empresa = models.Empresa(nome="Empresa")
+        db.add(empresa)
+        db.commit()
+        db.add(models.Usuario(
+            email="supervisor@example.com", nome="Supervisor", hashed_password=get_password_hash(PASSWORD),
+            empresa_id=empresa.id, is_supervisor=True,
+        ))
+        db.commit()
+    finally:
+        db.close()
+    yield
+
+
+@pytest.fixture
+def db() -> Iterator[Session]:
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client() -> TestClient:
+    """
+    API client logged in as the supervisor.
+    """
+    test_client = TestClient(app)
+    response = test_client.post(
+        "/api/v1/login/access-token", data={"username": "supervisor@example.com", "password": PASSWORD}
+    )
+    test_client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return test_client
+
+
+class StatementCounter:
+    """
+    SQL statements sent through the sync engine while active.
+    """
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture
+def statements() -> Iterator[StatementCounter]:
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
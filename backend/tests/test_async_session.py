@@ -0,0 +1,62 @@
+import asyncio
+
+from app import crud, models, schemas
+from app.api import deps
+from app.db.session import AsyncSessionLocal
+
+
+def test_async_crud_shares_the_database(db):
+    async def run():
+        async with AsyncSessionLocal() as session:
+            tag = await crud.tag.create_async(session, obj_in=schemas.TagCreate(nome="lead", empresa_id=1))
+            await crud.tag.update_async(session, db_obj=tag, obj_in={"cor": "#ff0000"})
+            return tag.id
+
+    tag_id = asyncio.run(run())
+
+    assert db.get(models.Tag, tag_id).cor == "#ff0000"
+
+
+def test_async_pages_match_the_sync_ones(db):
+    crud.board.create_many(db, objs_in=[schemas.BoardCreate(nome=f"board-{i}", empresa_id=1) for i in range(7)])
+    sync_pages, cursor = [], None
+    while True:
+        page, cursor = crud.board.get_page(db, cursor=cursor, limit=3)
+        sync_pages.append([board.id for board in page])
+        if cursor is None:
+            break
+
+    async def run():
+        pages, cursor = [], None
+        async with AsyncSessionLocal() as session:
+            while True:
+                page, cursor = await crud.board.get_page_async(session, cursor=cursor, limit=3)
+                pages.append([board.id for board in page])
+                if cursor is None:
+                    return pages, await crud.board.get_fingerprint_async(session)
+
+    async_pages, fingerprint = asyncio.run(run())
+
+    assert async_pages == sync_pages
+    assert fingerprint == crud.board.get_fingerprint(db)
+
+
+def test_card_endpoints_dont_use_the_sync_session(client, db, monkeypatch):
+    board = models.Board(nome="Board", empresa_id=1)
+    db.add(board)
+    db.flush()
+    coluna = models.Coluna(nome="Coluna", ordem=1, board_id=board.id)
+    db.add(coluna)
+    db.commit()
+
+    def no_sync_session():
+        raise AssertionError("sync session opened")
+
+    monkeypatch.setattr(deps, "SessionLocal", no_sync_session)
+    card = client.post("/api/v1/crm/cards/", json={"titulo": "a", "coluna_id": coluna.id, "empresa_id": 1})
+    assert card.status_code == 200
+    card_id = card.json()["id"]
+    assert client.get(f"/api/v1/crm/cards/{card_id}").json()["titulo"] == "a"
+    assert client.put(f"/api/v1/crm/cards/{card_id}", json={"titulo": "b"}).json()["titulo"] == "b"
+    assert client.get(f"/api/v1/crm/cards/by_coluna/{coluna.id}").json()["items"][0]["id"] == card_id
+    assert client.delete(f"/api/v1/crm/cards/{card_id}").status_code == 200
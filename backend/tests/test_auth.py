@@ -0,0 +1,64 @@
+import hashlib
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import deps
+from app.core import security
+
+
+def _token(expires_delta=timedelta(hours=1)):
+    return security.create_access_token(
+        {"sub": "supervisor@example.com", "empresa_id": 1, "is_superuser": False, "user_id": 1},
+        expires_delta=expires_delta,
+    )
+
+
+@pytest.fixture(autouse=True)
+def token_cache():
+    deps._verified_tokens.clear()
+    yield deps._verified_tokens
+    deps._verified_tokens.clear()
+
+
+def test_token_is_verified_once(client, monkeypatch):
+    decodes = []
+    decode = deps.jwt.decode
+    monkeypatch.setattr(deps.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or decode(*args, **kwargs))
+    for _ in range(5):
+        assert client.get("/api/v1/crm/tags/").status_code == 200
+    assert len(decodes) == 1
+
+
+def test_entries_expire_with_the_token(token_cache, monkeypatch):
+    token = _token(timedelta(seconds=30))
+    assert deps._decode_token(token).user_id == 1
+    assert len(token_cache) == 1
+    now = time.monotonic()
+    monkeypatch.setattr("app.core.lru.time.monotonic", lambda: now + 60)
+    assert token_cache.get(hashlib.sha256(token.encode()).digest()) is None
+
+    with pytest.raises(HTTPException):
+        deps._decode_token(_token(timedelta(seconds=-1)))
+    assert len(token_cache) == 0
+
+
+def test_cache_skips_signature_checks(monkeypatch):
+    # Count the JWT decodes per request, with and without the cache
+    decodes = []
+    decode = deps.jwt.decode
+    monkeypatch.setattr(deps.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or decode(*args, **kwargs))
+    token, other = _token(), _token(timedelta(hours=2))
+
+    for _ in range(10):
+        deps._verified_tokens.clear()
+        deps._decode_token(token)
+    assert len(decodes) == 10
+
+    decodes.clear()
+    for _ in range(10):
+        deps._decode_token(token)
+        deps._decode_token(other)
+    assert len(decodes) == 1 # Only "other" missed the cache
@@ -0,0 +1,215 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app import crud, schemas
+from app.api.v1.endpoints import evolution
+from app.services import bulk_sender
+from app.services.bulk_sender import BulkDispatcher, BulkSendJob, RedisBulkSendState, TokenBucket
+from app.services.evolution_client import EvolutionAPIError, EvolutionTarget
+
+TARGET = EvolutionTarget(nome_instancia="inst", api_endpoint="http://evolution", api_key="key")
+
+
+class FakeClock:
+    """
+    Stands in for time.monotonic and asyncio.sleep: sleeping advances the clock.
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeRedis:
+    """
+    The few commands RedisBulkSendState uses, over a dict.
+    """
+    def __init__(self):
+        self.data = {}
+        self.evals = 0
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def eval(self, script, numkeys, key, rate, capacity):
+        self.evals += 1
+        return "0"
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+
+    async def send_text(target, payload):
+        if payload["number"] == "fail":
+            raise EvolutionAPIError("rejected", status_code=400)
+        messages.append(payload)
+        return {}
+
+    monkeypatch.setattr(bulk_sender.evolution_client, "send_text", send_text)
+    return messages
+
+
+def _job(*numbers):
+    return BulkSendJob(
+        instancia_id=1, empresa_id=1, target=TARGET,
+        messages=[{"number": number, "textMessage": {"text": "oi"}} for number in numbers],
+    )
+
+
+async def _drain(dispatcher):
+    await asyncio.gather(*dispatcher._workers.values())
+
+
+def test_token_bucket_spends_burst_then_waits_for_refill(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(bulk_sender, "time", clock)
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    bucket = TokenBucket(rate=2, capacity=3)
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    asyncio.run(take(5))
+
+    # Three tokens up front, then one every half second
+    assert clock.sleeps == [0.5, 0.5]
+    assert clock.now == 1.0
+
+
+def test_job_reports_sent_and_failed(sent):
+    dispatcher = BulkDispatcher(rate_per_second=1000, burst=1000, concurrency=2)
+
+    async def run():
+        job = await dispatcher.submit(_job("1", "fail", "2"))
+        await _drain(dispatcher)
+        return await dispatcher.get_status(job.id)
+
+    status = asyncio.run(run())
+
+    assert status["status"] == "completed"
+    assert (status["sent"], status["failed"], status["pending"]) == (2, 1, 0)
+    assert status["errors"][0]["number"] == "fail"
+    assert sorted(message["number"] for message in sent) == ["1", "2"]
+
+
+def test_cancelled_job_is_not_sent(sent):
+    dispatcher = BulkDispatcher(rate_per_second=1000, burst=1000)
+
+    async def run():
+        job = await dispatcher.submit(_job("1", "2"))
+        snapshot = await dispatcher.cancel(job.id)
+        await _drain(dispatcher)
+        return snapshot
+
+    assert asyncio.run(run())["status"] == "cancelled"
+    assert sent == []
+
+
+def test_shared_state_serves_jobs_of_other_workers(sent):
+    redis = FakeRedis()
+    running = BulkDispatcher(rate_per_second=1000, burst=1000, shared=RedisBulkSendState(redis))
+    other = BulkDispatcher(rate_per_second=1000, burst=1000, shared=RedisBulkSendState(redis))
+
+    async def run():
+        job = await running.submit(_job("1", "2"))
+        queued = await other.get_status(job.id)
+        await _drain(running)
+        return queued, await other.get_status(job.id)
+
+    queued, finished = asyncio.run(run())
+
+    assert queued["status"] == "queued"
+    assert finished["status"] == "completed" and finished["sent"] == 2
+    assert redis.evals == 2 # One shared bucket take per message
+
+
+def test_cancel_from_another_worker_stops_queued_job(sent):
+    redis = FakeRedis()
+    running = BulkDispatcher(rate_per_second=1000, burst=1000, shared=RedisBulkSendState(redis))
+    other = BulkDispatcher(rate_per_second=1000, burst=1000, shared=RedisBulkSendState(redis))
+
+    async def run():
+        job = await running.submit(_job("1", "2"))
+        await other.cancel(job.id) # Before the worker task gets to run
+        await _drain(running)
+        return await other.get_status(job.id)
+
+    assert asyncio.run(run())["status"] == "cancelled"
+    assert sent == []
+
+
+def test_memory_backend_refuses_several_workers(monkeypatch):
+    monkeypatch.setattr(bulk_sender.settings, "BULK_SEND_BACKEND", "memory")
+    monkeypatch.setattr(bulk_sender.settings, "WEB_CONCURRENCY", 4)
+
+    with pytest.raises(RuntimeError):
+        bulk_sender.create_bulk_dispatcher()
+
+
+@pytest.fixture
+def connected(db):
+    instancia = crud.instancia_evolution.create(
+        db, obj_in=schemas.InstanciaEvolutionCreate(nome_instancia="inst", empresa_id=1)
+    )
+    instancia.api_endpoint = "http://evolution"
+    instancia.api_key = "key"
+    instancia.status_conexao = "connected"
+    db.commit()
+    return instancia
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    jobs = []
+
+    async def submit(job):
+        jobs.append(job)
+        return job
+
+    monkeypatch.setattr(evolution, "bulk_dispatcher", SimpleNamespace(submit=submit))
+    return jobs
+
+
+def test_bulk_template_renders_variables(client, connected, submitted):
+    response = client.post(f"/api/v1/evolution/{connected.id}/send/bulk", json={
+        "text": "Oi {nome}, {desconhecido}",
+        "recipients": [{"number": "1", "variables": {"nome": "Ana"}}],
+    })
+
+    assert response.status_code == 202
+    assert submitted[0].messages[0]["textMessage"]["text"] == "Oi Ana, {desconhecido}"
+
+
+@pytest.mark.parametrize("text", ["Hi {}", "Oi {0}", "price {", "{nome.upper}", "{nome[0]}"])
+def test_bulk_invalid_template_is_rejected(client, connected, submitted, text):
+    response = client.post(f"/api/v1/evolution/{connected.id}/send/bulk", json={
+        "text": text, "recipients": [{"number": "1", "variables": {"nome": "Ana"}}],
+    })
+
+    assert response.status_code == 400
+    assert submitted == []
+
+
+def test_unknown_bulk_job_is_not_found(client, connected):
+    response = client.get(f"/api/v1/evolution/{connected.id}/send/bulk/missing")
+
+    assert response.status_code == 404
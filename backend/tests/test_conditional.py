@@ -0,0 +1,59 @@
+from app import models
+
+
+def _coluna_with_card(db):
+    board = models.Board(nome="Board", empresa_id=1)
+    db.add(board)
+    db.flush()
+    coluna = models.Coluna(nome="Coluna", ordem=1, board_id=board.id)
+    db.add(coluna)
+    db.flush()
+    card = models.Card(titulo="a", ordem=1024, coluna_id=coluna.id, empresa_id=1)
+    db.add(card)
+    db.commit()
+    return board.id, coluna.id, card.id
+
+
+def _revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+
+def test_cards_page_is_not_modified_until_a_card_changes(client, db):
+    _, coluna_id, card_id = _coluna_with_card(db)
+    url = f"/api/v1/crm/cards/by_coluna/{coluna_id}"
+    etag = client.get(url).headers["ETag"]
+
+    not_modified = _revalidate(client, url, etag)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    assert client.put(f"/api/v1/crm/cards/{card_id}", json={"titulo": "b"}).status_code == 200
+    changed = _revalidate(client, url, etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["items"][0]["titulo"] == "b"
+
+
+def test_board_etag_changes_with_its_cards(client, db):
+    board_id, _, card_id = _coluna_with_card(db)
+    url = f"/api/v1/crm/boards/{board_id}"
+    etag = client.get(url).headers["ETag"]
+    assert _revalidate(client, url, etag).status_code == 304
+
+    client.put(f"/api/v1/crm/cards/{card_id}", json={"titulo": "b"})
+
+    changed = _revalidate(client, url, etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_instancias_list_revalidates(client, db):
+    created = client.post("/api/v1/evolution/", json={"nome_instancia": "inst", "empresa_id": 1}).json()
+    url = "/api/v1/evolution/"
+    etag = client.get(url).headers["ETag"]
+    assert _revalidate(client, url, etag).status_code == 304
+
+    client.put(f"/api/v1/evolution/{created['id']}", json={"nome_instancia": "renomeada"})
+
+    assert _revalidate(client, url, etag).status_code == 200
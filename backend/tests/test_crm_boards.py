@@ -0,0 +1,60 @@
+from app import models
+
+
+def _board(db, colunas, cards):
+    board = models.Board(nome="Board", empresa_id=1)
+    db.add(board)
+    db.flush()
+    for c in range(colunas):
+        coluna = models.Coluna(nome=f"Coluna {c}", ordem=c, board_id=board.id)
+        db.add(coluna)
+        db.flush()
+        db.add_all([
+            models.Card(titulo=f"Card {c}.{i}", ordem=(i + 1) * 1024, coluna_id=coluna.id, empresa_id=1)
+            for i in range(cards)
+        ])
+    db.commit()
+    return board.id
+
+
+def _count(client, statements, url):
+    client.get(url) # Warm the per-process caches (token, user state, ownership)
+    statements.statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return len(statements), response.json()
+
+
+def test_snapshot_queries_dont_grow_with_the_board(client, db, statements):
+    small = _board(db, colunas=1, cards=1)
+    large = _board(db, colunas=15, cards=20)
+    small_count, _ = _count(client, statements, f"/api/v1/crm/boards/{small}/snapshot")
+    large_count, snapshot = _count(client, statements, f"/api/v1/crm/boards/{large}/snapshot")
+    assert 0 < large_count == small_count
+    assert [coluna["nome"] for coluna in snapshot["colunas"]] == [f"Coluna {c}" for c in range(15)]
+    assert all(len(coluna["cards"]) == 20 for coluna in snapshot["colunas"])
+
+
+def test_snapshot_fields_projection(client, db):
+    board_id = _board(db, colunas=2, cards=2)
+    snapshot = client.get(
+        f"/api/v1/crm/boards/{board_id}/snapshot", params={"fields": "nome,colunas.nome,cards.titulo"}
+    ).json()
+    assert snapshot == {
+        "nome": "Board",
+        "colunas": [
+            {"nome": f"Coluna {c}", "cards": [{"titulo": f"Card {c}.{i}"} for i in range(2)]} for c in range(2)
+        ],
+    }
+    assert client.get(f"/api/v1/crm/boards/{board_id}/snapshot", params={"fields": "senha"}).status_code == 400
+
+
+def test_board_list_queries_dont_grow_with_boards(client, db, statements):
+    _board(db, colunas=2, cards=2)
+    one_count, page = _count(client, statements, "/api/v1/crm/boards/")
+    assert len(page["items"]) == 1
+    for _ in range(9):
+        _board(db, colunas=3, cards=5)
+    ten_count, page = _count(client, statements, "/api/v1/crm/boards/")
+    assert len(page["items"]) == 10
+    assert 0 < ten_count == one_count
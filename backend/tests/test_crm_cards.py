@@ -0,0 +1,38 @@
+from sqlalchemy.dialects import mysql
+
+from app import crud, models, schemas
+
+
+def _coluna(db):
+    board = models.Board(nome="Board", empresa_id=1)
+    db.add(board)
+    db.flush()
+    coluna = models.Coluna(nome="Novo", ordem=1, board_id=board.id)
+    db.add(coluna)
+    db.commit()
+    return coluna.id
+
+
+def test_append_locks_the_coluna_before_inserting(db, statements):
+    coluna_id = _coluna(db)
+
+    crud.card.create_with_coluna_empresa(db, obj_in=schemas.CardCreate(titulo="a", coluna_id=coluna_id, empresa_id=1), coluna_id=coluna_id, empresa_id=1)
+
+    lock = next(i for i, s in enumerate(statements.statements) if s.lstrip().startswith("SELECT crm_colunas.id"))
+    insert = next(i for i, s in enumerate(statements.statements) if s.lstrip().startswith("INSERT INTO crm_cards"))
+    assert lock < insert
+    # SQLite has no FOR UPDATE; MySQL gets the row lock
+    assert "FOR UPDATE" in str(crud.card._lock_colunas([coluna_id]).compile(dialect=mysql.dialect()))
+
+
+def test_appends_get_distinct_positions(db):
+    coluna_id = _coluna(db)
+
+    single = [
+        crud.card.create_with_coluna_empresa(db, obj_in=schemas.CardCreate(titulo=str(i), coluna_id=coluna_id, empresa_id=1), coluna_id=coluna_id, empresa_id=1)
+        for i in range(3)
+    ]
+    many = crud.card.create_many(db, objs_in=[{"titulo": "x", "coluna_id": coluna_id, "empresa_id": 1}] * 2)
+
+    ordens = [card.ordem for card in single + many]
+    assert ordens == sorted(set(ordens))
@@ -0,0 +1,32 @@
+from app import crud, models
+
+
+def test_changes_are_numbered_from_the_version_table(client, db):
+    assert db.get(models.CrmVersion, 1).version == 0 # Created with the empresa
+    board = client.post("/api/v1/crm/boards/", json={"nome": "Vendas", "empresa_id": 1}).json()
+    client.post("/api/v1/crm/colunas/", json={"nome": "Novo", "board_id": board["id"]})
+
+    response = client.get("/api/v1/crm/changes/", params={"since": 0})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["version"] == crud.crm_change.get_version(db, empresa_id=1) == 2
+    assert [(c["entity"], c["deleted"]) for c in body["changes"]] == [("board", False), ("coluna", False)]
+    assert client.get("/api/v1/crm/changes/", params={"since": 3}).status_code == 410
+
+
+def test_writes_never_lock_the_empresa_row(client, statements):
+    # Inserting children holds shared locks on empresas: upgrading one to an
+    # exclusive lock in the same transaction deadlocks concurrent writers
+    client.post("/api/v1/crm/boards/", json={"nome": "Vendas", "empresa_id": 1})
+    writes = [s for s in statements.statements if s.lstrip().upper().startswith("UPDATE")]
+    assert any("crm_versions" in s for s in writes)
+    assert not any("empresas" in s.split("SET")[0] for s in writes)
+
+
+def test_version_row_created_when_missing(db):
+    db.query(models.CrmVersion).delete()
+    db.commit()
+    assert crud.crm_change._advance(db, 1, 3) == 3
+    assert crud.crm_change._advance(db, 1, 2) == 5
+    db.commit()
+    assert crud.crm_change.get_version(db, empresa_id=1) == 5
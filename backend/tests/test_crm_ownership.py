@@ -0,0 +1,60 @@
+from app import crud, models
+
+
+def _coluna(db, empresa_id=1):
+    board = models.Board(nome="Board", empresa_id=empresa_id)
+    db.add(board)
+    db.flush()
+    coluna = models.Coluna(nome="Coluna", ordem=1, board_id=board.id)
+    db.add(coluna)
+    db.commit()
+    return coluna
+
+
+def test_cached_owner_is_served_without_a_query(db, statements):
+    coluna = _coluna(db)
+    assert crud.ownership.empresa_of(db, models.Coluna, coluna.id) == 1
+    statements.statements.clear()
+
+    assert crud.ownership.empresa_of(db, models.Coluna, coluna.id) == 1
+
+    assert len(statements) == 0
+
+
+def test_card_move_drops_the_cached_owner(client, db):
+    source, target = _coluna(db), _coluna(db)
+    card = models.Card(titulo="Card", ordem=1024, coluna_id=source.id, empresa_id=1)
+    db.add(card)
+    db.commit()
+    crud.ownership.empresa_of(db, models.Card, card.id)
+    assert crud.ownership.cache.get(("crm_cards", card.id)) == 1
+
+    response = client.put(f"/api/v1/crm/cards/{card.id}", json={"coluna_id": target.id})
+
+    assert response.status_code == 200
+    assert crud.ownership.cache.get(("crm_cards", card.id)) is None
+
+
+def test_coluna_moved_to_another_board_changes_owner(db):
+    coluna = _coluna(db)
+    other_empresa = models.Empresa(nome="Outra")
+    db.add(other_empresa)
+    db.commit()
+    other_board = models.Board(nome="Outro", empresa_id=other_empresa.id)
+    db.add(other_board)
+    db.commit()
+    assert crud.ownership.empresa_of(db, models.Coluna, coluna.id) == 1
+
+    crud.coluna.update(db, db_obj=coluna, obj_in={"board_id": other_board.id})
+
+    assert crud.ownership.empresa_of(db, models.Coluna, coluna.id) == other_empresa.id
+
+
+def test_board_write_drops_its_colunas_owners(db):
+    coluna = _coluna(db)
+    crud.ownership.empresa_of(db, models.Coluna, coluna.id)
+    board = db.get(models.Board, coluna.board_id)
+
+    crud.board.update(db, db_obj=board, obj_in={"nome": "Renomeado"})
+
+    assert crud.ownership.cache.get(("crm_colunas", coluna.id)) is None
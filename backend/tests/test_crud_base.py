@@ -0,0 +1,50 @@
+from app import crud, models, schemas
+
+
+def test_create_instancia_binds_pydantic_types(client):
+    # api_endpoint is an HttpUrl: it must reach the driver as a string
+    response = client.post(
+        "/api/v1/evolution/",
+        json={"nome_instancia": "principal", "api_endpoint": "http://evolution:8080", "api_key": "k", "empresa_id": 1},
+    )
+    assert response.status_code == 200
+    assert response.json()["api_endpoint"].startswith("http://evolution:8080")
+
+
+def test_create_and_update_keep_native_values(db):
+    instancia = crud.instancia_evolution.create(
+        db, obj_in=schemas.InstanciaEvolutionCreate(nome_instancia="i", api_endpoint="http://evo/", empresa_id=1)
+    )
+    assert instancia.api_endpoint == "http://evo/"
+    crud.instancia_evolution.update(
+        db, db_obj=instancia, obj_in=schemas.InstanciaEvolutionUpdate(api_endpoint="http://other/")
+    )
+    db.expire_all()
+    assert db.get(models.InstanciaEvolution, instancia.id).api_endpoint == "http://other/"
+
+
+def _kinds(statements):
+    return [statement.split()[0].upper() for statement in statements.statements]
+
+
+def test_update_is_a_single_statement(db, statements):
+    instancia = crud.instancia_evolution.create(
+        db, obj_in=schemas.InstanciaEvolutionCreate(nome_instancia="i", empresa_id=1)
+    )
+    # Server defaults come back with the INSERT, not from a refresh
+    assert _kinds(statements) == ["INSERT"]
+    assert instancia.created_at is not None
+
+    statements.statements.clear()
+    crud.instancia_evolution.update(db, db_obj=instancia, obj_in={"nome_instancia": "j"})
+    assert _kinds(statements) == ["UPDATE"]
+    assert "nome_instancia" in statements.statements[0] and "api_key" not in statements.statements[0]
+
+
+def test_board_update_reads_nothing_back(db, statements):
+    board = crud.board.create(db, obj_in=schemas.BoardCreate(nome="Vendas", empresa_id=1))
+    statements.statements.clear()
+    crud.board.update(db, db_obj=board, obj_in=schemas.BoardUpdate(nome="Pós-venda"))
+    # The board row, then the change log entry and its version
+    assert "SELECT" not in _kinds(statements)
+    assert board.nome == "Pós-venda"
@@ -0,0 +1,55 @@
+from app import crud, models, schemas
+
+
+def _tags(count, prefix="tag"):
+    return [schemas.TagCreate(nome=f"{prefix}-{i}", empresa_id=1) for i in range(count)]
+
+
+def test_statements_per_chunk_not_per_row(db, statements):
+    # 10 rows and 300 rows (one chunk each) cost the same statements
+    counts = []
+    for count, prefix in ((10, "small"), (300, "large")):
+        statements.statements.clear()
+        tags = crud.tag.create_many(db, objs_in=_tags(count, prefix))
+        created = len(statements)
+        statements.statements.clear()
+        crud.tag.update_many(db, objs_in=[{"id": tag.id, "cor": "#000000"} for tag in tags])
+        updated = len(statements)
+        statements.statements.clear()
+        assert crud.tag.remove_many(db, ids=[tag.id for tag in tags]) == count
+        counts.append((created, updated, len(statements)))
+    assert counts[0] == counts[1]
+    assert db.query(models.Tag).count() == 0
+
+
+def test_bulk_card_endpoints(client):
+    board = client.post("/api/v1/crm/boards/", json={"nome": "Vendas", "empresa_id": 1}).json()
+    coluna = client.post("/api/v1/crm/colunas/", json={"nome": "Novo", "board_id": board["id"]}).json()
+    items = [{"titulo": f"c{i}", "coluna_id": coluna["id"], "empresa_id": 1} for i in range(5)]
+
+    cards = client.post("/api/v1/crm/cards/bulk", json={"items": items}).json()
+    assert [card["titulo"] for card in cards] == [f"c{i}" for i in range(5)]
+    assert [card["ordem"] for card in cards] == sorted(card["ordem"] for card in cards) # Appended in order
+
+    updates = [{"id": card["id"], "titulo": card["titulo"].upper()} for card in cards]
+    updated = client.put("/api/v1/crm/cards/bulk", json={"items": updates}).json()
+    assert [card["titulo"] for card in updated] == [f"C{i}" for i in range(5)]
+    assert [card["ordem"] for card in updated] == [card["ordem"] for card in cards]
+
+    ids = [card["id"] for card in cards]
+    assert client.post("/api/v1/crm/cards/bulk/delete", json={"ids": ids}).json() == {"deleted": 5}
+
+
+def test_bulk_insert_costs_a_fraction_of_single_rows(db, statements):
+    # One create per row round-trips per row; create_many per chunk
+    for tag_in in _tags(200, "single"):
+        crud.tag.create(db, obj_in=tag_in)
+    single = len(statements)
+
+    statements.statements.clear()
+    crud.tag.create_many(db, objs_in=_tags(200, "bulk"))
+    bulk = len(statements)
+
+    assert single >= 200
+    assert bulk * 20 < single
+    assert db.query(models.Tag).count() == 400
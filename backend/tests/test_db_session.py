@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import session as db_session
+from app.db.base_class import Base
+from app.db.pool import InstrumentedQueuePool, pool_stats
+from app.db.session import RoutingSession, engine, engine_options
+
+
+@pytest.fixture
+def replica(tmp_path):
+    # A copy of the schema standing in for the replica; reads there come back empty
+    replica_engine = create_engine(f"sqlite:///{tmp_path}/replica.db")
+    Base.metadata.create_all(replica_engine)
+    yield replica_engine
+    replica_engine.dispose()
+
+
+@pytest.fixture
+def executed_on():
+    """
+    Statements run on an engine from now until the end of the test.
+    """
+    listeners = []
+
+    def listen(bind):
+        executed = []
+
+        def record(conn, cursor, statement, *args):
+            executed.append(statement)
+
+        event.listen(bind, "before_cursor_execute", record)
+        listeners.append((bind, record))
+        return executed
+
+    yield listen
+    for bind, record in listeners:
+        event.remove(bind, "before_cursor_execute", record)
+
+
+def test_marked_reads_go_to_the_replica_until_the_first_write(replica, executed_on):
+    on_primary, on_replica = executed_on(engine), executed_on(replica)
+    db = sessionmaker(class_=RoutingSession, bind=engine, replica_bind=replica)()
+    try:
+        replica_read = select(models.Empresa).execution_options(replica=True)
+        assert db.scalars(replica_read).all() == [] # Replica hasn't got the seeded empresa
+        assert db.scalars(select(models.Empresa)).all() != [] # Unmarked: primary
+        on_replica.clear()
+
+        db.add(models.Empresa(nome="Nova"))
+        db.flush()
+        names = {empresa.nome for empresa in db.scalars(replica_read)}
+    finally:
+        db.rollback()
+        db.close()
+
+    # After the write the same marked read is served by the primary
+    assert "Nova" in names
+    assert on_replica == []
+    assert any(statement.startswith("INSERT") for statement in on_primary)
+
+
+def test_without_a_replica_marked_reads_use_the_primary(db):
+    assert db.scalars(select(models.Empresa).execution_options(replica=True)).all() != []
+
+
+def test_pool_metrics_track_checkouts(tmp_path):
+    url = f"sqlite:///{tmp_path}/pool.db"
+    options = engine_options(url)
+    assert options["poolclass"] is InstrumentedQueuePool
+    pooled = create_engine(url, **options)
+    try:
+        first = pooled.connect()
+        busy = pool_stats(pooled)
+        first.close()
+        idle = pool_stats(pooled)
+    finally:
+        pooled.dispose()
+
+    assert busy["checked_out"] == 1
+    assert idle["checked_out"] == 0
+    assert idle["checkout_wait_seconds"]["count"] == 1
+
+
+def test_in_memory_sqlite_keeps_the_default_pool():
+    assert "poolclass" not in engine_options("sqlite://")
+
+
+def test_db_pool_stats_cover_every_engine():
+    stats = db_session.db_pool_stats()
+    assert {"primary", "async_primary"} <= set(stats)
+    assert "checked_out" in stats["primary"]
@@ -0,0 +1,28 @@
+import asyncio
+
+from app.api import deps
+from app.db.session import SessionLocal
+
+
+def test_get_db_closes_the_session_off_the_loop(client, monkeypatch):
+    closed_on_loop = []
+
+    def session_factory():
+        db = SessionLocal()
+        close = db.close
+
+        def checked_close():
+            try:
+                asyncio.get_running_loop()
+                closed_on_loop.append(True)
+            except RuntimeError:
+                closed_on_loop.append(False)
+            close()
+
+        db.close = checked_close
+        return db
+
+    monkeypatch.setattr(deps, "SessionLocal", session_factory)
+    assert client.get("/api/v1/crm/tags/").status_code == 200
+    assert closed_on_loop and not any(closed_on_loop)
+    assert deps.db_session_stats()["waiting"] == 0
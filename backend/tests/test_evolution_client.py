@@ -0,0 +1,117 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import evolution_client as evolution_client_module
+from app.services.evolution_client import EvolutionAPIError, EvolutionClient, EvolutionTarget
+
+TARGET = EvolutionTarget(nome_instancia="inst", api_endpoint="http://evolution/", api_key="key")
+
+
+class ResponseQueue(list):
+    """
+    Responses (or exceptions) served in order, and the requests that got them.
+    """
+    requests = None
+
+
+def _serve(monkeypatch, queue):
+    queue.requests = []
+
+    def handler(request):
+        queue.requests.append(request)
+        item = queue.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        evolution_client_module.httpx, "AsyncClient",
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+
+
+@pytest.fixture
+def client():
+    # No backoff sleeps between retries
+    return EvolutionClient(max_retries=2, backoff_base=0)
+
+
+def _run(client, coro):
+    async def run():
+        try:
+            return await coro
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_retries_transient_status_then_succeeds(monkeypatch, client):
+    queue = ResponseQueue([httpx.Response(503), httpx.Response(200, json={"ok": True})])
+    _serve(monkeypatch, queue)
+
+    assert _run(client, client.send_text(TARGET, {"number": "1"})) == {"ok": True}
+
+    metrics = client.stats()["instances"]["inst"]
+    assert (metrics["requests"], metrics["errors"], metrics["retries"]) == (2, 1, 1)
+    assert queue.requests[-1].url.path == "/message/sendText/inst"
+    assert queue.requests[-1].headers["apikey"] == "key"
+
+
+def test_retries_connect_errors(monkeypatch, client):
+    queue = ResponseQueue([httpx.ConnectError("refused"), httpx.Response(200, json={})])
+    _serve(monkeypatch, queue)
+
+    _run(client, client.send_text(TARGET, {"number": "1"}))
+
+    assert client.stats()["instances"]["inst"]["retries"] == 1
+
+
+def test_client_errors_are_not_retried(monkeypatch, client):
+    queue = ResponseQueue([httpx.Response(400, text="bad number")])
+    _serve(monkeypatch, queue)
+
+    with pytest.raises(EvolutionAPIError) as error:
+        _run(client, client.send_text(TARGET, {"number": "x"}))
+
+    assert error.value.status_code == 400
+    assert len(queue.requests) == 1
+
+
+def test_gives_up_after_max_retries(monkeypatch, client):
+    queue = ResponseQueue([httpx.Response(502)] * 3)
+    _serve(monkeypatch, queue)
+
+    with pytest.raises(EvolutionAPIError) as error:
+        _run(client, client.send_text(TARGET, {"number": "1"}))
+
+    assert error.value.status_code == 502
+    assert len(queue.requests) == 3
+
+
+def test_one_pool_per_endpoint(monkeypatch, client):
+    queue = ResponseQueue([httpx.Response(200, json={})] * 3)
+    _serve(monkeypatch, queue)
+    other = EvolutionTarget(nome_instancia="other", api_endpoint="http://evolution", api_key="key2")
+
+    async def calls():
+        await client.send_text(TARGET, {"number": "1"})
+        await client.send_text(TARGET, {"number": "2"})
+        await client.send_text(other, {"number": "3"})
+        return client.stats()["pools"]
+
+    # Same endpoint, with or without the trailing slash, shares one pool
+    assert _run(client, calls()) == 1
+    assert set(client.stats()["instances"]) == {"inst", "other"}
+
+
+def test_missing_credentials_fail_without_request(monkeypatch, client):
+    queue = ResponseQueue()
+    _serve(monkeypatch, queue)
+
+    with pytest.raises(EvolutionAPIError):
+        _run(client, client.send_text(EvolutionTarget("inst", None, None), {"number": "1"}))
+
+    assert queue.requests == []
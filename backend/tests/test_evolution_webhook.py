@@ -0,0 +1,110 @@
+import asyncio
+import base64
+
+import pytest
+
+from app import crud, models, schemas
+from app.api.v1.endpoints import evolution
+from app.services import evolution_webhook, webhook_dedup
+from app.services.qr_store import MemoryQRCodeBackend, QRCodeStore
+from app.services.webhook_dedup import MemoryDedupBackend, WebhookDeduplicator
+
+PNG = base64.b64encode(b"\x89PNG fake").decode()
+
+
+class OffLoopCheck:
+    """
+    Mixin flagging a memory backend as blocking and counting calls on the loop.
+    """
+    blocking = True
+    calls_on_loop = 0
+
+    def _check(self):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.calls_on_loop += 1
+
+
+class NetworkDedupBackend(OffLoopCheck, MemoryDedupBackend):
+    def __init__(self):
+        super().__init__(window=60, maxsize=100)
+
+    def add(self, key):
+        self._check()
+        return super().add(key)
+
+    def forget(self, key):
+        self._check()
+        super().forget(key)
+
+
+@pytest.fixture
+def instancia(db):
+    return crud.instancia_evolution.create(
+        db, obj_in=schemas.InstanciaEvolutionCreate(nome_instancia="inst", empresa_id=1)
+    )
+
+
+def _message(id):
+    return {
+        "key": {"remoteJid": "5511999999999@s.whatsapp.net", "id": id, "fromMe": False},
+        "message": {"conversation": "oi"},
+        "messageTimestamp": 1700000000,
+    }
+
+
+def test_blocking_dedup_runs_off_the_loop(client, db, instancia, monkeypatch):
+    backend = NetworkDedupBackend()
+    monkeypatch.setattr(evolution_webhook, "webhook_deduplicator", WebhookDeduplicator(backend))
+    payload = {"event": "messages.upsert", "data": [_message("a"), _message("b")]}
+
+    assert client.post("/api/v1/evolution/webhook/inst", json=payload).status_code == 200
+    # Redelivery: both dropped
+    assert client.post("/api/v1/evolution/webhook/inst", json=payload).status_code == 200
+
+    assert backend.calls_on_loop == 0
+    assert db.query(models.Mensagem).count() == 2
+
+
+class NetworkQRCodeBackend(OffLoopCheck, MemoryQRCodeBackend):
+    def __init__(self):
+        super().__init__(ttl=60, maxsize=100)
+
+    def put(self, instancia_id, png):
+        self._check()
+        return super().put(instancia_id, png)
+
+    def clear(self, instancia_id):
+        self._check()
+        super().clear(instancia_id)
+
+
+def test_blocking_qr_store_runs_off_the_loop(client, instancia, monkeypatch):
+    backend = NetworkQRCodeBackend()
+    store = QRCodeStore(backend)
+    monkeypatch.setattr(evolution_webhook, "qr_store", store)
+    monkeypatch.setattr(evolution, "qr_store", store)
+    url = f"/api/v1/evolution/{instancia.id}/qrcode"
+
+    payload = {"event": "qrcode.updated", "data": {"qrcode": {"base64": f"data:image/png;base64,{PNG}"}}}
+    assert client.post("/api/v1/evolution/webhook/inst", json=payload).status_code == 200
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == base64.b64decode(PNG)
+    assert response.headers["X-QR-Version"] == "1"
+
+    payload = {"event": "connection.update", "data": {"state": "open"}}
+    assert client.post("/api/v1/evolution/webhook/inst", json=payload).status_code == 200
+    assert client.get(url).status_code == 404
+    assert backend.calls_on_loop == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "bloom"])
+def test_process_local_dedup_refuses_several_workers(monkeypatch, backend):
+    monkeypatch.setattr(webhook_dedup.settings, "WEBHOOK_DEDUP_BACKEND", backend)
+    monkeypatch.setattr(webhook_dedup.settings, "WEB_CONCURRENCY", 4)
+
+    with pytest.raises(RuntimeError):
+        webhook_dedup.create_deduplicator()
@@ -0,0 +1,66 @@
+import pytest
+
+from app import crud, models, schemas
+
+
+@pytest.fixture(autouse=True)
+def clear_staged_state():
+    # The crud singleton outlives each test's tables
+    crud.instancia_evolution._pending_state.clear()
+    crud.instancia_evolution._last_heartbeat.clear()
+    yield
+
+
+def _instancia(db, nome):
+    return crud.instancia_evolution.create(
+        db, obj_in=schemas.InstanciaEvolutionCreate(nome_instancia=nome, empresa_id=1)
+    )
+
+
+def test_staged_changes_coalesce_into_one_update_per_instancia(db, statements):
+    first, second = _instancia(db, "a"), _instancia(db, "b")
+    for status in ("connecting", "qrcode", "connected"):
+        crud.instancia_evolution.stage_state(instancia_id=first.id, obj_in={"status_conexao": status})
+    crud.instancia_evolution.stage_heartbeat(instancia_id=first.id)
+    crud.instancia_evolution.stage_state(instancia_id=second.id, obj_in={"status_conexao": "close"})
+    statements.statements.clear()
+
+    assert crud.instancia_evolution.flush_state(db) == 2
+
+    assert sum(s.lstrip().startswith("UPDATE") for s in statements.statements) == 2
+    db.expire_all()
+    assert db.get(models.InstanciaEvolution, first.id).status_conexao == "connected"
+    assert db.get(models.InstanciaEvolution, first.id).last_webhook_received is not None
+    assert db.get(models.InstanciaEvolution, second.id).status_conexao == "close"
+
+
+def test_heartbeat_is_debounced(db):
+    instancia = _instancia(db, "a")
+    crud.instancia_evolution.stage_heartbeat(instancia_id=instancia.id)
+    assert crud.instancia_evolution.flush_state(db) == 1
+
+    crud.instancia_evolution.stage_heartbeat(instancia_id=instancia.id)
+    assert crud.instancia_evolution.flush_state(db) == 0
+
+
+def test_failed_flush_restages_without_losing_newer_changes(db, monkeypatch):
+    instancia = _instancia(db, "a")
+    crud.instancia_evolution.stage_state(
+        instancia_id=instancia.id, obj_in={"status_conexao": "connecting", "api_key": "old"}
+    )
+
+    def failing_commit():
+        # A webhook staged a newer status while the flush was running
+        crud.instancia_evolution.stage_state(instancia_id=instancia.id, obj_in={"status_conexao": "connected"})
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(db, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        crud.instancia_evolution.flush_state(db)
+    monkeypatch.undo()
+
+    assert crud.instancia_evolution._pending_state[instancia.id] == {"status_conexao": "connected", "api_key": "old"}
+    assert crud.instancia_evolution.flush_state(db) == 1
+    db.expire_all()
+    stored = db.get(models.InstanciaEvolution, instancia.id)
+    assert (stored.status_conexao, stored.api_key) == ("connected", "old")
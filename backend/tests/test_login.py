@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+import httpx
+from passlib.context import CryptContext
+
+from app import crud, models
+from app.api.v1.endpoints import login
+from app.core import security
+from app.main import app
+from tests.conftest import PASSWORD
+
+LOGIN = "/api/v1/login/access-token"
+
+
+def _form(password=PASSWORD):
+    return {"username": "supervisor@example.com", "password": password}
+
+
+def test_bcrypt_runs_on_the_password_pool(client, monkeypatch):
+    threads = []
+    verify_and_update = security._verify_and_update
+
+    def recording(plain_password, hashed_password):
+        threads.append(threading.current_thread().name)
+        return verify_and_update(plain_password, hashed_password)
+
+    monkeypatch.setattr(security, "_verify_and_update", recording)
+    assert client.post(LOGIN, data=_form()).status_code == 200
+    assert threads and all(name.startswith("password") for name in threads)
+
+
+def test_outdated_hash_is_upgraded_on_login(client, db):
+    user = db.query(models.Usuario).filter_by(email="supervisor@example.com").one()
+    user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash(PASSWORD)
+    db.commit()
+    rehashed = crud.usuario.rehashed.value
+
+    assert client.post(LOGIN, data=_form()).status_code == 200
+    db.expire_all()
+    assert user.hashed_password.startswith(f"$2b${security.settings.BCRYPT_ROUNDS:02d}$")
+    assert crud.usuario.rehashed.value == rehashed + 1
+
+
+def test_login_burst_is_counted():
+    # Load check: a burst of concurrent logins, every one answered and counted
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            forms = [_form() for _ in range(15)] + [_form("wrong") for _ in range(5)]
+            return await asyncio.gather(*(http.post(LOGIN, data=form) for form in forms))
+
+    before = login.login_stats()
+    responses = asyncio.run(burst())
+    after = login.login_stats()
+    assert sorted(response.status_code for response in responses) == [200] * 15 + [400] * 5
+    assert after["succeeded"] - before["succeeded"] == 15
+    assert after["failed"] - before["failed"] == 5
+
+
+def test_user_create_and_update_hash_without_blocking(client, monkeypatch):
+    def blocking(password):
+        raise AssertionError("sync hash on a request thread")
+
+    monkeypatch.setattr(crud.crud_usuario, "get_password_hash", blocking)
+    created = client.post("/api/v1/usuarios/", json={
+        "email": "agente@example.com", "nome": "Agente", "password": "first", "empresa_id": 1,
+    })
+    assert created.status_code == 200
+    user_id = created.json()["id"]
+    assert client.put(f"/api/v1/usuarios/{user_id}", json={"password": "second"}).status_code == 200
+
+    login_form = {"username": "agente@example.com", "password": "second"}
+    assert client.post(LOGIN, data=login_form).status_code == 200
+    assert client.post(LOGIN, data=dict(login_form, password="first")).status_code == 400
@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import pytest
+
+from app import crud, models, schemas
+
+
+@pytest.fixture(autouse=True)
+def clear_id_caches():
+    # Ids are reused across tests
+    crud.contato.id_cache.clear()
+    crud.conversa.id_cache.clear()
+    yield
+
+
+@pytest.fixture
+def instancia(db):
+    return crud.instancia_evolution.create(
+        db, obj_in=schemas.InstanciaEvolutionCreate(nome_instancia="inst", empresa_id=1)
+    )
+
+
+def _message(remote_jid, message_id):
+    return {
+        "remote_jid": remote_jid, "nome": None, "message_id": message_id, "from_me": False,
+        "tipo": "conversation", "conteudo": "oi", "timestamp": datetime(2024, 1, 1),
+    }
+
+
+def test_partial_conflict_still_creates_the_other_rows(db, instancia, monkeypatch):
+    # Another worker commits contato "b" after this one looked for it
+    db.add(models.Contato(empresa_id=1, remote_jid="b"))
+    db.commit()
+    select_ids = crud.contato._select_ids
+    calls = []
+
+    def stale_first_select(db, **kwargs):
+        calls.append(kwargs)
+        return {} if len(calls) == 1 else select_ids(db, **kwargs)
+
+    monkeypatch.setattr(crud.contato, "_select_ids", stale_first_select)
+
+    rows = crud.mensagem.create_from_webhook(
+        db, empresa_id=1, instancia_id=instancia.id,
+        messages=[_message("a", "1"), _message("b", "2"), _message("c", "3")],
+    )
+
+    assert len(rows) == 3
+    assert calls[-1]["for_update"] # Re-read with a locking read
+    jids = {contato.remote_jid for contato in db.query(models.Contato)}
+    assert jids == {"a", "b", "c"}
+    assert db.query(models.Conversa).count() == 3
+
+
+def test_partial_conflict_on_conversas(db, instancia, monkeypatch):
+    contato = models.Contato(empresa_id=1, remote_jid="a")
+    db.add(contato)
+    db.commit()
+    db.add(models.Conversa(empresa_id=1, instancia_id=instancia.id, contato_id=contato.id, last_message_at=datetime(2024, 1, 1)))
+    db.commit()
+    select_ids = crud.conversa._select_ids
+    calls = []
+
+    def stale_first_select(db, **kwargs):
+        calls.append(kwargs)
+        return {} if len(calls) == 1 else select_ids(db, **kwargs)
+
+    monkeypatch.setattr(crud.conversa, "_select_ids", stale_first_select)
+
+    rows = crud.mensagem.create_from_webhook(
+        db, empresa_id=1, instancia_id=instancia.id, messages=[_message("a", "1"), _message("b", "2")],
+    )
+
+    assert len({row["conversa_id"] for row in rows}) == 2
+    assert db.query(models.Conversa).count() == 2
+
+
+def test_redelivered_messages_are_stored_once(db, instancia):
+    first = crud.mensagem.create_from_webhook(
+        db, empresa_id=1, instancia_id=instancia.id, messages=[_message("a", "1"), _message("a", "1")],
+    )
+    again = crud.mensagem.create_from_webhook(
+        db, empresa_id=1, instancia_id=instancia.id, messages=[_message("a", "1"), _message("a", "2")],
+    )
+
+    assert [row["message_id"] for row in first] == ["1"]
+    assert [row["message_id"] for row in again] == ["2"]
+    assert db.query(models.Mensagem).count() == 2
+
+
+def test_unique_key_skips_message_stored_concurrently(db, instancia, monkeypatch):
+    crud.mensagem.create_from_webhook(db, empresa_id=1, instancia_id=instancia.id, messages=[_message("a", "1")])
+    # Another worker stored "1" after this one checked
+    monkeypatch.setattr(crud.mensagem, "_drop_stored", lambda db, instancia_id, messages: messages)
+
+    crud.mensagem.create_from_webhook(
+        db, empresa_id=1, instancia_id=instancia.id, messages=[_message("a", "1"), _message("a", "2")],
+    )
+
+    assert sorted(m.message_id for m in db.query(models.Mensagem)) == ["1", "2"]
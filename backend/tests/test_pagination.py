@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+
+import check_query_plans
+from app import crud, models
+from app.crud.pagination import encode_cursor
+from app.db.session import engine
+
+
+@pytest.fixture
+def coluna(client):
+    board = client.post("/api/v1/crm/boards/", json={"nome": "Vendas", "empresa_id": 1}).json()
+    return client.post("/api/v1/crm/colunas/", json={"nome": "Novo", "board_id": board["id"]}).json()
+
+
+def _all_pages(client, url, limit):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get(url, params=params).json()
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_pages_cover_every_card_once(client, db, coluna):
+    # Equal positions are ordered by id
+    db.add_all([models.Card(titulo=f"c{i}", ordem=i % 3, coluna_id=coluna["id"], empresa_id=1) for i in range(10)])
+    db.commit()
+    ids = _all_pages(client, f"/api/v1/crm/cards/by_coluna/{coluna['id']}", limit=3)
+    expected = [card.id for card in db.query(models.Card).order_by(models.Card.ordem, models.Card.id)]
+    assert ids == expected and len(ids) == 10
+
+
+def test_ordem_is_never_null(client, db, coluna):
+    card = client.post(
+        "/api/v1/crm/cards/", json={"titulo": "a", "coluna_id": coluna["id"], "empresa_id": 1}
+    ).json()
+    assert client.put(f"/api/v1/crm/cards/{card['id']}", json={"ordem": None}).status_code == 422
+    assert client.put(f"/api/v1/crm/colunas/{coluna['id']}", json={"ordem": None}).status_code == 422
+    # Omitted, it is kept
+    assert client.put(f"/api/v1/crm/cards/{card['id']}", json={"titulo": "b"}).json()["ordem"] == card["ordem"]
+
+    with pytest.raises(IntegrityError):
+        db.execute(insert(models.Card.__table__).values(titulo="x", ordem=None, coluna_id=coluna["id"], empresa_id=1))
+
+
+def test_deep_pages_cost_the_same(db, coluna):
+    # The last page seeks through the (coluna_id, ordem) index like the
+    # first, with no OFFSET to read through and no sort
+    db.execute(
+        insert(models.Card.__table__),
+        [{"titulo": f"c{i}", "ordem": i, "coluna_id": coluna["id"], "empresa_id": 1} for i in range(2000)],
+    )
+    db.commit()
+    deep_cursor = encode_cursor(1900, db.query(models.Card.id).filter_by(ordem=1900).scalar())
+
+    def page(cursor):
+        captured = []
+        listener = lambda conn, cur, statement, parameters, context, many: captured.append((statement, parameters))
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            items, _ = crud.card.get_page_by_coluna(db, coluna_id=coluna["id"], cursor=cursor, limit=50)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        return items, captured[-1]
+
+    def plan(statement, parameters):
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            assert check_query_plans._full_scans(connection, statement, parameters) == []
+        return [row[-1] for row in rows]
+
+    _, (first_statement, first_parameters) = page(None)
+    items, (deep_statement, deep_parameters) = page(deep_cursor)
+
+    assert [card.ordem for card in items] == list(range(1901, 1951))
+    # SQLite always renders an OFFSET along with LIMIT; it must stay 0
+    assert first_parameters[-2:] == (51, 0) and deep_parameters[-2:] == (51, 0)
+    for statement, parameters in ((first_statement, first_parameters), (deep_statement, deep_parameters)):
+        steps = plan(statement, parameters)
+        assert any("USING INDEX" in step for step in steps)
+        assert not any("TEMP B-TREE" in step for step in steps) # Ordered by the index, no sort
@@ -0,0 +1,22 @@
+import pytest
+
+from app.core.config import settings
+from app.services.qr_store import MemoryQRCodeBackend, QRCodeStore, create_qr_store
+
+
+def test_memory_store_refuses_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "QR_CODE_STORE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    with pytest.raises(RuntimeError):
+        create_qr_store()
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)
+    assert isinstance(create_qr_store().backend, MemoryQRCodeBackend)
+
+
+def test_versions_and_invalid_codes():
+    store = QRCodeStore(MemoryQRCodeBackend(ttl=60, maxsize=10))
+    assert store.put(1, "aGVsbG8=") == 1
+    assert store.put(1, "data:image/png;base64,aGVsbG8=") == 2
+    assert store.get(1).png == b"hello"
+    assert store.put(1, "not base64!") is None # Clears the previous code
+    assert store.get(1) is None
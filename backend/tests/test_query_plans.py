@@ -0,0 +1,6 @@
+import check_query_plans
+
+
+def test_crud_queries_use_indexes():
+    # On a fresh in-memory database built from the migrations
+    assert check_query_plans.find_full_scans("sqlite://") == []
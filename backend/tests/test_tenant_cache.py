@@ -0,0 +1,44 @@
+import pytest
+
+from app.core.config import settings
+from app.crud.crud_ownership import CRUDOwnership
+from app.models.crm import Tag
+from app.models.empresa import Empresa
+from app.services.tenant_cache import TenantCache, create_tenant_cache
+
+
+def test_memory_cache_refuses_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "TENANT_CACHE_BACKEND", "memory")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 2)
+    with pytest.raises(RuntimeError):
+        create_tenant_cache()
+    monkeypatch.setattr(settings, "TENANT_CACHE_BACKEND", "none")
+    assert not create_tenant_cache().enabled
+
+
+def test_invalidate_makes_cached_reads_unreachable():
+    cache = TenantCache(maxsize=10, ttl=60)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return f'"{len(loads)}"'
+
+    assert cache.get_or_load("tags", 1, (), loader).body == '"1"'
+    assert cache.get_or_load("tags", 1, (), loader).body == '"1"'
+    cache.invalidate(["tags"], [1])
+    assert cache.get_or_load("tags", 1, (), loader).body == '"2"'
+
+
+def test_ownership_entries_expire(db, monkeypatch):
+    ownership = CRUDOwnership(ttl=60)
+    tag = Tag(nome="vip", empresa_id=1)
+    db.add_all([tag, Empresa(nome="Outra")])
+    db.commit()
+    assert ownership.empresa_of(db, Tag, tag.id) == 1
+    # Another worker moves the tag: this one sees it once the entry expires
+    db.query(Tag).filter(Tag.id == tag.id).update({"empresa_id": 2})
+    db.commit()
+    assert ownership.empresa_of(db, Tag, tag.id) == 1
+    monkeypatch.setattr("app.core.lru.time.monotonic", lambda: 10 ** 9)
+    assert ownership.empresa_of(db, Tag, tag.id) == 2
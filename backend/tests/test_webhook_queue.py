@@ -0,0 +1,42 @@
+import asyncio
+
+from app.services.webhook_queue import FileQueueBackend, WebhookQueue
+
+
+def _run_queue(path, handler, bodies):
+    async def run():
+        queue = WebhookQueue(FileQueueBackend(10, path), handler, workers=1)
+        for body in bodies:
+            queue.enqueue("inst", body)
+        queue.start()
+        for _ in range(20):
+            await asyncio.sleep(0)
+        await queue.stop()
+        return queue
+
+    return asyncio.run(run())
+
+
+def test_job_interrupted_by_stop_is_recovered(tmp_path):
+    path = str(tmp_path / "spool.jsonl")
+
+    async def hang(instancia_nome, event):
+        await asyncio.Event().wait()
+
+    _run_queue(path, hang, ['{"n": 1}'])
+    recovered = FileQueueBackend(10, path)
+    assert recovered.qsize() == 1
+    recovered.close()
+
+
+def test_failed_job_is_acked(tmp_path):
+    path = str(tmp_path / "spool.jsonl")
+
+    async def fail(instancia_nome, event):
+        raise RuntimeError("boom")
+
+    queue = _run_queue(path, fail, ['{"n": 1}', '{"n": 2}'])
+    assert queue.failed.value == 2
+    recovered = FileQueueBackend(10, path)
+    assert recovered.qsize() == 0
+    recovered.close()
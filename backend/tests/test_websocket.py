@@ -0,0 +1,230 @@
+import asyncio
+
+from app.services.websocket_backplane import InProcessBackplane, RedisBackplane
+from app.services.websocket_manager import ConnectionManager, manager
+
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0, hang=False, error=None):
+        self.delay = delay
+        self.hang = hang
+        self.error = error
+        self.sent = []
+        self.scope = {}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data):
+        if self.error is not None:
+            raise self.error
+        if self.hang:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+    async def close(self, code):
+        pass
+
+
+async def _settle(seconds=0.0):
+    await asyncio.sleep(seconds)
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class FailingWebSocket:
+    def __init__(self):
+        self.closed_with = None
+        self.scope = {}
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data):
+        raise ValueError("can't encode")
+
+    async def close(self, code):
+        self.closed_with = code
+
+
+def test_echo_is_a_json_event(client):
+    with client.websocket_connect("/api/v1/ws/ws/1/1") as websocket:
+        websocket.send_text('{"type": "ping"}')
+        assert websocket.receive_json() == {"type": "message_received", "data": {"type": "ping"}}
+        websocket.send_text("not json")
+        assert websocket.receive_json()["type"] == "error"
+
+
+def test_binary_frames_dont_break_the_connection(client):
+    with client.websocket_connect("/api/v1/ws/ws/1/1") as websocket:
+        # Not valid msgpack (nor decodable without msgpack installed)
+        websocket.send_bytes(b"\xc1")
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text("[1, 2]")
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text('{"type": "ping"}')
+        assert websocket.receive_json()["type"] == "message_received"
+
+
+def test_closed_socket_is_removed_from_the_manager(client):
+    with client.websocket_connect("/api/v1/ws/ws/1/7") as websocket:
+        websocket.send_text('{"type": "ping"}')
+        websocket.receive_json()
+        assert 7 in manager.active_connections.get(1, {})
+
+    assert 7 not in manager.active_connections.get(1, {})
+
+
+def test_writer_error_disconnects():
+    async def run():
+        manager = ConnectionManager(backplane=InProcessBackplane())
+        websocket = FailingWebSocket()
+        await manager.connect(websocket, 1, 1)
+        await manager.send_personal_message({"type": "x"}, 1, 1)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return manager, websocket
+
+    manager, websocket = asyncio.run(run())
+    assert manager.active_connections == {}
+    assert manager.send_errors.value == 1
+    assert websocket.closed_with == 1011
+
+
+def test_slow_and_dead_sockets_dont_affect_the_others():
+    async def run():
+        manager = ConnectionManager(
+            backplane=InProcessBackplane(), queue_size=2, send_timeout=60, slow_consumer_policy="disconnect"
+        )
+        healthy = [FakeWebSocket() for _ in range(3)]
+        slow, dead = FakeWebSocket(hang=True), FakeWebSocket(error=RuntimeError("closed"))
+        for user_id, websocket in enumerate(healthy + [slow, dead]):
+            await manager.connect(websocket, 1, user_id)
+        for i in range(5):
+            await manager.broadcast_to_empresa({"n": i}, 1)
+            await _settle()
+        return manager, healthy
+
+    manager, healthy = asyncio.run(run())
+    assert all(len(websocket.sent) == 5 for websocket in healthy)
+    assert manager.slow_consumer_disconnects.value == 1
+    assert manager.send_errors.value == 1
+    assert sorted(manager.active_connections[1]) == [0, 1, 2]
+
+
+class GatedWebSocket(FakeWebSocket):
+    """
+    Sends block until the gate opens.
+    """
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+
+    async def send_text(self, data):
+        await self.gate.wait()
+        self.sent.append(data)
+
+
+def test_broadcast_doesnt_wait_for_sends():
+    # Broadcasting only enqueues: it returns while every send is still
+    # blocked, with 10 connections as with 500
+    async def run(connections):
+        manager = ConnectionManager(backplane=InProcessBackplane(), send_timeout=60)
+        gate = asyncio.Event()
+        sockets = [GatedWebSocket(gate) for _ in range(connections)]
+        for user_id, websocket in enumerate(sockets):
+            await manager.connect(websocket, 1, user_id)
+        await manager.broadcast_to_empresa({"type": "x"}, 1)
+        delivered_on_return = sum(len(websocket.sent) for websocket in sockets)
+        gate.set()
+        await _settle()
+        delivered = sum(len(websocket.sent) for websocket in sockets)
+        await manager.stop()
+        return delivered_on_return, delivered
+
+    for connections in (10, 500):
+        delivered_on_return, delivered = asyncio.run(run(connections))
+        assert delivered_on_return == 0
+        assert delivered == connections
+
+
+class FakeRedisBus:
+    """
+    In-memory stand-in for Redis pub/sub, shared by the clients of every "worker".
+    """
+    def __init__(self):
+        self.subscribers = []
+
+    def client(self):
+        return FakeRedisClient(self)
+
+
+class FakeRedisClient:
+    def __init__(self, bus):
+        self.bus = bus
+
+    async def publish(self, channel, data):
+        for subscriber in list(self.bus.subscribers):
+            if channel in subscriber.channels:
+                subscriber.queue.put_nowait({"type": "message", "data": data})
+
+    def pubsub(self):
+        return FakePubSub(self.bus)
+
+    async def aclose(self):
+        pass
+
+
+class FakePubSub:
+    def __init__(self, bus):
+        self.bus = bus
+        self.channels = set()
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.channels.add(channel)
+        self.bus.subscribers.append(self)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        self.bus.subscribers.remove(self)
+
+
+def test_redis_backplane_reaches_other_workers_once():
+    async def run():
+        bus = FakeRedisBus()
+        workers = [
+            ConnectionManager(backplane=RedisBackplane("ws", client=bus.client()), send_timeout=60)
+            for _ in range(2)
+        ]
+        for worker in workers:
+            await worker.start()
+        await _settle()
+        # User 1 has two tabs on worker 0 and one on worker 1; user 2 is on worker 1
+        tabs = [FakeWebSocket(), FakeWebSocket(), FakeWebSocket()]
+        other_user = FakeWebSocket()
+        await workers[0].connect(tabs[0], 1, 1)
+        await workers[0].connect(tabs[1], 1, 1)
+        await workers[1].connect(tabs[2], 1, 1)
+        await workers[1].connect(other_user, 1, 2)
+
+        await workers[0].send_personal_message({"type": "personal"}, 1, 1)
+        await workers[1].broadcast_to_empresa({"type": "broadcast"}, 1, exclude_user_id=2)
+        await _settle()
+        stats = [worker.backplane.stats() for worker in workers]
+        for worker in workers:
+            await worker.stop()
+        return tabs, other_user, stats
+
+    tabs, other_user, stats = asyncio.run(run())
+    # Each tab gets each message exactly once: no echo of a worker's own publish
+    assert all(
+        sorted(websocket.sent) == ['{"type":"broadcast"}', '{"type":"personal"}'] for websocket in tabs
+    )
+    assert other_user.sent == []
+    assert [s["published"] for s in stats] == [1, 1]
+    assert [s["received"] for s in stats] == [1, 1]
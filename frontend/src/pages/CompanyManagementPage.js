@@ -18,8 +18,8 @@ function CompanyManagementPage() {
       if (user?.is_superuser) {
         try {
           setLoading(true);
-          const data = await getCompanies();
-          setCompanies(data);
+          const page = await getCompanies();
+          setCompanies(page.items);
           setError('');
         } catch (err) {
           setError('Falha ao carregar empresas.');
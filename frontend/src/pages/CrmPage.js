@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { DragDropContext, Droppable, Draggable } from 'react-beautiful-dnd';
-import { getBoards, getColumnsByBoard, getCardsByColumn, updateCard } from '../services/api'; // Assuming API functions exist
+import { getBoards, getBoardSnapshot, reorderCards } from '../services/api'; // Assuming API functions exist
 import { useAuth } from '../contexts/AuthContext';
 import './CrmPage.css'; // Create this CSS file for styling
 
@@ -68,7 +68,7 @@ function CrmPage() {
             try {
                 setLoading(true);
                 // 1. Fetch boards for the company (for now, assume the first one)
-                const userBoards = await getBoards(); // API fetches boards for the current user's company
+                const { items: userBoards } = await getBoards(); // API fetches boards for the current user's company
                 if (!userBoards || userBoards.length === 0) {
                     // Optional: Create a default board if none exists?
                     setError('Nenhum quadro Kanban encontrado para esta empresa.');
@@ -78,22 +78,18 @@ function CrmPage() {
                 const currentBoard = userBoards[0]; // Use the first board
                 setBoard(currentBoard);
 
-                // 2. Fetch columns for the board
-                const boardColumns = await getColumnsByBoard(currentBoard.id);
-                
+                // 2. Fetch columns and their cards in a single request
+                const snapshot = await getBoardSnapshot(currentBoard.id);
+
                 const columnsData = {};
                 const cardsData = {};
-                const columnPromises = boardColumns.map(async (col) => {
-                    // 3. Fetch cards for each column
-                    const columnCards = await getCardsByColumn(col.id);
+                snapshot.colunas.forEach(({ cards: columnCards, ...col }) => {
                     columnsData[col.id] = { ...col, cardIds: columnCards.map(c => c.id) };
                     columnCards.forEach(card => {
                         cardsData[card.id] = card;
                     });
                 });
 
-                await Promise.all(columnPromises);
-
                 setColumns(columnsData);
                 setCards(cardsData);
                 setError('');
@@ -108,6 +104,13 @@ function CrmPage() {
         loadBoardData();
     }, [user]);
 
+    // Move request placing a card after the card now preceding it (null = top)
+    const moveAfter = (cardId, columnId, cardIds, index) => ({
+        card_id: parseInt(cardId),
+        coluna_id: columnId,
+        after_card_id: index > 0 ? cardIds[index - 1] : null,
+    });
+
     // Handle Drag and Drop
     const onDragEnd = async (result) => {
         const { destination, source, draggableId } = result;
@@ -141,9 +144,8 @@ function CrmPage() {
 
             // --- Backend Update --- 
             try {
-                // Update card order (backend needs logic for this, or update all cards in column)
-                // For MVP, let's just update the moved card's column (even if same) and order (approximate)
-                await updateCard(draggableId, { coluna_id: finishColumn.id, ordem: destination.index }); 
+                // Only the moved card is written: it is placed after its new predecessor
+                await reorderCards([moveAfter(draggableId, finishColumn.id, newCardIds, destination.index)]);
             } catch (err) {
                 setError('Falha ao atualizar ordem do card. Revertendo.');
                 console.error(err);
@@ -179,8 +181,8 @@ function CrmPage() {
 
          // --- Backend Update --- 
          try {
-            // Update the card's column_id and approximate order
-            await updateCard(draggableId, { coluna_id: finishColumn.id, ordem: destination.index }); 
+            // Update the card's column and its position after the new predecessor
+            await reorderCards([moveAfter(draggableId, finishColumn.id, finishCardIds, destination.index)]);
         } catch (err) {
             setError('Falha ao mover card. Revertendo.');
             console.error(err);
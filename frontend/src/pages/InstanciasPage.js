@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useCallback } from 'react';
-import { getInstancias, createInstancia, connectInstancia } from '../services/api'; // Assuming API functions exist
+import { getInstancias, createInstancia, connectInstancia, getInstanciaQRCode } from '../services/api'; // Assuming API functions exist
 import { useAuth } from '../contexts/AuthContext';
 import useWebSocket from '../hooks/useWebSocket'; // Import WebSocket hook
 
@@ -66,7 +66,7 @@ function InstanciasPage() {
     const [newInstanceApiKey, setNewInstanceApiKey] = useState('');
 
     // State for QR Code display
-    const [qrCodeData, setQrCodeData] = useState(null); // { instance_id: number, qr_code: string }
+    const [qrCodeData, setQrCodeData] = useState(null); // { instance_id: number, qr_version: number, qr_code: object URL }
 
     // WebSocket connection for status updates
     const wsUrl = user ? `${WS_URL_BASE}/ws/${user.empresa_id || 0}/${user.id}` : null;
@@ -81,8 +81,8 @@ function InstanciasPage() {
         }
         try {
             setLoading(true);
-            const data = await getInstancias(); // API fetches instances for the current user's company
-            setInstancias(data);
+            const page = await getInstancias(); // API fetches instances for the current user's company
+            setInstancias(page.items);
             setError('');
         } catch (err) {
             setError('Falha ao carregar instâncias.');
@@ -96,6 +96,19 @@ function InstanciasPage() {
         fetchInstancias();
     }, [fetchInstancias]);
 
+    // Events and the connect response only carry the QR version: fetch the image
+    const showQrCode = useCallback(async (instanciaId, qrVersion) => {
+        try {
+            const qrCode = await getInstanciaQRCode(instanciaId);
+            setQrCodeData(prev => {
+                if (prev && prev.qr_code) URL.revokeObjectURL(prev.qr_code);
+                return { instance_id: instanciaId, qr_version: qrVersion, qr_code: qrCode };
+            });
+        } catch (err) {
+            console.error(err);
+        }
+    }, []);
+
     // Handle WebSocket messages for status updates and QR codes
     useEffect(() => {
         if (lastMessage) {
@@ -112,12 +125,14 @@ function InstanciasPage() {
                 if (qrCodeData && qrCodeData.instance_id === lastMessage.instance_id && lastMessage.status !== 'qrcode') {
                     setQrCodeData(null);
                 }
-            } else if (lastMessage.type === 'instance_qr_code') {
-                 console.log("QR Code received:", lastMessage);
-                 setQrCodeData({ instance_id: lastMessage.instance_id, qr_code: lastMessage.qr_code });
+            } else if (lastMessage.type === 'instance_status' && lastMessage.qr_version) {
+                 console.log("QR Code updated:", lastMessage);
+                 if (!qrCodeData || qrCodeData.instance_id !== lastMessage.instance_id || qrCodeData.qr_version !== lastMessage.qr_version) {
+                     showQrCode(lastMessage.instance_id, lastMessage.qr_version);
+                 }
             }
         }
-    }, [lastMessage, qrCodeData]);
+    }, [lastMessage, qrCodeData, showQrCode]);
 
     const handleCreateInstancia = async (e) => {
         e.preventDefault();
@@ -147,8 +162,8 @@ function InstanciasPage() {
         try {
             const result = await connectInstancia(instanciaId);
             // QR code might be in result or come via WebSocket
-            if (result && result.qr_code) {
-                 setQrCodeData({ instance_id: instanciaId, qr_code: result.qr_code });
+            if (result && result.qr_version) {
+                 await showQrCode(instanciaId, result.qr_version);
             } else {
                 // Assume QR code will arrive via WebSocket
                 console.log("Connect request sent, waiting for QR code via WebSocket...");
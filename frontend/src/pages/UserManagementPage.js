@@ -22,8 +22,8 @@ function UserManagementPage() {
       if (user?.is_superuser) {
         try {
           setLoading(true);
-          const data = await getUsers();
-          setUsers(data);
+          const page = await getUsers();
+          setUsers(page.items);
           setError('');
         } catch (err) {
           setError('Falha ao carregar usuários.');
@@ -79,10 +79,13 @@ export const getCurrentUser = async () => {
     }
 };
 
+// List endpoints return { items, next_cursor }; pass next_cursor back as cursor for the next page
+const pageParams = (cursor, limit) => ({ params: { limit, ...(cursor ? { cursor } : {}) } });
+
 // --- User Management --- 
-export const getUsers = async (skip = 0, limit = 100) => {
+export const getUsers = async (cursor = null, limit = 100) => {
     try {
-        const response = await apiClient.get(`/usuarios/?skip=${skip}&limit=${limit}`);
+        const response = await apiClient.get('/usuarios/', pageParams(cursor, limit));
         return response.data;
     } catch (error) {
         console.error('Failed to get users:', error.response || error.message);
@@ -101,10 +104,10 @@ export const createUser = async (userData) => {
 };
 
 // --- Company Management --- 
-export const getCompanies = async (skip = 0, limit = 100) => {
+export const getCompanies = async (cursor = null, limit = 100) => {
     try {
         // Assuming superuser access is checked by the backend endpoint
-        const response = await apiClient.get(`/empresas/?skip=${skip}&limit=${limit}`);
+        const response = await apiClient.get('/empresas/', pageParams(cursor, limit));
         return response.data;
     } catch (error) {
         console.error('Failed to get companies:', error.response || error.message);
@@ -124,9 +127,9 @@ export const createCompany = async (companyData) => {
 };
 
 // --- CRM Services --- 
-export const getBoards = async () => {
+export const getBoards = async (cursor = null, limit = 100) => {
     try {
-        const response = await apiClient.get('/crm/boards/');
+        const response = await apiClient.get('/crm/boards/', pageParams(cursor, limit));
         return response.data;
     } catch (error) {
         console.error('Failed to get boards:', error.response || error.message);
@@ -144,9 +147,19 @@ export const createBoard = async (boardData) => {
     }
 };
 
-export const getColumnsByBoard = async (boardId) => {
+export const getBoardSnapshot = async (boardId) => {
     try {
-        const response = await apiClient.get(`/crm/colunas/by_board/${boardId}`);
+        const response = await apiClient.get(`/crm/boards/${boardId}/snapshot`);
+        return response.data;
+    } catch (error) {
+        console.error(`Failed to get snapshot for board ${boardId}:`, error.response || error.message);
+        throw error;
+    }
+};
+
+export const getColumnsByBoard = async (boardId, cursor = null, limit = 100) => {
+    try {
+        const response = await apiClient.get(`/crm/colunas/by_board/${boardId}`, pageParams(cursor, limit));
         return response.data;
     } catch (error) {
         console.error(`Failed to get columns for board ${boardId}:`, error.response || error.message);
@@ -164,9 +177,9 @@ export const createColumn = async (columnData) => {
     }
 };
 
-export const getCardsByColumn = async (columnId) => {
+export const getCardsByColumn = async (columnId, cursor = null, limit = 100) => {
     try {
-        const response = await apiClient.get(`/crm/cards/by_coluna/${columnId}`);
+        const response = await apiClient.get(`/crm/cards/by_coluna/${columnId}`, pageParams(cursor, limit));
         return response.data;
     } catch (error) {
         console.error(`Failed to get cards for column ${columnId}:`, error.response || error.message);
@@ -194,10 +207,21 @@ export const updateCard = async (cardId, cardData) => {
     }
 };
 
+// moves: [{ card_id, coluna_id, after_card_id }] (after_card_id null = top of the column)
+export const reorderCards = async (moves) => {
+    try {
+        const response = await apiClient.post('/crm/cards/reorder', { moves });
+        return response.data;
+    } catch (error) {
+        console.error('Failed to reorder cards:', error.response || error.message);
+        throw error;
+    }
+};
+
 // --- Evolution API Services --- 
-export const getInstancias = async () => {
+export const getInstancias = async (cursor = null, limit = 100) => {
     try {
-        const response = await apiClient.get('/evolution/');
+        const response = await apiClient.get('/evolution/', pageParams(cursor, limit));
         return response.data;
     } catch (error) {
         console.error('Failed to get instancias:', error.response || error.message);
@@ -218,13 +242,25 @@ export const createInstancia = async (instanciaData) => {
 export const connectInstancia = async (instanciaId) => {
     try {
         const response = await apiClient.post(`/evolution/${instanciaId}/connect`);
-        return response.data; // Should contain { qr_code, status }
+        return response.data; // Should contain { qr_version, status }
     } catch (error) {
         console.error(`Failed to connect instancia ${instanciaId}:`, error.response || error.message);
         throw error;
     }
 };
 
+// QR code as a PNG blob, returned as an object URL for <img src>
+// (the image needs the Authorization header, so it can't be a plain URL)
+export const getInstanciaQRCode = async (instanciaId) => {
+    try {
+        const response = await apiClient.get(`/evolution/${instanciaId}/qrcode`, { responseType: 'blob' });
+        return URL.createObjectURL(response.data);
+    } catch (error) {
+        console.error(`Failed to fetch QR code for instancia ${instanciaId}:`, error.response || error.message);
+        throw error;
+    }
+};
+
 export const sendEvolutionMessage = async (instanciaId, messagePayload) => {
     try {
         const response = await apiClient.post(`/evolution/${instanciaId}/send`, messagePayload);